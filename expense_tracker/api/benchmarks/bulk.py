@@ -0,0 +1,75 @@
+"""
+Benchmark: one POST /api/expense/add per row vs POST /api/expenses/bulk
+
+Usage:
+    python benchmarks/bulk.py                        # 10k and 100k rows
+    python benchmarks/bulk.py 10000 500,1000,5000    # custom sizes and batch sizes
+
+In-memory SQLite hides commit cost; to see the fsync savings run against a
+file database or PostgreSQL:
+
+    FLASK_ENV=development DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/bulk.py
+    FLASK_ENV=postgres DATABASE_URL=postgresql://... python benchmarks/bulk.py
+"""
+
+import sys
+import time
+
+from common import app, db, parse_sizes, reset_schema, make_user, expense_rows
+
+
+def payload(user_id, n):
+    rows = []
+    for row in expense_rows(user_id, n):
+        rows.append({
+            "title": row["title"],
+            "amount": row["amount"],
+            "category": row["category"],
+            "date": row["date"].isoformat(),
+        })
+    return rows
+
+
+def run_single(client, user_id, rows):
+    start = time.perf_counter()
+    for row in rows:
+        resp = client.post("/api/expense/add", json=dict(row, user_id=user_id))
+        assert resp.status_code == 201, resp.get_data(as_text=True)
+    return time.perf_counter() - start
+
+
+def run_bulk(client, user_id, rows, batch_size):
+    start = time.perf_counter()
+    resp = client.post(
+        f"/api/expenses/bulk?batch_size={batch_size}",
+        json={"user_id": user_id, "expenses": rows}
+    )
+    assert resp.status_code == 201, resp.get_data(as_text=True)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = parse_sizes([10_000, 100_000])
+    batch_sizes = [int(s) for s in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1000]
+    client = app.test_client()
+
+    with app.app_context():
+        print(f"Database: {db.engine.url.render_as_string(hide_password=True)}")
+    print(f"{'rows':>10} | {'path':<18} | {'time':>10} {'rows/s':>10}")
+    print("-" * 58)
+    for n in sizes:
+        with app.app_context():
+            reset_schema()
+            user_id = make_user().id
+        rows = payload(user_id, n)
+
+        results = [("single-row", run_single(client, user_id, rows))]
+        for batch_size in batch_sizes:
+            results.append((f"bulk batch={batch_size}", run_bulk(client, user_id, rows, batch_size)))
+
+        for label, elapsed in results:
+            print(f"{n:>10,} | {label:<18} | {elapsed:>9.2f}s {n / elapsed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Shared helpers for the API benchmark scripts
+
+Benchmarks run against an in-memory SQLite database by default. Point them at
+PostgreSQL with:
+
+    FLASK_ENV=postgres DATABASE_URL=postgresql://... python benchmarks/<script>.py
+"""
+
+import os
+import sys
+import time
+import random
+import statistics
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add the api folder to the path so we can import the Flask app and models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("FLASK_ENV", "testing")
+
+from sqlalchemy import insert
+from main import app
+from models import db, User, Expense
+from rollups import apply_expense_deltas
+
+CATEGORIES = [
+    "Food & Dining", "Transportation", "Entertainment", "Shopping", "Utilities",
+    "Healthcare", "Education", "Travel", "Insurance", "Other",
+]
+
+SEED_BATCH = 50_000
+
+
+def parse_sizes(default):
+    """Row counts from argv (e.g. `10000,100000`), falling back to default"""
+    if len(sys.argv) > 1:
+        return [int(s) for s in sys.argv[1].split(",")]
+    return default
+
+
+def reset_schema():
+    """Drop and recreate every table for a clean run"""
+    db.drop_all()
+    db.create_all()
+
+
+def make_user(username="bench"):
+    user = User(username=username, password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def expense_rows(user_id, n, days=3 * 365, seed=42):
+    """Yield n synthetic expense dicts spread over the last `days` days"""
+    rng = random.Random(seed)
+    today = date.today()
+    for i in range(n):
+        category = rng.choice(CATEGORIES)
+        yield {
+            "user_id": user_id,
+            "title": f"{category} #{i}",
+            "amount": round(rng.uniform(10, 5000), 2),
+            "category": category,
+            "date": today - timedelta(days=rng.randrange(days)),
+            "description": "Synthetic benchmark expense",
+        }
+
+
+def _insert_batch(batch):
+    db.session.execute(insert(Expense), batch)
+    apply_expense_deltas((r["user_id"], r["category"], r["date"], r["amount"]) for r in batch)
+
+
+def seed_expenses(user_id, n):
+    """Insert n synthetic expenses (and their rollups) in large batches"""
+    batch = []
+    for row in expense_rows(user_id, n):
+        batch.append(row)
+        if len(batch) >= SEED_BATCH:
+            _insert_batch(batch)
+            batch = []
+    if batch:
+        _insert_batch(batch)
+    db.session.commit()
+
+
+def time_call(fn, repeat=5):
+    """Run fn `repeat` times; return (median seconds, last result)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def human_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
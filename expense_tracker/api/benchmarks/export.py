@@ -0,0 +1,61 @@
+"""
+Benchmark: full-history list fetch vs the streaming export endpoint
+
+Usage:
+    python benchmarks/export.py                      # 10k, 100k and 1M expenses
+    python benchmarks/export.py 10000,100000         # custom sizes
+
+Reports time-to-first-byte, total time and Python peak memory (tracemalloc)
+for /api/expenses/<user_id> and /api/expenses/<user_id>/export.
+"""
+
+import time
+import tracemalloc
+
+from common import app, parse_sizes, reset_schema, make_user, seed_expenses, human_bytes
+
+
+def measure(client, url):
+    """Return (ttfb seconds, total seconds, bytes, peak traced memory)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    resp = client.get(url, buffered=False)
+    ttfb = None
+    size = 0
+    for chunk in resp.response:
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    resp.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb or total, total, size, peak
+
+
+def main():
+    sizes = parse_sizes([10_000, 100_000, 1_000_000])
+    client = app.test_client()
+
+    print(f"{'rows':>10} | {'endpoint':<8} | {'ttfb':>9} {'total':>9} {'bytes':>10} {'peak mem':>10}")
+    print("-" * 68)
+    for n in sizes:
+        with app.app_context():
+            reset_schema()
+            user_id = make_user().id
+            seed_expenses(user_id, n)
+
+        for label, url in (
+            ("list", f"/api/expenses/{user_id}"),
+            ("ndjson", f"/api/expenses/{user_id}/export"),
+            ("csv", f"/api/expenses/{user_id}/export?format=csv"),
+        ):
+            ttfb, total, size, peak = measure(client, url)
+            print(
+                f"{n:>10,} | {label:<8} | {ttfb * 1000:>7.1f}ms {total * 1000:>7.1f}ms "
+                f"{human_bytes(size):>10} {human_bytes(peak):>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Load test: find the throughput knee for a gunicorn worker count
+
+Usage:
+    python benchmarks/load.py                      # 1 worker, SQLite file
+    python benchmarks/load.py 4                    # 4 workers
+    python benchmarks/load.py 4 1,2,4,8,16,32,64   # worker count, client steps
+    FLASK_ENV=postgres DATABASE_URL=postgresql://... python benchmarks/load.py 4
+
+Seeds a user with expenses, starts `gunicorn -c gunicorn.conf.py wsgi:app`
+with the given worker count, then raises the number of concurrent keep-alive
+clients step by step. The knee is the smallest client count that already
+reaches 90% of the peak throughput; past it extra clients only add latency.
+The run ends with the server's /metrics so pool waits can be read alongside.
+
+WARNING: the target database is dropped and recreated.
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["FLASK_ENV"] = "development"
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load_bench.db')}"
+
+from common import app, db, reset_schema, make_user, seed_expenses
+from passwords import password_hasher
+from pool_metrics import percentile
+
+API_DIR = Path(__file__).parent.parent
+STEP_SECONDS = float(os.getenv("LOAD_STEP_SECONDS", 5))
+KNEE_FRACTION = 0.9
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port):
+    # No response cache, so every request reaches the database
+    env = dict(
+        os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_ACCESS_LOG="", GUNICORN_LOG_LEVEL="warning", CACHE_BACKEND="none"
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=API_DIR, env=env, stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("gunicorn did not become healthy; is it installed (pip install gunicorn)?")
+
+
+def login(port, username, password):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("POST", "/api/login", json.dumps({"username": username, "password": password}),
+                 {"Content-Type": "application/json"})
+    return json.loads(conn.getresponse().read())["access_token"]
+
+
+def run_step(port, path, headers, clients, seconds):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - start
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    steps = [int(s) for s in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 2, 4, 8, 16, 32, 64]
+
+    with app.app_context():
+        reset_schema()
+        password_hasher.configure(workers=0)
+        user = make_user("load")
+        user.password_hash = password_hasher.hash("load-password")
+        db.session.commit()
+        user_id = user.id
+        seed_expenses(user_id, 20_000)
+
+    port = free_port()
+    server = start_server(workers, port)
+    try:
+        headers = {"Authorization": f"Bearer {login(port, 'load', 'load-password')}"}
+        path = f"/api/expenses/{user_id}?limit=50&fields=id,title,amount,date"
+
+        print(f"{workers} gunicorn workers, {STEP_SECONDS:.0f}s per step, GET {path.split('?')[0]}")
+        print(f"{'clients':>8} | {'req/s':>8} | {'p50':>8} {'p99':>8} | {'errors':>6}")
+        print("-" * 50)
+        results = []
+        for clients in steps:
+            latencies, errors, wall = run_step(port, path, headers, clients, STEP_SECONDS)
+            throughput = len(latencies) / wall
+            results.append((clients, throughput))
+            print(
+                f"{clients:>8} | {throughput:>8.1f} | {percentile(latencies, 50) * 1000:>6.1f}ms "
+                f"{percentile(latencies, 99) * 1000:>6.1f}ms | {errors:>6}"
+            )
+
+        peak = max(throughput for _, throughput in results)
+        knee = next(clients for clients, throughput in results if throughput >= KNEE_FRACTION * peak)
+        print(f"\nPeak {peak:.1f} req/s; knee at {knee} concurrent clients for {workers} workers.")
+
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("GET", "/metrics")
+        print("\n/metrics (one worker):")
+        print(conn.getresponse().read().decode())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
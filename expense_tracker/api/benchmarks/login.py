@@ -0,0 +1,121 @@
+"""
+Benchmark: login latency under a burst of concurrent clients
+
+Usage:
+    python benchmarks/login.py                  # 50 clients, 4 logins each
+    python benchmarks/login.py 50 10            # clients, logins per client
+
+Serves the app over real HTTP (threaded Werkzeug server) against a temporary
+SQLite file and compares inline hashing on request threads with the bounded
+hashing pool. While the burst runs, a probe client keeps requesting "/" to
+show how much hashing delays unrelated requests.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import json
+import urllib.error
+import urllib.request
+
+_db_file = os.path.join(tempfile.mkdtemp(), "login_bench.db")
+os.environ["FLASK_ENV"] = "development"
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+
+from werkzeug.serving import make_server
+from common import app, db, reset_schema
+from models import User
+from passwords import password_hasher
+from pool_metrics import percentile
+
+ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run_burst(base_url, clients, logins):
+    latencies, statuses, probe = [], [], []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def client():
+        for _ in range(logins):
+            start = time.perf_counter()
+            status = post_json(f"{base_url}/api/login", {"username": "bench", "password": "bench-password"})
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses.append(status)
+                if status == 200:
+                    latencies.append(elapsed)
+
+    def prober():
+        while not done.is_set():
+            start = time.perf_counter()
+            urllib.request.urlopen(f"{base_url}/", timeout=60).read()
+            probe.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+    probe_thread = threading.Thread(target=prober)
+    probe_thread.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    done.set()
+    probe_thread.join()
+    return latencies, statuses, probe, wall
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    workers = os.cpu_count() or 2
+
+    with app.app_context():
+        reset_schema()
+        password_hasher.configure(workers=0)
+        db.session.add(User(username="bench", password_hash=password_hasher.hash("bench-password")))
+        db.session.commit()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"bcrypt cost {ROUNDS}, {clients} clients x {logins} logins, {workers} pool workers")
+    print(f"{'mode':<24} | {'p50':>8} {'p99':>8} | {'ok':>5} {'503':>5} | {'login/s':>8} | {'probe p99':>9}")
+    print("-" * 84)
+    for label, pool_workers, max_pending in (
+        ("inline (request thread)", 0, None),
+        ("pool", workers, workers * 4),
+        ("pool, shallow queue", workers, workers),
+    ):
+        password_hasher.configure(workers=pool_workers, max_pending=max_pending)
+        latencies, statuses, probe, wall = run_burst(base_url, clients, logins)
+        ok = statuses.count(200)
+        print(
+            f"{label:<24} | {percentile(latencies, 50) * 1000:>6.0f}ms {percentile(latencies, 99) * 1000:>6.0f}ms | "
+            f"{ok:>5} {statuses.count(503):>5} | {ok / wall:>8.1f} | {percentile(probe, 99) * 1000:>7.1f}ms"
+        )
+
+    password_hasher.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: LIKE '%term%' scan vs the full-text search index
+
+Usage:
+    python benchmarks/search.py                      # 1M expenses
+    python benchmarks/search.py 100000               # custom sizes
+
+The LIKE baseline mirrors what a search page would otherwise run: match title,
+description or notes and return the 20 newest hits for one user. For very
+common words that query can stop early by walking the (user_id, date, id)
+index, while FTS ranks every match; the index wins on selective terms.
+"""
+
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+from common import app, db, parse_sizes, reset_schema, make_user, time_call, SEED_BATCH, CATEGORIES
+from models import Expense, ExpenseSearch
+
+VOCABULARY = (
+    "coffee lunch dinner groceries taxi metro fuel rent electricity internet phone movie concert "
+    "books course pharmacy doctor gym flight hotel insurance gift laptop shoes jacket repair "
+    "parking toll snacks bakery pizza sushi market subscription streaming donation charity"
+).split()
+RARE_WORD = "zeppelin"
+TERMS = ["coffee", "pizza market", "subscr", RARE_WORD]
+
+
+def seed_text_expenses(user_id, n, seed=7):
+    rng = random.Random(seed)
+    batch = []
+    for i in range(n):
+        words = rng.sample(VOCABULARY, 6)
+        if i % 10_000 == 0:
+            words.append(RARE_WORD)
+        batch.append({
+            "user_id": user_id,
+            "title": " ".join(words[:2]).title(),
+            "description": " ".join(words[2:5]),
+            "notes": " ".join(words[5:]),
+            "amount": round(rng.uniform(10, 5000), 2),
+            "category": rng.choice(CATEGORIES),
+            "date": date(2020, 1, 1) + timedelta(days=i % 2000),
+        })
+        if len(batch) >= SEED_BATCH:
+            db.session.execute(insert(Expense), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Expense), batch)
+    db.session.commit()
+
+
+def like_search(user_id, term, limit=20):
+    pattern = f"%{term}%"
+    return Expense.query.with_entities(Expense.id).filter(
+        Expense.user_id == user_id,
+        db.or_(Expense.title.ilike(pattern), Expense.description.ilike(pattern), Expense.notes.ilike(pattern))
+    ).order_by(Expense.date.desc(), Expense.id.desc()).limit(limit).all()
+
+
+def main():
+    sizes = parse_sizes([1_000_000])
+
+    print(f"{'rows':>10} | {'term':<14} | {'LIKE':>10} {'FTS':>10} {'speedup':>8}")
+    print("-" * 62)
+    for n in sizes:
+        with app.app_context():
+            reset_schema()
+            user_id = make_user().id
+            seed_text_expenses(user_id, n)
+
+            for term in TERMS:
+                like_time, _ = time_call(lambda: like_search(user_id, term), repeat=3)
+                fts_time, _ = time_call(lambda: ExpenseSearch.search(user_id, term), repeat=3)
+                print(
+                    f"{n:>10,} | {term:<14} | {like_time * 1000:>8.1f}ms {fts_time * 1000:>8.1f}ms "
+                    f"{like_time / fts_time:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
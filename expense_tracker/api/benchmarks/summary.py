@@ -0,0 +1,42 @@
+"""
+Benchmark: dashboard list fetch vs the server-side summary endpoint
+
+Usage:
+    python benchmarks/summary.py                     # 10k, 100k and 1M expenses
+    python benchmarks/summary.py 10000,100000        # custom sizes
+
+The dashboard used to fetch /api/expenses/<user_id> once per widget and
+aggregate in the browser; /api/expenses/<user_id>/summary returns every
+aggregate in a single GROUP BY response.
+"""
+
+from common import app, db, parse_sizes, reset_schema, make_user, seed_expenses, time_call, human_bytes
+
+WIDGETS = 5  # Chart, PieChart, LineChart, SpendingAdvice, Expense
+
+
+def main():
+    sizes = parse_sizes([10_000, 100_000, 1_000_000])
+    client = app.test_client()
+
+    print(f"{'rows':>10} | {'list x1':>10} {'payload':>10} | {'list x5':>10} | {'summary':>10} {'payload':>10}")
+    print("-" * 75)
+    for n in sizes:
+        with app.app_context():
+            reset_schema()
+            user_id = make_user().id
+            seed_expenses(user_id, n)
+
+        list_time, list_resp = time_call(lambda: client.get(f"/api/expenses/{user_id}"), repeat=3)
+        summary_time, summary_resp = time_call(lambda: client.get(f"/api/expenses/{user_id}/summary"))
+        assert list_resp.status_code == 200 and summary_resp.status_code == 200
+
+        print(
+            f"{n:>10,} | {list_time * 1000:>8.1f}ms {human_bytes(len(list_resp.data)):>10} | "
+            f"{list_time * WIDGETS * 1000:>8.1f}ms | "
+            f"{summary_time * 1000:>8.1f}ms {human_bytes(len(summary_resp.data)):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: per-request authentication cost
+
+Usage:
+    python benchmarks/tokens.py                 # 10000 checks
+    python benchmarks/tokens.py 50000
+
+Compares verifying a signed access token (signature check, no query) with the
+session-table style lookup it replaces (one primary-key query per request),
+then the end-to-end cost of a protected GET with and without the token check.
+"""
+
+import sys
+
+from common import app, db, reset_schema, make_user, time_call
+from models import User
+from tokens import token_auth
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    with app.app_context():
+        reset_schema()
+        user_id = make_user().id
+        token = token_auth.issue(user_id)["access_token"]
+
+        def verify_all():
+            for _ in range(n):
+                token_auth.verify(token)
+
+        def lookup_all():
+            for _ in range(n):
+                db.session.get(User, user_id)
+                db.session.expire_all()
+
+        verify_time, _ = time_call(verify_all, repeat=3)
+        lookup_time, _ = time_call(lookup_all, repeat=3)
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {token}"}
+        requests = max(n // 10, 1)
+
+        def get_all(with_token):
+            for _ in range(requests):
+                client.get(f"/api/budgets/{user_id}", headers=headers if with_token else None)
+
+        plain_time, _ = time_call(lambda: get_all(False), repeat=3)
+        auth_time, _ = time_call(lambda: get_all(True), repeat=3)
+
+    print(f"{'check':<26} {'per call':>12}")
+    print("-" * 40)
+    print(f"{'token verify':<26} {verify_time / n * 1e6:>10.1f}us")
+    print(f"{'DB user lookup':<26} {lookup_time / n * 1e6:>10.1f}us")
+    print(f"{'GET budgets, no token':<26} {plain_time / requests * 1e6:>10.1f}us")
+    print(f"{'GET budgets, bearer token':<26} {auth_time / requests * 1e6:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Incremental budget tracking
+
+Budget.spent_amount is adjusted by apply_budget_deltas() in the same
+transaction as every expense insert or delete, so reading a budget never
+needs to scan expenses. A budget with no category_id covers all of the
+user's spending; expenses saved with only a category name get the id of the
+user's category of that name. roll_budget_periods() moves expired windows
+forward and is meant to run periodically (python db_init.py roll-budgets).
+"""
+
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import bindparam, update
+from models import db, Budget, Expense
+
+PERIODS = ("daily", "weekly", "monthly", "yearly")
+
+
+def add_months(day, months):
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def next_period_start(start, period):
+    if period == "daily":
+        return start + timedelta(days=1)
+    if period == "weekly":
+        return start + timedelta(weeks=1)
+    if period == "yearly":
+        return add_months(start, 12)
+    return add_months(start, 1)
+
+
+def period_end(start, period):
+    """Last day of the budget window beginning on start"""
+    return next_period_start(start, period) - timedelta(days=1)
+
+
+def apply_budget_deltas(rows, sign=1):
+    """
+    Fold (user_id, category_id, date, amount) tuples into matching active budgets.
+
+    A row matches a budget of the same user whose window contains its date and
+    whose category_id is either the row's or NULL. Nothing is committed here.
+    """
+    rows = [
+        (int(user_id), category_id, day.date() if isinstance(day, datetime) else day, Decimal(str(amount)))
+        for user_id, category_id, day, amount in rows
+    ]
+    if not rows:
+        return
+
+    budgets = Budget.query.with_entities(
+        Budget.id, Budget.user_id, Budget.category_id, Budget.start_date, Budget.end_date
+    ).filter(
+        Budget.user_id.in_({row[0] for row in rows}),
+        Budget.is_active.is_(True)
+    ).all()
+    if not budgets:
+        return
+
+    by_user = defaultdict(list)
+    for budget in budgets:
+        by_user[budget.user_id].append(budget)
+
+    deltas = defaultdict(Decimal)
+    for user_id, category_id, day, amount in rows:
+        for budget in by_user.get(user_id, ()):
+            if budget.category_id is not None and budget.category_id != category_id:
+                continue
+            start = budget.start_date.date() if isinstance(budget.start_date, datetime) else budget.start_date
+            end = budget.end_date.date() if isinstance(budget.end_date, datetime) else budget.end_date
+            if day < start or (end is not None and day > end):
+                continue
+            deltas[budget.id] += amount * sign
+
+    if deltas:
+        # Relative update so concurrent writers never lose an increment
+        db.session.execute(
+            update(Budget.__table__)
+            .where(Budget.__table__.c.id == bindparam("budget_id"))
+            .values(spent_amount=Budget.__table__.c.spent_amount + bindparam("delta")),
+            [{"budget_id": budget_id, "delta": delta} for budget_id, delta in deltas.items()]
+        )
+
+
+def window_spent_subquery():
+    """Correlated SUM of expenses inside each budget's own window"""
+    return (
+        db.select(db.func.coalesce(db.func.sum(Expense.amount), 0))
+        .where(
+            Expense.user_id == Budget.user_id,
+            db.or_(Budget.category_id.is_(None), Expense.category_id == Budget.category_id),
+            Expense.date >= Budget.start_date,
+            db.or_(Budget.end_date.is_(None), Expense.date <= Budget.end_date)
+        )
+        .scalar_subquery()
+    )
+
+
+def recompute_spent(budget_ids):
+    """Recalculate spent_amount from raw expenses for the given budgets"""
+    if budget_ids:
+        db.session.execute(
+            update(Budget)
+            .where(Budget.id.in_(budget_ids))
+            .values(spent_amount=window_spent_subquery())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def over_budget_query(user_id):
+    """Active budgets whose spend exceeds the limit (served by ix_budgets_over_limit)"""
+    return Budget.query.filter(
+        Budget.user_id == user_id,
+        Budget.is_active.is_(True),
+        Budget.spent_amount > Budget.limit_amount
+    )
+
+
+def roll_budget_periods(today=None):
+    """Advance every expired budget window to the one containing today; returns the count"""
+    today = today or date.today()
+    expired = Budget.query.with_entities(Budget.id, Budget.period, Budget.end_date).filter(
+        Budget.is_active.is_(True),
+        Budget.end_date.isnot(None),
+        Budget.end_date < today
+    ).all()
+
+    windows = []
+    for budget in expired:
+        period = budget.period if budget.period in PERIODS else "monthly"
+        end = budget.end_date.date() if isinstance(budget.end_date, datetime) else budget.end_date
+        start = end + timedelta(days=1)
+        while period_end(start, period) < today:
+            start = next_period_start(start, period)
+        windows.append({"budget_id": budget.id, "new_start": start, "new_end": period_end(start, period)})
+
+    if windows:
+        db.session.execute(
+            update(Budget.__table__)
+            .where(Budget.__table__.c.id == bindparam("budget_id"))
+            .values(start_date=bindparam("new_start"), end_date=bindparam("new_end")),
+            windows
+        )
+        recompute_spent([window["budget_id"] for window in windows])
+    db.session.commit()
+    return len(windows)
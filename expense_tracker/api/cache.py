@@ -0,0 +1,183 @@
+"""
+Per-user response cache for the expense read routes
+
+Entries are keyed by user id, a per-user version counter, the route path and
+the sorted query string. Writes call response_cache.bump_user(user_id) after
+committing, which makes every older entry for that user unreachable without
+scanning for it; stale entries simply age out of the LRU or expire.
+
+Backends:
+    memory  in-process LRU with TTL (default)
+    redis   any Redis-compatible client (redis.Redis, fakeredis.FakeRedis, ...)
+    none    caching disabled; ETags are still sent
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, make_response, Response
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with per-entry TTL"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        # Counters live outside the LRU so a version can never be evicted
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache:
+    """Backend for any client exposing Redis get/set(ex=)/incr"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        raw = self.client.get(key)
+        if raw is None:
+            return None
+        etag, mimetype, body = raw.split(b"\n", 2)
+        return etag.decode(), mimetype.decode(), body
+
+    def set(self, key, value, ttl):
+        etag, mimetype, body = value
+        self.client.set(key, etag.encode() + b"\n" + mimetype.encode() + b"\n" + body, ex=int(ttl))
+
+    def get_counter(self, key):
+        return int(self.client.get(key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def __len__(self):
+        return self.client.dbsize()
+
+
+class ResponseCache:
+    """Flask extension holding the cache backend and hit/miss counters"""
+
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get("CACHE_TTL", 60)
+        if self.backend is not None:
+            return
+
+        kind = app.config.get("CACHE_BACKEND", "memory")
+        if kind == "redis":
+            import redis  # optional dependency, only needed for this backend
+            self.backend = RedisCache(redis.Redis.from_url(app.config["CACHE_REDIS_URL"]))
+        elif kind == "memory":
+            self.backend = LRUCache(app.config.get("CACHE_MAX_ENTRIES", 1024))
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def user_version(self, user_id):
+        return self.backend.get_counter(f"cache:v:{user_id}") if self.enabled else 0
+
+    def bump_user(self, *user_ids):
+        """Invalidate every cached response for the given users"""
+        if self.enabled:
+            for user_id in set(user_ids):
+                self.backend.incr(f"cache:v:{user_id}")
+
+    def key_for(self, user_id):
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f"cache:r:{user_id}:{self.user_version(user_id)}:{request.path}?{query}"
+
+    def get(self, key):
+        value = self.backend.get(key) if self.enabled else None
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.enabled:
+            self.backend.set(key, value, self.ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.enabled else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self.backend) if self.enabled else 0
+        }
+
+
+response_cache = ResponseCache()
+
+
+def cached_user_view(view):
+    """Serve a user-scoped GET view from the cache, with ETag / If-None-Match support"""
+    @wraps(view)
+    def wrapper(user_id, **kwargs):
+        key = response_cache.key_for(user_id)
+        entry = response_cache.get(key)
+        if entry is None:
+            response = make_response(view(user_id, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            entry = (hashlib.blake2b(body, digest_size=16).hexdigest(), response.mimetype, body)
+            response_cache.set(key, entry)
+
+        etag, mimetype, body = entry
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=mimetype)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+    return wrapper
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Query plan regression check for the expense routes.
+
+Exercises every expense, summary and budget route against a scratch database,
+captures each SQL statement the routes issue and runs EXPLAIN on it. Exits
+non-zero if any plan falls back to a full scan of a checked table, or if a
+query with a dedicated partial index (over_budget_query) doesn't use it.
+
+Usage:
+    python check_query_plans.py                      # in-memory SQLite
+    python -m pytest test_query_plans.py             # the same, in the test suite
+    FLASK_ENV=postgres DATABASE_URL=postgresql://.../scratch_db python check_query_plans.py
+
+WARNING: the target database is dropped and recreated. Never point this at
+real data.
+"""
+
+import io
+import os
+import re
+import sys
+from datetime import date, timedelta
+
+os.environ.setdefault("FLASK_ENV", "testing")
+
+from sqlalchemy import event
+from main import app
+from models import db, User, Category
+from budgets import over_budget_query
+from tokens import token_auth
+
+# Tables that must always be reached through an index
+CHECKED_TABLES = ("expenses", "expense_rollups", "budgets")
+# Queries that must use a particular (partial) index, not just any index
+EXPECTED_INDEXES = {
+    "over_budget_query": (over_budget_query, "ix_budgets_over_limit"),
+}
+
+
+def capture_statements(engine):
+    """Record every single-execution SELECT/UPDATE/DELETE sent to the engine"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if not executemany and verb in ("SELECT", "UPDATE", "DELETE"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return captured, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def succeeded(response):
+    """A route that failed never ran the queries being checked, so stop there"""
+    if not 200 <= response.status_code < 300:
+        raise RuntimeError(
+            f"{response.request.method} {response.request.full_path.rstrip('?')} returned "
+            f"{response.status_code}: {response.get_data(as_text=True)[:200]}"
+        )
+    return response
+
+
+def exercise_routes(client, user_id, category_id):
+    """Hit each route the way the frontend does"""
+    today = date.today()
+    start = (today - timedelta(days=30)).isoformat()
+    end = today.isoformat()
+
+    resp = succeeded(client.post("/api/expense/add", json={
+        "title": "Lunch", "amount": 120, "category": "Food & Dining",
+        "category_id": category_id, "date": end, "user_id": user_id
+    }))
+    expense_id = resp.get_json()["id"]
+    succeeded(client.post("/api/expenses/bulk", json={"user_id": user_id, "expenses": [
+        {"title": "Bus", "amount": 30, "category": "Transportation", "date": start},
+        {"title": "Cinema", "amount": 300, "category": "Entertainment", "category_id": category_id, "date": end},
+    ]}))
+    succeeded(client.post("/api/expenses/bulk", data={
+        "user_id": str(user_id),
+        "file": (io.BytesIO(b"title,amount,date\nBook,250," + end.encode() + b"\n"), "import.csv")
+    }, content_type="multipart/form-data"))
+    succeeded(client.post("/api/budget/add", json={"user_id": user_id, "name": "Monthly", "limit_amount": 100}))
+    succeeded(client.post("/api/budget/add", json={
+        "user_id": user_id, "name": "Food", "limit_amount": 5000, "category_id": category_id
+    }))
+
+    succeeded(client.get(f"/api/expenses/{user_id}"))
+    succeeded(client.get(f"/api/expenses/{user_id}?start_date={start}&end_date={end}"))
+    page = succeeded(client.get(f"/api/expenses/{user_id}?limit=2&fields=id,amount")).get_json()
+    succeeded(client.get(f"/api/expenses/{user_id}?limit=2&cursor={page['next_cursor']}&start_date={start}"))
+    succeeded(client.get(f"/api/expenses/{user_id}/summary"))
+    succeeded(client.get(f"/api/expenses/{user_id}/summary?start_date={start}&end_date={end}"))
+    succeeded(client.get(f"/api/expenses/{user_id}/search?q=cinem"))
+    succeeded(client.get(f"/api/expenses/{user_id}/export")).get_data()
+    succeeded(client.get(f"/api/expenses/{user_id}/export?format=csv&start_date={start}")).get_data()
+    succeeded(client.get(f"/api/budgets/{user_id}"))
+    succeeded(client.get(f"/api/budgets/{user_id}/over"))
+    succeeded(client.delete(f"/api/expense/delete/{expense_id}"))
+
+
+def explain(connection, statement, parameters):
+    """Return the plan as a list of text lines"""
+    if connection.dialect.name == "postgresql":
+        rows = connection.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+        return [row[0] for row in rows]
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """Plan lines that read a checked table without an index"""
+    bad = []
+    for line in plan:
+        for table in CHECKED_TABLES:
+            if re.search(rf"(SCAN|Seq Scan on) {table}\b", line):
+                bad.append(line.strip())
+    return bad
+
+
+def missing_indexes(connection, user_id):
+    """Names of EXPECTED_INDEXES queries whose plan doesn't use their index"""
+    missing = []
+    for name, (build, index) in EXPECTED_INDEXES.items():
+        compiled = build(user_id).statement.compile(dialect=connection.dialect)
+        parameters = compiled.params
+        if connection.dialect.name != "postgresql":
+            parameters = tuple(parameters[key] for key in compiled.positiontup)
+        plan = explain(connection, str(compiled), parameters)
+        if not any(index in line for line in plan):
+            missing.append(name)
+            print(f"❌ {name} does not use {index}:")
+            for line in plan:
+                print(f"   -> {line.strip()}")
+    return missing
+
+
+def run_checks(user_id, category_id):
+    """Exercise the routes as the given user; returns (statements checked, failures)"""
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token_auth.issue(user_id)['access_token']}"
+    captured, stop = capture_statements(db.engine)
+    try:
+        exercise_routes(client, user_id, category_id)
+    finally:
+        stop()
+
+    failures = 0
+    seen = set()
+    with db.engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # Tiny tables make seq scans cheapest; force the planner to show index usage
+            connection.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in captured:
+            if statement in seen or not any(t in statement for t in CHECKED_TABLES):
+                continue
+            seen.add(statement)
+            plan = explain(connection, statement, parameters)
+            bad = full_scans(plan)
+            if bad:
+                failures += 1
+                print("❌ Full scan:")
+                print("   " + " ".join(statement.split())[:300])
+                for line in bad:
+                    print(f"   -> {line}")
+        failures += len(missing_indexes(connection, user_id))
+    return len(seen), failures
+
+
+def main():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username="plan-check", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        category = Category(user_id=user.id, name="Food & Dining")
+        db.session.add(category)
+        db.session.commit()
+
+        checked, failures = run_checks(user.id, category.id)
+        print(f"\nChecked {checked} distinct statements on {db.engine.dialect.name}.")
+        if failures:
+            print(f"❌ {failures} statement(s) fall back to a full scan or skip their index.")
+            sys.exit(1)
+        print("✅ No full scans; expected indexes used.")
+
+
+if __name__ == "__main__":
+    main()
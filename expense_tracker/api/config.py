@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from pool_metrics import TimedQueuePool
 
 load_dotenv()
 
@@ -14,6 +15,47 @@ class Config:
     SMTP_USER = os.getenv("SMTP_USER")
     SMTP_PASS = os.getenv("SMTP_PASS")
     EMAIL_FROM = os.getenv("EMAIL_FROM")
+    # Signed session tokens (see tokens.py); lifetimes in seconds
+    ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", 15 * 60))
+    REFRESH_TOKEN_TTL = int(os.getenv("REFRESH_TOKEN_TTL", 30 * 24 * 60 * 60))
+    TOKEN_AUTH_REQUIRED = os.getenv("TOKEN_AUTH_REQUIRED", "true").lower() != "false"
+    # Password hashing: bcrypt cost and the off-thread hashing pool (see passwords.py)
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+    HASH_WORKERS = int(os.getenv("HASH_WORKERS", 2))
+    HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", 8))
+    HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", 10.0))
+    SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() != "false"
+    # Background mail delivery (see mailer.py)
+    MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", 2))
+    MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 20))
+    MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", 5))
+    MAIL_RETRY_BACKOFF = float(os.getenv("MAIL_RETRY_BACKOFF", 2.0))
+    # Seconds before a message left in 'sending' by a dead worker is claimable again
+    MAIL_CLAIM_LEASE = float(os.getenv("MAIL_CLAIM_LEASE", 900))
+    # Rows per transaction for POST /api/expenses/bulk
+    BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", 1000))
+    # Response cache for expense reads: memory, redis or none
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_TTL = int(os.getenv("CACHE_TTL", 60))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    # Connection pool, per worker process. Keep DB_POOL_SIZE at least the
+    # gunicorn thread count, and workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    # below the server's max_connections.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+    # Per-request profiling (see profiling.py); off unless asked for
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+    PROFILE_DIR = os.getenv("PROFILE_DIR")
+    # X-Profile is honoured only when it carries this secret
+    PROFILE_SECRET = os.getenv("PROFILE_SECRET")
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 50))
 
 class DevelopmentConfig(Config):
     """Development configuration - PostgreSQL recommended, SQLite fallback"""
@@ -24,6 +66,7 @@ class DevelopmentConfig(Config):
     )
     DEBUG = True
     TESTING = False
+    SQLALCHEMY_ENGINE_OPTIONS = {"poolclass": TimedQueuePool}
 
 class PostgresConfig(Config):
     """PostgreSQL configuration - Production ready"""
@@ -33,12 +76,27 @@ class PostgresConfig(Config):
     )
     DEBUG = False
     TESTING = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": TimedQueuePool,
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        # Drop connections before a proxy or the server closes them idle
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "connect_args": {"options": f"-c statement_timeout={Config.DB_STATEMENT_TIMEOUT_MS}"},
+    }
 
 class TestingConfig(Config):
     """Testing configuration"""
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     DEBUG = True
     TESTING = True
+    # Cheap, inline hashing keeps test runs fast
+    BCRYPT_LOG_ROUNDS = 4
+    HASH_WORKERS = 0
+    # Scripts and benchmarks call the API without logging in
+    TOKEN_AUTH_REQUIRED = False
 
 # Select config based on environment
 config = {
@@ -0,0 +1,49 @@
+"""
+Shared setup for the API tests
+
+    python -m pytest
+
+main.py creates the app when imported, so the environment comes first:
+TestingConfig (an in-memory database, inline hashing, token auth optional)
+and no SMTP host, so registering never queues real mail.
+"""
+
+import os
+import uuid
+
+import pytest
+
+os.environ["FLASK_ENV"] = "testing"
+os.environ["SMTP_HOST"] = ""
+
+from main import app  # noqa: E402
+from models import db  # noqa: E402
+
+# A manual script against the development database, not a test
+collect_ignore = ["test_login.py"]
+
+with app.app_context():
+    db.create_all()
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def sign_up(client):
+    """Register and log in a new user; returns (user_id, headers)"""
+
+    def sign_up():
+        name = uuid.uuid4().hex[:12]
+        client.post("/api/register", json={"username": name, "password": "correct horse"})
+        tokens = client.post("/api/login", json={"username": name, "password": "correct horse"}).get_json()
+        return tokens["user_id"], {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    return sign_up
+
+
+def add_expenses(client, headers, rows):
+    """Insert rows through the bulk endpoint; returns the response"""
+    return client.post("/api/expenses/bulk", headers=headers, json={"expenses": rows})
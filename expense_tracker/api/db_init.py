@@ -6,13 +6,18 @@ This script provides utilities for:
 2. Initializing default data
 3. Resetting database (for development)
 4. Backing up data
+5. Rebuilding and verifying expense rollups
+6. Rolling budget periods forward (run daily from cron)
 """
 
 import os
 import sys
 from datetime import datetime
 from main import app, db
-from models import User, Category, Expense, Budget, bcrypt
+from models import User, Category, Expense, Budget
+from passwords import password_hasher
+from rollups import apply_expense_deltas, rebuild_rollups, check_rollups
+from budgets import apply_budget_deltas, roll_budget_periods
 
 # Default expense categories
 DEFAULT_CATEGORIES = [
@@ -54,7 +59,7 @@ def init_default_data():
             demo_user = User(
                 username='demo',
                 email='demo@example.com',
-                password_hash=bcrypt.generate_password_hash('demo123').decode('utf-8'),
+                password_hash=password_hasher.hash('demo123'),
                 full_name='Demo User',
                 is_active=True,
                 is_verified=True
@@ -93,16 +98,20 @@ def init_default_data():
             ]
             
             from datetime import timedelta
+            category_ids = {category.name: category.id for category in demo_user.categories}
             for exp_data in sample_expenses:
                 expense = Expense(
                     user_id=demo_user.id,
                     title=exp_data['title'],
                     amount=exp_data['amount'],
                     category=exp_data['category'],
+                    category_id=category_ids.get(exp_data['category']),
                     date=(datetime.utcnow() - timedelta(days=exp_data['days_ago'])).date(),
                     description=f"Sample {exp_data['category'].lower()} expense"
                 )
                 db.session.add(expense)
+                apply_expense_deltas([(expense.user_id, expense.category, expense.date, expense.amount)])
+                apply_budget_deltas([(expense.user_id, expense.category_id, expense.date, expense.amount)])
             db.session.commit()
             print(f"✅ {len(sample_expenses)} sample expenses added!")
 
@@ -153,6 +162,39 @@ def show_database_stats():
         print(f"Total Spent:  ₹{float(total_expenses):,.2f}")
         print("=" * 50)
 
+def rebuild_expense_rollups():
+    """Recompute expense rollups from raw expenses and verify them"""
+    print("🔄 Rebuilding expense rollups...")
+    
+    with app.app_context():
+        rebuild_rollups()
+        print("✅ Rollups rebuilt.")
+    
+    check_expense_rollups()
+
+def check_expense_rollups():
+    """Compare expense rollups against raw expense totals"""
+    print("🔍 Checking expense rollups against raw data...")
+    
+    with app.app_context():
+        mismatches = check_rollups()
+    
+    if mismatches:
+        print(f"❌ {len(mismatches)} mismatched rollup bucket(s):")
+        for mismatch in mismatches[:20]:
+            print(f"   {mismatch}")
+        sys.exit(1)
+    print("✅ Rollups match raw expenses.")
+
+def roll_budgets():
+    """Move expired budget windows forward and recompute their spend"""
+    print("📅 Rolling budget periods...")
+    
+    with app.app_context():
+        rolled = roll_budget_periods()
+    
+    print(f"✅ {rolled} budget(s) moved to their current period.")
+
 def main():
     """Main entry point"""
     if len(sys.argv) > 1:
@@ -166,6 +208,12 @@ def main():
             backup_database()
         elif command == 'stats':
             show_database_stats()
+        elif command == 'rollups':
+            rebuild_expense_rollups()
+        elif command == 'check-rollups':
+            check_expense_rollups()
+        elif command == 'roll-budgets':
+            roll_budgets()
         else:
             print("Unknown command!")
             print("\nUsage: python db_init.py [command]")
@@ -174,6 +222,9 @@ def main():
             print("  reset     - Drop all tables and reinitialize")
             print("  backup    - Create database backup")
             print("  stats     - Show database statistics")
+            print("  rollups   - Rebuild expense rollups and verify them")
+            print("  check-rollups - Verify expense rollups against raw data")
+            print("  roll-budgets  - Advance expired budget periods")
     else:
         print("Smart Expense Tracker - Database Manager")
         print("=" * 50)
@@ -183,6 +234,9 @@ def main():
         print("  reset     - Drop all tables and reinitialize (⚠️  deletes all data)")
         print("  backup    - Create database backup")
         print("  stats     - Show database statistics")
+        print("  rollups   - Rebuild expense rollups and verify them")
+        print("  check-rollups - Verify expense rollups against raw data")
+        print("  roll-budgets  - Advance expired budget periods (schedule daily)")
         print("\nExample:")
         print("  python db_init.py init")
 
@@ -0,0 +1,41 @@
+"""
+gunicorn settings for the expense API
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+One worker process with several threads (gthread) by default: requests
+mostly wait on the database, and two pieces of state live in process memory.
+With more workers, CACHE_BACKEND=memory lets a write invalidate only the
+worker that served it, and a logout revokes tokens only in that worker (see
+tokens.py). Raise WEB_CONCURRENCY only with CACHE_BACKEND=redis, and knowing
+a revoked access token may still work on other workers until it expires.
+
+Each worker owns its own connection pool, so pair the settings:
+
+    GUNICORN_THREADS <= DB_POOL_SIZE
+    WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) < max_connections
+"""
+
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks never accumulate
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = 500
+
+# Load the app in each worker: the engine, mail threads and hashing pool are
+# then created after the fork and never shared between processes
+preload_app = False
+
+# Access logging costs throughput; GUNICORN_ACCESS_LOG= (empty) turns it off
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
@@ -0,0 +1,226 @@
+"""
+Background email delivery
+
+mailer.send() writes the message to email_outbox and returns; worker threads
+deliver it over a kept-open SMTP connection, up to MAIL_BATCH_SIZE messages
+per wake-up, retrying with exponential backoff up to MAIL_MAX_RETRIES.
+
+recover() requeues pending mail on start. A worker claims a message by moving
+it to 'sending' with claimed_at; nobody else takes it until MAIL_CLAIM_LEASE
+has passed.
+
+For local testing point SMTP_HOST/SMTP_PORT at a debugging server, e.g.
+`python -m aiosmtpd -n -l localhost:8025` with SMTP_USE_TLS=false.
+"""
+
+import queue
+import random
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from sqlalchemy import and_, or_
+from models import db, EmailOutbox
+
+PENDING = ("queued", "retrying")
+
+
+class Mailer:
+    """Flask extension owning the outbound mail queue and its worker pool"""
+
+    def __init__(self, app=None, connection_factory=None):
+        self.app = None
+        self.connection_factory = connection_factory
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.worker_count = int(app.config.get("MAIL_WORKERS", 2))
+        self.batch_size = int(app.config.get("MAIL_BATCH_SIZE", 20))
+        self.max_retries = int(app.config.get("MAIL_MAX_RETRIES", 5))
+        self.retry_backoff = float(app.config.get("MAIL_RETRY_BACKOFF", 2.0))
+        self.idle_timeout = float(app.config.get("MAIL_IDLE_TIMEOUT", 30.0))
+        self.claim_lease = float(app.config.get("MAIL_CLAIM_LEASE", 900))
+        app.extensions["mailer"] = self
+
+    @property
+    def enabled(self):
+        return bool(self.app and (self.app.config.get("SMTP_HOST") or self.connection_factory))
+
+    def send(self, to_address, subject, body):
+        """Queue a plain-text email; returns the outbox row id"""
+        message = EmailOutbox(to_address=to_address, subject=subject, body=body)
+        db.session.add(message)
+        db.session.commit()
+        self._ensure_started()
+        self._queue.put(message.id)
+        return message.id
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def recover(self):
+        """Requeue mail a previous process accepted but never delivered"""
+        # Fresh database: the outbox appears with the next migration
+        if not self.enabled or not db.inspect(db.engine).has_table(EmailOutbox.__tablename__):
+            return 0
+        unsent = [row.id for row in EmailOutbox.query.with_entities(EmailOutbox.id)
+                  .filter(self._claimable()).order_by(EmailOutbox.id)]
+        if unsent:
+            self._ensure_started()
+            for message_id in unsent:
+                self._queue.put(message_id)
+        return len(unsent)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the workers after they finish their current batch"""
+        self._stopping.set()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        self._stopping.clear()
+
+    def _ensure_started(self):
+        # Threads start on first use so CLI scripts importing the app never spawn them
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.worker_count):
+                worker = threading.Thread(target=self._run, name=f"mailer-{index}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _connect(self):
+        if self.connection_factory:
+            return self.connection_factory()
+
+        config = self.app.config
+        host = config.get("SMTP_HOST")
+        port = int(config.get("SMTP_PORT") or 587)
+        if port == 465:
+            server = smtplib.SMTP_SSL(host, port, timeout=30)
+        else:
+            server = smtplib.SMTP(host, port, timeout=30)
+            if config.get("SMTP_USE_TLS", True):
+                server.starttls()
+
+        smtp_user = config.get("SMTP_USER")
+        smtp_pass = config.get("SMTP_PASS")
+        if smtp_user and smtp_pass:
+            server.login(smtp_user, smtp_pass)
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def _next_batch(self, connected):
+        """Block for the first id (timing out while a connection is held), then drain up to batch_size"""
+        try:
+            first = self._queue.get(timeout=self.idle_timeout if connected else None)
+        except queue.Empty:
+            return []
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        server = None
+        while True:
+            batch = self._next_batch(server is not None)
+            if not batch:
+                # Idle timeout: release the connection until more mail arrives
+                self._close(server)
+                server = None
+                continue
+
+            ids = [message_id for message_id in batch if message_id is not None]
+            if ids:
+                with self.app.app_context():
+                    server = self._deliver(server, ids)
+            if None in batch or self._stopping.is_set():
+                if server:
+                    self._close(server)
+                return
+
+    def _claimable(self):
+        """Pending messages, and ones whose sender's lease has run out"""
+        expired = datetime.utcnow() - timedelta(seconds=self.claim_lease)
+        return or_(
+            EmailOutbox.status.in_(PENDING),
+            and_(EmailOutbox.status == "sending", EmailOutbox.claimed_at < expired),
+        )
+
+    def _claim(self, ids):
+        """The messages among ids that this worker won, moved to 'sending' with attempts counted"""
+        won = []
+        for message_id in ids:
+            # Whichever UPDATE commits first leaves the row unclaimable for the others
+            if EmailOutbox.query.filter(EmailOutbox.id == message_id, self._claimable()).update(
+                {"status": "sending", "claimed_at": datetime.utcnow(), "attempts": EmailOutbox.attempts + 1},
+                synchronize_session=False,
+            ):
+                won.append(message_id)
+            db.session.commit()
+        if not won:
+            return []
+        return EmailOutbox.query.filter(EmailOutbox.id.in_(won)).order_by(EmailOutbox.id).all()
+
+    def _deliver(self, server, ids):
+        messages = self._claim(ids)
+        sender = self.app.config.get("EMAIL_FROM") or "no-reply@example.com"
+        retry = []
+
+        for message in messages:
+            try:
+                if server is None:
+                    server = self._connect()
+                email = EmailMessage()
+                email["Subject"] = message.subject
+                email["From"] = sender
+                email["To"] = message.to_address
+                email.set_content(message.body)
+                server.send_message(email)
+                message.status = "sent"
+                message.sent_at = datetime.utcnow()
+                message.last_error = None
+            except Exception as send_err:
+                # Drop the connection; the next message reconnects
+                if server is not None:
+                    self._close(server)
+                    server = None
+                message.last_error = str(send_err)[:255]
+                if message.attempts >= self.max_retries:
+                    message.status = "failed"
+                    self.app.logger.warning(f"Giving up on email {message.id}: {send_err}")
+                else:
+                    message.status = "retrying"
+                    retry.append((message.id, message.attempts))
+
+        db.session.commit()
+
+        for message_id, attempts in retry:
+            delay = self.retry_backoff * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            timer = threading.Timer(delay, self._queue.put, args=(message_id,))
+            timer.daemon = True
+            timer.start()
+        return server
+
+
+mailer = Mailer()
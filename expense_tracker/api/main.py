@@ -1,9 +1,17 @@
-from flask import Flask
+from flask import Flask, jsonify, Response
+from sqlalchemy import text
 from flask_cors import CORS
 from config import Config
 from models import db, bcrypt
+from cache import response_cache
+from mailer import mailer
+from passwords import password_hasher
+from tokens import token_auth
+from pool_metrics import pool_metrics
+from profiling import request_profiler
 from routes.auth import auth
 from routes.expenses import expenses
+from routes.budgets import budgets
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -12,16 +20,47 @@ CORS(app)
 
 db.init_app(app)
 bcrypt.init_app(app)
+response_cache.init_app(app)
+mailer.init_app(app)
+password_hasher.init_app(app)
+token_auth.init_app(app)
+pool_metrics.init_app(app)
+request_profiler.init_app(app, db)
 
 app.register_blueprint(auth)
 app.register_blueprint(expenses)
+app.register_blueprint(budgets)
 
 # Note: Schema is managed by Alembic migrations, not db.create_all()
 # Run 'alembic upgrade head' to apply migrations after starting a new database
+
+# Deliver mail left in the outbox by a previous process
+with app.app_context():
+    mailer.recover()
     
 @app.route("/")
 def home():
     return "Expense Tracker API is running"
 
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+@app.route("/healthz")
+def healthz():
+    try:
+        db.session.execute(text("SELECT 1"))
+    except Exception as e:
+        app.logger.warning(f"Health check failed: {e}")
+        return jsonify({"status": "error", "database": "unreachable"}), 503
+    return jsonify({"status": "ok"})
+
+@app.route("/metrics")
+def metrics():
+    body = pool_metrics.prometheus()
+    if request_profiler.enabled:
+        body += request_profiler.prometheus()
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     app.run(debug=True)
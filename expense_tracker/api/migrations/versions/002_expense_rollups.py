@@ -0,0 +1,40 @@
+"""Add expense_rollups table for pre-aggregated daily/monthly totals
+
+Revision ID: 002_expense_rollups
+Revises: 001_initial
+Create Date: 2026-10-18 09:00:00.000000
+
+After upgrading an existing database, populate the table with:
+    python db_init.py rollups
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_expense_rollups'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the expense_rollups table."""
+    op.create_table(
+        'expense_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(5), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(100), nullable=False),
+        sa.Column('total_amount', sa.DECIMAL(12, 2), nullable=False, server_default='0'),
+        sa.Column('expense_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'granularity', 'period_start', 'category', name='unique_rollup_bucket'),
+    )
+
+
+def downgrade() -> None:
+    """Drop the expense_rollups table."""
+    op.drop_table('expense_rollups')
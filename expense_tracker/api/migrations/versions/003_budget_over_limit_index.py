@@ -0,0 +1,34 @@
+"""Add partial index for over-budget lookups
+
+Revision ID: 003_budget_over_limit_index
+Revises: 002_expense_rollups
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_budget_over_limit_index'
+down_revision = '002_expense_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Index active budgets whose spend exceeds their limit."""
+    # Same expression as Budget.__table_args__ so the planner can match the predicate
+    over_limit = sa.and_(
+        sa.column('is_active').is_(True),
+        sa.column('spent_amount') > sa.column('limit_amount'),
+    )
+    op.create_index(
+        'ix_budgets_over_limit', 'budgets', ['user_id'],
+        sqlite_where=over_limit,
+        postgresql_where=over_limit,
+    )
+
+
+def downgrade() -> None:
+    """Drop the over-budget index."""
+    op.drop_index('ix_budgets_over_limit', table_name='budgets')
@@ -0,0 +1,27 @@
+"""Add composite indexes for per-user date range queries on expenses
+
+Revision ID: 004_expense_composite_indexes
+Revises: 003_budget_over_limit_index
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_expense_composite_indexes'
+down_revision = '003_budget_over_limit_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create (user_id, date, id) and (user_id, category_id, date) indexes."""
+    op.create_index('ix_expenses_user_date_id', 'expenses', ['user_id', 'date', 'id'])
+    op.create_index('ix_expenses_user_category_date', 'expenses', ['user_id', 'category_id', 'date'])
+
+
+def downgrade() -> None:
+    """Drop the composite indexes."""
+    op.drop_index('ix_expenses_user_category_date', table_name='expenses')
+    op.drop_index('ix_expenses_user_date_id', table_name='expenses')
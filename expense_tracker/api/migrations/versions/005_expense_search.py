@@ -0,0 +1,31 @@
+"""Add full-text search index over expense title, description and notes
+
+Revision ID: 005_expense_search
+Revises: 004_expense_composite_indexes
+Create Date: 2026-10-18 15:00:00.000000
+
+SQLite gets an FTS5 external-content table plus sync triggers; PostgreSQL a
+generated tsvector column with a GIN index. Existing rows are indexed during
+the upgrade. The DDL lives in models.ExpenseSearch so db.create_all() and this
+migration build the same index.
+
+"""
+from alembic import op
+
+from models import ExpenseSearch
+
+# revision identifiers, used by Alembic.
+revision = '005_expense_search'
+down_revision = '004_expense_composite_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create and backfill the expense search index."""
+    ExpenseSearch.install(op.get_bind())
+
+
+def downgrade() -> None:
+    """Drop the expense search index."""
+    ExpenseSearch.uninstall(op.get_bind())
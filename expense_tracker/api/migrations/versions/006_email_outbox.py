@@ -0,0 +1,39 @@
+"""Add email_outbox table for background email delivery
+
+Revision ID: 006_email_outbox
+Revises: 005_expense_search
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_email_outbox'
+down_revision = '005_expense_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the email_outbox table."""
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('to_address', sa.String(120), nullable=False),
+        sa.Column('subject', sa.String(255), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.String(255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_email_outbox_status', 'email_outbox', ['status'])
+
+
+def downgrade() -> None:
+    """Drop the email_outbox table."""
+    op.drop_index('ix_email_outbox_status', table_name='email_outbox')
+    op.drop_table('email_outbox')
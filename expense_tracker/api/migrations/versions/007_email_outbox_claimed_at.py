@@ -0,0 +1,27 @@
+"""Add claimed_at to email_outbox so a claimed message can be leased
+
+Revision ID: 007_email_outbox_claimed_at
+Revises: 006_email_outbox
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_email_outbox_claimed_at'
+down_revision = '006_email_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add the claimed_at column."""
+    with op.batch_alter_table('email_outbox') as batch_op:
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the claimed_at column."""
+    with op.batch_alter_table('email_outbox') as batch_op:
+        batch_op.drop_column('claimed_at')
@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
+from sqlalchemy import event, text
 from datetime import datetime
+import re
 import uuid
 
 db = SQLAlchemy()
@@ -118,6 +120,12 @@ class Expense(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Every read filters on user_id plus a date range; lists page on (date, id)
+        db.Index('ix_expenses_user_date_id', 'user_id', 'date', 'id'),
+        db.Index('ix_expenses_user_category_date', 'user_id', 'category_id', 'date'),
+    )
+    
     def __repr__(self):
         return f'<Expense {self.title} - ₹{self.amount}>'
     
@@ -134,6 +142,121 @@ class Expense(db.Model):
         }
 
 
+class ExpenseSearch:
+    """
+    Full-text index over expense title, description and notes.
+
+    SQLite uses an FTS5 external-content table kept in sync by triggers;
+    PostgreSQL uses a generated tsvector column with a GIN index. Either way the
+    index is updated by the database in the same statement as the expense write,
+    so ORM inserts, bulk inserts and deletes all stay in sync.
+    """
+    
+    SQLITE_DDL = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+            title, description, notes, content='expenses', content_rowid='id'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses BEGIN
+            INSERT INTO expenses_fts(rowid, title, description, notes)
+            VALUES (new.id, new.title, new.description, new.notes);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses BEGIN
+            INSERT INTO expenses_fts(expenses_fts, rowid, title, description, notes)
+            VALUES ('delete', old.id, old.title, old.description, old.notes);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS expenses_fts_au AFTER UPDATE OF title, description, notes ON expenses BEGIN
+            INSERT INTO expenses_fts(expenses_fts, rowid, title, description, notes)
+            VALUES ('delete', old.id, old.title, old.description, old.notes);
+            INSERT INTO expenses_fts(rowid, title, description, notes)
+            VALUES (new.id, new.title, new.description, new.notes);
+        END""",
+        "INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')",
+    ]
+    SQLITE_DROP_DDL = [
+        "DROP TRIGGER IF EXISTS expenses_fts_au",
+        "DROP TRIGGER IF EXISTS expenses_fts_ad",
+        "DROP TRIGGER IF EXISTS expenses_fts_ai",
+        "DROP TABLE IF EXISTS expenses_fts",
+    ]
+    POSTGRES_DDL = [
+        """ALTER TABLE expenses ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(notes, '')), 'C')
+            ) STORED""",
+        "CREATE INDEX IF NOT EXISTS ix_expenses_search_vector ON expenses USING GIN (search_vector)",
+    ]
+    POSTGRES_DROP_DDL = [
+        "DROP INDEX IF EXISTS ix_expenses_search_vector",
+        "ALTER TABLE expenses DROP COLUMN IF EXISTS search_vector",
+    ]
+    
+    SQLITE_QUERY = """
+        SELECT e.id, e.title, e.amount, e.category, e.date,
+               bm25(expenses_fts, 10.0, 2.0, 1.0) AS rank
+        FROM expenses_fts
+        JOIN expenses e ON e.id = expenses_fts.rowid
+        WHERE expenses_fts MATCH :query AND e.user_id = :user_id
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """
+    POSTGRES_QUERY = """
+        SELECT e.id, e.title, e.amount, e.category, e.date,
+               ts_rank(e.search_vector, q) AS rank
+        FROM expenses e, to_tsquery('english', :query) q
+        WHERE e.user_id = :user_id AND e.search_vector @@ q
+        ORDER BY rank DESC, e.id DESC
+        LIMIT :limit OFFSET :offset
+    """
+    
+    @classmethod
+    def install(cls, connection):
+        """Create the index (and backfill it) on the given connection"""
+        ddl = cls.POSTGRES_DDL if connection.dialect.name == "postgresql" else cls.SQLITE_DDL
+        for statement in ddl:
+            connection.exec_driver_sql(statement)
+    
+    @classmethod
+    def uninstall(cls, connection):
+        ddl = cls.POSTGRES_DROP_DDL if connection.dialect.name == "postgresql" else cls.SQLITE_DROP_DDL
+        for statement in ddl:
+            connection.exec_driver_sql(statement)
+    
+    @staticmethod
+    def match_query(raw, dialect_name):
+        """Turn free text into a safe AND query with prefix matching on the last word"""
+        words = re.findall(r"\w+", raw.lower())
+        if not words:
+            return None
+        if dialect_name == "postgresql":
+            return " & ".join(words[:-1] + [words[-1] + ":*"])
+        return " ".join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+    
+    @classmethod
+    def search(cls, user_id, raw, limit=20, offset=0):
+        """Ranked matches for one user, best first"""
+        dialect_name = db.engine.dialect.name
+        query = cls.match_query(raw, dialect_name)
+        if query is None:
+            return []
+        sql = cls.POSTGRES_QUERY if dialect_name == "postgresql" else cls.SQLITE_QUERY
+        return db.session.execute(
+            text(sql).columns(amount=db.DECIMAL(10, 2), date=db.Date),
+            {"query": query, "user_id": user_id, "limit": limit, "offset": offset}
+        ).all()
+
+
+@event.listens_for(Expense.__table__, "after_create")
+def _install_expense_search(target, connection, **kw):
+    ExpenseSearch.install(connection)
+
+
+@event.listens_for(Expense.__table__, "before_drop")
+def _uninstall_expense_search(target, connection, **kw):
+    ExpenseSearch.uninstall(connection)
+
+
 class Budget(db.Model):
     """Budget model for tracking budget limits"""
     __tablename__ = 'budgets'
@@ -160,6 +283,15 @@ class Budget(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Partial index so "over budget" lookups never scan a user's budgets
+        db.Index(
+            'ix_budgets_over_limit', 'user_id',
+            sqlite_where=db.and_(is_active.is_(True), spent_amount > limit_amount),
+            postgresql_where=db.and_(is_active.is_(True), spent_amount > limit_amount)
+        ),
+    )
+    
     def __repr__(self):
         return f'<Budget {self.name}>'
     
@@ -167,8 +299,80 @@ class Budget(db.Model):
         return {
             'id': self.id,
             'name': self.name,
+            'category_id': self.category_id,
             'limit_amount': float(self.limit_amount),
-            'spent_amount': float(self.spent_amount),
+            'spent_amount': float(self.spent_amount or 0),
+            'currency': self.currency,
             'period': self.period,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
             'is_active': self.is_active
         }
+
+
+class ExpenseRollup(db.Model):
+    """Pre-aggregated expense totals per user, category and day/month"""
+    __tablename__ = 'expense_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    # Bucket
+    granularity = db.Column(db.String(5), nullable=False)  # day, month
+    period_start = db.Column(db.Date, nullable=False)  # the day, or the first of the month
+    category = db.Column(db.String(100), nullable=False)
+    
+    # Aggregates
+    total_amount = db.Column(db.DECIMAL(12, 2), nullable=False, default=0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'granularity', 'period_start', 'category', name='unique_rollup_bucket'),
+    )
+    
+    def __repr__(self):
+        return f'<ExpenseRollup {self.granularity} {self.period_start} {self.category}>'
+    
+    def to_dict(self):
+        return {
+            'granularity': self.granularity,
+            'period_start': self.period_start.isoformat(),
+            'category': self.category,
+            'total_amount': float(self.total_amount),
+            'expense_count': self.expense_count
+        }
+
+
+class EmailOutbox(db.Model):
+    """Outbound email queued for background delivery"""
+    __tablename__ = 'email_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    to_address = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    
+    # Delivery status
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, sending, retrying, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(255), nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)  # when a worker took it for sending
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<EmailOutbox {self.to_address} {self.status}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'to_address': self.to_address,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
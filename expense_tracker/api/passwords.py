@@ -0,0 +1,126 @@
+"""
+Password hashing off the request threads
+
+bcrypt is CPU-bound, so hashing on request threads stalls the whole worker
+during a login burst. PasswordHasher runs it in a bounded process pool: past
+HASH_MAX_PENDING queued or running jobs, or after HASH_TIMEOUT, callers get
+HashingBusy and the route answers 503. HASH_WORKERS=0 hashes inline (CLI
+scripts, tests). Hashes made with another BCRYPT_LOG_ROUNDS are upgraded at
+the user's next login.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+# bcrypt only looks at the first 72 bytes; newer releases refuse longer input
+BCRYPT_MAX_BYTES = 72
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+def _to_bytes(value):
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def _hash(password, rounds):
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(_to_bytes(password)[:BCRYPT_MAX_BYTES], salt).decode("utf-8")
+
+
+def _verify(password, hashed):
+    try:
+        return bcrypt.checkpw(_to_bytes(password)[:BCRYPT_MAX_BYTES], _to_bytes(hashed))
+    except ValueError:
+        # Malformed stored hash
+        return False
+
+
+class PasswordHasher:
+    """Flask extension wrapping bcrypt with a bounded process pool"""
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.workers = 0
+        self.max_pending = 0
+        self.timeout = 10.0
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rounds = int(app.config.get("BCRYPT_LOG_ROUNDS", 12))
+        self.configure(
+            workers=int(app.config.get("HASH_WORKERS", 0)),
+            max_pending=app.config.get("HASH_MAX_PENDING"),
+            timeout=float(app.config.get("HASH_TIMEOUT", 10.0))
+        )
+        app.extensions["password_hasher"] = self
+
+    def configure(self, workers, max_pending=None, timeout=None):
+        """(Re)size the pool; max_pending defaults to four jobs per worker"""
+        self.shutdown()
+        self.workers = workers
+        self.max_pending = int(max_pending or workers * 4)
+        if timeout is not None:
+            self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending) if workers else None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _pool(self):
+        # Processes start on first use so importing the app stays cheap
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job is done, not until this caller stops waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy() from None
+
+    def hash(self, password):
+        """bcrypt hash at the configured cost, as a str"""
+        if not password:
+            raise ValueError("Password must be non-empty.")
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password, hashed):
+        return bool(password and hashed) and self._run(_verify, password, hashed)
+
+    def needs_rehash(self, hashed):
+        """True when the stored hash was made with a different cost"""
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,102 @@
+"""
+Connection pool instrumentation for /metrics
+
+Records how long requests wait to check a connection out of the pool; a
+rising wait means DB_POOL_SIZE + DB_MAX_OVERFLOW is too small for the threads
+using it. TimedQueuePool (the PostgreSQL and development poolclass) times the
+waits; other pools report only their counters. Numbers are per process.
+"""
+
+import threading
+import time
+from collections import deque
+from sqlalchemy.pool import QueuePool
+
+# Recent checkout waits kept for the percentiles
+WINDOW = 2048
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile, pct from 0 to 100; 0.0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class PoolMetrics:
+    """Flask extension timing pool checkouts on the app's engine"""
+
+    def __init__(self, app=None):
+        self.engine = None
+        self.checkouts = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._recent = deque(maxlen=WINDOW)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Call after db.init_app; engines are created there"""
+        from models import db
+        with app.app_context():
+            self.engine = db.engine
+        app.extensions["pool_metrics"] = self
+
+    def _record(self, waited, failed=False):
+        with self._lock:
+            self.checkouts += 1
+            self.errors += failed
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self._recent.append(waited)
+
+    def stats(self):
+        pool = self.engine.pool
+        with self._lock:
+            recent = list(self._recent)
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_errors": self.errors,
+                "checkout_wait_seconds_total": round(self.wait_total, 6),
+                "checkout_wait_seconds_max": round(self.wait_max, 6),
+            }
+        stats["checkout_wait_seconds_p50"] = round(percentile(recent, 50), 6)
+        stats["checkout_wait_seconds_p99"] = round(percentile(recent, 99), 6)
+        # QueuePool exposes live counters; SQLite's static/singleton pools do not
+        for name in ("size", "checkedout", "checkedin", "overflow"):
+            value = getattr(pool, name, None)
+            if callable(value):
+                stats[f"pool_{name}"] = value()
+        return stats
+
+    def prometheus(self):
+        """stats() in the Prometheus text exposition format"""
+        lines = []
+        for name, value in self.stats().items():
+            metric = f"db_{name}"
+            kind = "counter" if name.endswith("_total") or name in ("checkouts", "checkout_errors") else "gauge"
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool reporting each checkout's wait to pool_metrics"""
+
+    def _do_get(self):
+        # _do_get is the hook Pool subclasses implement; a checkout waits in here
+        start = time.perf_counter()
+        failed = False
+        try:
+            return super()._do_get()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            pool_metrics._record(time.perf_counter() - start, failed)
+
+
+pool_metrics = PoolMetrics()
@@ -0,0 +1,154 @@
+"""
+Incrementally maintained expense rollups
+
+Every write path that inserts or deletes expenses calls apply_expense_deltas()
+before committing, so the expense_rollups table always moves in the same
+transaction as the raw rows. Summary reads then scan one row per
+(day or month, category) instead of one row per expense.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import insert, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Expense, ExpenseRollup
+
+UNCATEGORIZED = "Uncategorized"
+
+
+def month_start(column):
+    """SQL expression for the first day of the month containing a date column"""
+    if db.engine.dialect.name == "postgresql":
+        return db.cast(db.func.date_trunc("month", column), db.Date)
+    return db.func.date(column, "start of month")
+
+
+def period_starts(day):
+    if isinstance(day, datetime):
+        day = day.date()
+    return {"day": day, "month": day.replace(day=1)}
+
+
+def apply_expense_deltas(rows, sign=1):
+    """
+    Fold (user_id, category, date, amount) tuples into the rollups.
+
+    Use sign=1 for inserted expenses and sign=-1 for deleted ones. Nothing is
+    committed here; the caller's commit covers both the expenses and the rollups.
+    """
+    deltas = defaultdict(lambda: [Decimal("0"), 0])
+    for user_id, category, day, amount in rows:
+        for granularity, start in period_starts(day).items():
+            key = (int(user_id), granularity, start, category or UNCATEGORIZED)
+            deltas[key][0] += Decimal(str(amount)) * sign
+            deltas[key][1] += sign
+
+    if not deltas:
+        return
+
+    values = [
+        {
+            "user_id": user_id,
+            "granularity": granularity,
+            "period_start": start,
+            "category": category,
+            "total_amount": total,
+            "expense_count": count,
+        }
+        for (user_id, granularity, start, category), (total, count) in deltas.items()
+    ]
+    _upsert(values)
+
+    if sign < 0:
+        # Drop buckets whose last expense was removed
+        user_ids = {value["user_id"] for value in values}
+        ExpenseRollup.query.filter(
+            ExpenseRollup.user_id.in_(user_ids),
+            ExpenseRollup.expense_count <= 0
+        ).delete(synchronize_session=False)
+
+
+def _upsert(values):
+    dialect = db.engine.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(ExpenseRollup).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "granularity", "period_start", "category"],
+            set_={
+                "total_amount": ExpenseRollup.total_amount + stmt.excluded.total_amount,
+                "expense_count": ExpenseRollup.expense_count + stmt.excluded.expense_count,
+            }
+        )
+        db.session.execute(stmt)
+        return
+
+    # Portable fallback: one lookup per bucket
+    for value in values:
+        rollup = ExpenseRollup.query.filter_by(
+            user_id=value["user_id"],
+            granularity=value["granularity"],
+            period_start=value["period_start"],
+            category=value["category"]
+        ).first()
+        if rollup:
+            rollup.total_amount += value["total_amount"]
+            rollup.expense_count += value["expense_count"]
+        else:
+            db.session.add(ExpenseRollup(**value))
+    db.session.flush()
+
+
+def _raw_aggregates(granularity):
+    """GROUP BY over raw expenses matching the rollup key for one granularity"""
+    bucket = Expense.date if granularity == "day" else month_start(Expense.date)
+    category = db.func.coalesce(Expense.category, UNCATEGORIZED)
+    return (
+        db.select(
+            Expense.user_id,
+            literal(granularity),
+            bucket,
+            category,
+            db.func.sum(Expense.amount),
+            db.func.count(Expense.id)
+        )
+        .group_by(Expense.user_id, bucket, category)
+    )
+
+
+def rebuild_rollups():
+    """Recompute every rollup from raw expenses in one transaction"""
+    ExpenseRollup.query.delete(synchronize_session=False)
+    for granularity in ("day", "month"):
+        db.session.execute(
+            insert(ExpenseRollup).from_select(
+                ["user_id", "granularity", "period_start", "category", "total_amount", "expense_count"],
+                _raw_aggregates(granularity)
+            )
+        )
+    db.session.commit()
+
+
+def check_rollups():
+    """Compare rollups with raw expenses; return a list of mismatch descriptions"""
+    mismatches = []
+    for granularity in ("day", "month"):
+        raw = {}
+        for user_id, _, start, category, total, count in db.session.execute(_raw_aggregates(granularity)):
+            if isinstance(start, str):
+                start = datetime.strptime(start, "%Y-%m-%d").date()
+            raw[(user_id, start, category)] = (Decimal(str(total)).quantize(Decimal("0.01")), count)
+
+        stored = {
+            (r.user_id, r.period_start, r.category): (Decimal(str(r.total_amount)).quantize(Decimal("0.01")), r.expense_count)
+            for r in ExpenseRollup.query.filter_by(granularity=granularity)
+        }
+
+        for key in raw.keys() | stored.keys():
+            if raw.get(key) != stored.get(key):
+                mismatches.append(
+                    f"{granularity} user={key[0]} period={key[1]} category={key[2]}: "
+                    f"raw={raw.get(key)} rollup={stored.get(key)}"
+                )
+    return mismatches
@@ -1,9 +1,10 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from sqlalchemy.exc import IntegrityError
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
-from email.message import EmailMessage
-import smtplib
-from models import db, bcrypt, User
+from models import db, User
+from mailer import mailer
+from passwords import password_hasher, HashingBusy
+from tokens import token_auth, token_required, InvalidToken
 import re
 
 auth = Blueprint('auth', __name__)
@@ -40,7 +41,10 @@ def register():
     if existing:
         return jsonify({"error": "User already exists"}), 409
 
-    hashed = bcrypt.generate_password_hash(password).decode("utf-8")
+    try:
+        hashed = password_hasher.hash(password)
+    except HashingBusy:
+        return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
     user = User(username=username, email=email, password_hash=hashed)
     try:
         db.session.add(user)
@@ -58,40 +62,19 @@ def register():
             frontend_base = current_app.config.get("FRONTEND_URL") or "http://localhost:5173"
             frontend_verify = f"{frontend_base}/verify-email?token={token}"
 
-            # Attempt to send email if SMTP config present; otherwise include demo link in response
-            smtp_host = current_app.config.get("SMTP_HOST")
-            if smtp_host:
+            # Queue the email for background delivery if SMTP is configured;
+            # either way include the link so testing can continue
+            if mailer.enabled:
                 try:
-                    msg = EmailMessage()
-                    msg["Subject"] = "Verify your ExpenseTracker email"
-                    msg["From"] = current_app.config.get("EMAIL_FROM") or "no-reply@example.com"
-                    msg["To"] = email
-                    msg.set_content(f"Hi {username},\n\nPlease verify your email by visiting the following link:\n{frontend_verify}\n\nIf you didn't request this, ignore this message.")
-
-                    port = int(current_app.config.get("SMTP_PORT") or 587)
-                    smtp_user = current_app.config.get("SMTP_USER")
-                    smtp_pass = current_app.config.get("SMTP_PASS")
-
-                    if port == 465:
-                        server = smtplib.SMTP_SSL(smtp_host, port)
-                    else:
-                        server = smtplib.SMTP(smtp_host, port)
-                        server.starttls()
-
-                    if smtp_user and smtp_pass:
-                        server.login(smtp_user, smtp_pass)
-
-                    server.send_message(msg)
-                    server.quit()
-                    # Indicate that we sent an email (don't include token in response in prod)
-                    verification_link = frontend_verify
-                except Exception as send_err:
-                    # If sending fails, fall back to returning the demo link so testing can continue
-                    current_app.logger.warning(f"Failed to send verification email: {send_err}")
-                    verification_link = frontend_verify
-            else:
-                # No SMTP configured — return the demo frontend verify link for testing
-                verification_link = frontend_verify
+                    mailer.send(
+                        email,
+                        "Verify your ExpenseTracker email",
+                        f"Hi {username},\n\nPlease verify your email by visiting the following link:\n{frontend_verify}\n\nIf you didn't request this, ignore this message."
+                    )
+                except Exception as queue_err:
+                    db.session.rollback()
+                    current_app.logger.warning(f"Failed to queue verification email: {queue_err}")
+            verification_link = frontend_verify
 
         payload = {"message": "User registered", "user_id": user.id}
         if verification_link:
@@ -138,6 +121,30 @@ def verify_email():
 def login():
     data = request.json
     user = User.query.filter_by(username=data["username"]).first()
-    if user and bcrypt.check_password_hash(user.password_hash, data["password"]):
-        return jsonify({"message": "Login successful", "user_id": user.id})
+    try:
+        if user and password_hasher.verify(data["password"], user.password_hash):
+            # Upgrade hashes made with an older cost factor while we have the plaintext
+            if password_hasher.needs_rehash(user.password_hash):
+                user.password_hash = password_hasher.hash(data["password"])
+                db.session.commit()
+            return jsonify({"message": "Login successful", "user_id": user.id, **token_auth.issue(user.id)})
+    except HashingBusy:
+        db.session.rollback()
+        return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
     return jsonify({"error": "Invalid credentials"}), 401
+
+@auth.route("/api/token/refresh", methods=["POST"])
+def refresh_token():
+    data = request.get_json(silent=True) or {}
+    try:
+        user_id = token_auth.verify(data.get("refresh_token") or "", kind="refresh")
+    except InvalidToken as e:
+        return jsonify({"error": str(e)}), 401
+    return jsonify({"user_id": user_id, **token_auth.issue(user_id)})
+
+@auth.route("/api/logout", methods=["POST"])
+@token_required
+def logout():
+    if g.user_id is not None:
+        token_auth.revoke_user(g.user_id)
+    return jsonify({"message": "Logged out"})
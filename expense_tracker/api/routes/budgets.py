@@ -0,0 +1,73 @@
+from flask import Blueprint, request, jsonify, g
+from models import db, Budget
+from budgets import PERIODS, period_end, recompute_spent, over_budget_query
+from tokens import token_required
+from datetime import datetime, date
+
+budgets = Blueprint("budgets", __name__)
+
+@budgets.route("/api/budget/add", methods=["POST"])
+@token_required
+def add_budget():
+    try:
+        data = request.json
+        if data and g.user_id is not None:
+            if data.get("user_id") and str(data["user_id"]) != str(g.user_id):
+                return jsonify({"error": "Forbidden"}), 403
+            data["user_id"] = g.user_id
+        if not data or not data.get("name") or not data.get("limit_amount") or not data.get("user_id"):
+            return jsonify({"error": "Missing required fields: name, limit_amount, user_id"}), 400
+
+        period = data.get("period", "monthly")
+        if period not in PERIODS:
+            return jsonify({"error": f"period must be one of: {', '.join(PERIODS)}"}), 400
+
+        start_date = datetime.strptime(data["start_date"], "%Y-%m-%d").date() if data.get("start_date") else date.today()
+        end_date = datetime.strptime(data["end_date"], "%Y-%m-%d").date() if data.get("end_date") else period_end(start_date, period)
+
+        budget = Budget(
+            user_id=int(data["user_id"]),
+            category_id=int(data["category_id"]) if data.get("category_id") else None,
+            name=data["name"],
+            limit_amount=float(data["limit_amount"]),
+            currency=data.get("currency", "INR"),
+            period=period,
+            start_date=start_date,
+            end_date=end_date
+        )
+        db.session.add(budget)
+        db.session.flush()
+
+        # Seed spent_amount once; expense writes keep it current from here on
+        recompute_spent([budget.id])
+        db.session.commit()
+        db.session.refresh(budget)
+        return jsonify({"message": "Budget added", "budget": budget.to_dict()}), 201
+    except ValueError as e:
+        return jsonify({"error": f"Invalid data format: {str(e)}"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Failed to add budget: {str(e)}"}), 500
+
+@budgets.route("/api/budgets/<int:user_id>")
+@token_required
+def get_budgets(user_id):
+    query = Budget.query.filter_by(user_id=user_id)
+    if request.args.get("include_inactive") != "true":
+        query = query.filter(Budget.is_active.is_(True))
+    return jsonify([b.to_dict() for b in query.order_by(Budget.id).all()])
+
+@budgets.route("/api/budgets/<int:user_id>/over")
+@token_required
+def get_over_budget(user_id):
+    return jsonify([b.to_dict() for b in over_budget_query(user_id).all()])
+
+@budgets.route("/api/budget/delete/<int:id>", methods=["DELETE"])
+@token_required
+def delete_budget(id):
+    budget = Budget.query.get(id)
+    if not budget or (g.user_id is not None and budget.user_id != g.user_id):
+        return jsonify({"error": "Budget not found"}), 404
+    db.session.delete(budget)
+    db.session.commit()
+    return jsonify({"message": "Deleted"})
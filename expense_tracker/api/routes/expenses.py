@@ -1,25 +1,211 @@
-from flask import Blueprint, request, jsonify
-from models import db, Expense
-from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app, g
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Category, Expense, ExpenseRollup, ExpenseSearch
+from rollups import apply_expense_deltas
+from budgets import apply_budget_deltas
+from cache import response_cache, cached_user_view
+from tokens import token_required
+from collections import defaultdict
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+import base64
+import csv
+import io
+import json
 
 expenses = Blueprint("expenses", __name__)
 
+# Columns a client may request through ?fields=
+EXPENSE_FIELDS = {
+    "id": Expense.id,
+    "title": Expense.title,
+    "amount": Expense.amount,
+    "category": Expense.category,
+    "category_id": Expense.category_id,
+    "date": Expense.date,
+    "currency": Expense.currency,
+    "description": Expense.description,
+    "notes": Expense.notes,
+    "receipt_url": Expense.receipt_url,
+    "is_recurring": Expense.is_recurring,
+    "created_at": Expense.created_at,
+}
+DEFAULT_FIELDS = ["id", "title", "amount", "category", "date"]
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_SIZE = 1000
+MAX_BULK_BATCH_SIZE = 10000
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+def apply_date_filters(query, start_date, end_date):
+    """Restrict an Expense query to the optional YYYY-MM-DD start/end bounds"""
+    if start_date:
+        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
+        query = query.filter(Expense.date >= start_date_obj)
+
+    if end_date:
+        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
+        query = query.filter(Expense.date <= end_date_obj)
+
+    return query
+
+def date_bucket(column, period):
+    """SQL expression labelling a date column with its week start or month"""
+    if db.engine.dialect.name == "postgresql":
+        if period == "week":
+            return db.func.to_char(db.func.date_trunc("week", column), "YYYY-MM-DD")
+        return db.func.to_char(column, "YYYY-MM")
+
+    # SQLite: move forward to Sunday, then back to that week's Monday
+    if period == "week":
+        return db.func.date(column, "weekday 0", "-6 days")
+    return db.func.strftime("%Y-%m", column)
+
+def encode_cursor(expense_date, expense_id):
+    """Opaque keyset cursor pointing at the last (date, id) of a page"""
+    raw = json.dumps([expense_date.isoformat(), expense_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        expense_date, expense_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.strptime(expense_date, "%Y-%m-%d").date(), int(expense_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_fields(fields):
+    """Validate a comma separated ?fields= value against EXPENSE_FIELDS"""
+    if not fields:
+        return DEFAULT_FIELDS
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in EXPENSE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+def serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+def track_expense_changes(changed, sign=1):
+    """Keep rollups and budget spend in step with inserted (sign=1) or deleted (sign=-1) expenses"""
+    changed = list(changed)
+    apply_expense_deltas([(e["user_id"], e["category"], e["date"], e["amount"]) for e in changed], sign)
+    apply_budget_deltas([(e["user_id"], e.get("category_id"), e["date"], e["amount"]) for e in changed], sign)
+
+def expense_change(expense):
+    return {
+        "user_id": expense.user_id,
+        "category": expense.category,
+        "category_id": expense.category_id,
+        "date": expense.date,
+        "amount": expense.amount
+    }
+
+def fill_category_ids(rows):
+    """Give rows without a category_id the id of their user's category of the same name"""
+    # The frontend sends only the name, and budgets match on category_id
+    wanted = defaultdict(set)
+    for row in rows:
+        if row["category_id"] is None:
+            wanted[row["user_id"]].add(row["category"])
+    for user_id, names in wanted.items():
+        ids = dict(Category.query.with_entities(Category.name, Category.id).filter(
+            Category.user_id == user_id, Category.name.in_(names)
+        ).all())
+        for row in rows:
+            if row["category_id"] is None and row["user_id"] == user_id:
+                row["category_id"] = ids.get(row["category"])
+
+def validate_bulk_rows(rows, default_user_id=None, allowed_user_id=None):
+    """Split raw bulk rows into insertable mappings and per-row errors"""
+    valid = []
+    errors = []
+    for index, raw in enumerate(rows):
+        if not isinstance(raw, dict):
+            errors.append({"row": index, "error": "Row must be an object"})
+            continue
+
+        missing = [key for key in ("title", "amount", "date") if not raw.get(key)]
+        user_id = raw.get("user_id") or default_user_id
+        if not user_id:
+            missing.append("user_id")
+        if missing:
+            errors.append({"row": index, "error": f"Missing required fields: {', '.join(missing)}"})
+            continue
+        if allowed_user_id is not None and str(user_id) != str(allowed_user_id):
+            errors.append({"row": index, "error": "user_id does not match the authenticated user"})
+            continue
+
+        try:
+            amount = Decimal(str(raw["amount"]).strip())
+            if not amount.is_finite():
+                raise InvalidOperation()
+            valid.append({
+                "row": index,
+                "user_id": int(user_id),
+                "title": str(raw["title"]).strip()[:100],
+                "amount": amount.quantize(Decimal("0.01")),
+                "category": raw.get("category") or "Other",
+                "category_id": int(raw["category_id"]) if raw.get("category_id") else None,
+                "date": datetime.strptime(str(raw["date"]).strip(), "%Y-%m-%d").date(),
+                "description": raw.get("description") or None,
+            })
+        except (ValueError, InvalidOperation):
+            errors.append({"row": index, "error": "Invalid data format: amount must be a number, date YYYY-MM-DD"})
+
+    return valid, errors
+
+def read_bulk_payload():
+    """Rows from an uploaded CSV file or a JSON body, plus an optional shared user_id"""
+    upload = request.files.get("file")
+    if upload:
+        text = io.TextIOWrapper(upload.stream, encoding="utf-8-sig")
+        return list(csv.DictReader(text)), request.form.get("user_id")
+
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        return data, None
+    if isinstance(data, dict) and isinstance(data.get("expenses"), list):
+        return data["expenses"], data.get("user_id")
+    raise ValueError("Expected a JSON array, {\"user_id\", \"expenses\"} or a CSV file upload")
+
 @expenses.route("/api/expense/add", methods=["POST"])
+@token_required
 def add_expense():
     try:
         data = request.json
+        if data and g.user_id is not None:
+            # The token decides whose expense this is
+            if data.get("user_id") and str(data["user_id"]) != str(g.user_id):
+                return jsonify({"error": "Forbidden"}), 403
+            data["user_id"] = g.user_id
         if not data or not data.get("title") or not data.get("amount") or not data.get("user_id") or not data.get("date"):
             return jsonify({"error": "Missing required fields: title, amount, user_id, date"}), 400
         
+        row = {
+            "user_id": int(data["user_id"]),
+            "category": data.get("category", "Other"),
+            "category_id": int(data["category_id"]) if data.get("category_id") else None
+        }
+        fill_category_ids([row])
         expense = Expense(
             title=data["title"],
             amount=float(data["amount"]),
-            category=data.get("category", "Other"),
+            category=row["category"],
+            category_id=row["category_id"],
             date=datetime.strptime(data["date"], "%Y-%m-%d"),
-            user_id=int(data["user_id"])
+            user_id=row["user_id"]
         )
         db.session.add(expense)
+        track_expense_changes([expense_change(expense)])
         db.session.commit()
+        response_cache.bump_user(expense.user_id)
         return jsonify({"message": "Expense added", "id": expense.id}), 201
     except ValueError as e:
         return jsonify({"error": f"Invalid data format: {str(e)}"}), 400
@@ -27,40 +213,253 @@ def add_expense():
         db.session.rollback()
         return jsonify({"error": f"Failed to add expense: {str(e)}"}), 500
 
+@expenses.route("/api/expenses/bulk", methods=["POST"])
+@token_required
+def bulk_add_expenses():
+    try:
+        rows, default_user_id = read_bulk_payload()
+        batch_size = int(request.args.get("batch_size") or current_app.config.get("BULK_INSERT_BATCH_SIZE", 1000))
+        if batch_size < 1 or batch_size > MAX_BULK_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BULK_BATCH_SIZE}")
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"error": str(e)}), 400
+
+    if g.user_id is not None:
+        default_user_id = g.user_id
+    valid, errors = validate_bulk_rows(rows, default_user_id, allowed_user_id=g.user_id)
+    fill_category_ids(valid)
+
+    # One multi-row INSERT and one commit per batch
+    inserted = 0
+    for offset in range(0, len(valid), batch_size):
+        batch = valid[offset:offset + batch_size]
+        try:
+            db.session.execute(
+                insert(Expense),
+                [{key: value for key, value in row.items() if key != "row"} for row in batch]
+            )
+            track_expense_changes(batch)
+            db.session.commit()
+            response_cache.bump_user(*(row["user_id"] for row in batch))
+            inserted += len(batch)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            message = f"Batch failed: {e.__class__.__name__}"
+            errors.extend({"row": row["row"], "error": message} for row in batch)
+
+    errors.sort(key=lambda error: error["row"])
+    status = 201 if not errors else (207 if inserted else 400)
+    return jsonify({"received": len(rows), "inserted": inserted, "errors": errors}), status
+
 @expenses.route("/api/expenses/<int:user_id>")
+@token_required
+@cached_user_view
 def get_expenses(user_id):
-    from datetime import datetime
-    
     # Get optional query parameters for date filtering
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    
-    query = Expense.query.filter_by(user_id=user_id)
-    
-    # Apply date filters if provided
-    if start_date:
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-        query = query.filter(Expense.date >= start_date_obj)
-    
-    if end_date:
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
-        query = query.filter(Expense.date <= end_date_obj)
-    
-    expenses_list = query.all()
-    output = []
-    for e in expenses_list:
-        output.append({
-            "id": e.id,
-            "title": e.title,
-            "amount": e.amount,
-            "category": e.category,
-            "date": e.date.strftime("%Y-%m-%d")
-        })
-    return jsonify(output)
+
+    # Keyset pagination is opt-in so existing callers still receive a plain list
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit')
+    paginate = cursor is not None or limit is not None
+
+    try:
+        names = parse_fields(request.args.get('fields'))
+        if paginate:
+            limit = int(limit) if limit else DEFAULT_PAGE_SIZE
+            if limit < 1 or limit > MAX_PAGE_SIZE:
+                raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        # Select only the requested columns (plus the keyset) instead of full ORM objects
+        columns = [EXPENSE_FIELDS[name].label(name) for name in names]
+        query = db.session.query(*columns, Expense.date.label("cursor_date"), Expense.id.label("cursor_id"))
+        query = query.filter(Expense.user_id == user_id)
+
+        # Apply date filters if provided
+        query = apply_date_filters(query, start_date, end_date)
+
+        if cursor:
+            last_date, last_id = decode_cursor(cursor)
+            query = query.filter(db.or_(
+                Expense.date < last_date,
+                db.and_(Expense.date == last_date, Expense.id < last_id)
+            ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = query.order_by(Expense.date.desc(), Expense.id.desc())
+    if paginate:
+        query = query.limit(limit + 1)
+
+    rows = query.all()
+    next_cursor = None
+    if paginate and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].cursor_date, rows[-1].cursor_id)
+
+    output = [
+        {name: serialize_value(getattr(row, name)) for name in names}
+        for row in rows
+    ]
+    if not paginate:
+        return jsonify(output)
+    return jsonify({"items": output, "next_cursor": next_cursor})
+
+@expenses.route("/api/expenses/<int:user_id>/summary")
+@token_required
+@cached_user_view
+def get_expense_summary(user_id):
+    # Same optional date window as the list endpoint
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+
+    try:
+        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date format: {str(e)}"}), 400
+
+    # Served from expense_rollups: one row per (day or month, category)
+    def rollups(granularity):
+        query = db.session.query().select_from(ExpenseRollup).filter(
+            ExpenseRollup.user_id == user_id,
+            ExpenseRollup.granularity == granularity
+        )
+        if start_date_obj:
+            query = query.filter(ExpenseRollup.period_start >= start_date_obj)
+        if end_date_obj:
+            query = query.filter(ExpenseRollup.period_start <= end_date_obj)
+        return query
+
+    daily = rollups("day")
+    # Whole months are exact only without a date window
+    monthly = daily if start_date_obj or end_date_obj else rollups("month")
+
+    total = db.func.sum(ExpenseRollup.total_amount)
+    count = db.func.sum(ExpenseRollup.expense_count)
+
+    def grouped(base, key):
+        rows = base.with_entities(key.label("key"), total, count).group_by(key).order_by(key).all()
+        return [
+            {"key": k if isinstance(k, str) else k.isoformat(),
+             "total": float(t or 0),
+             "count": int(c or 0)}
+            for k, t, c in rows
+        ]
+
+    by_category = grouped(monthly, ExpenseRollup.category)
+    by_day = grouped(daily, ExpenseRollup.period_start)
+    by_week = grouped(daily, date_bucket(ExpenseRollup.period_start, "week"))
+    by_month = grouped(monthly, date_bucket(ExpenseRollup.period_start, "month"))
+
+    return jsonify({
+        "total": round(sum(row["total"] for row in by_category), 2),
+        "count": sum(row["count"] for row in by_category),
+        "by_category": by_category,
+        "by_day": by_day,
+        "by_week": by_week,
+        "by_month": by_month
+    })
+
+@expenses.route("/api/expenses/<int:user_id>/search")
+@token_required
+@cached_user_view
+def search_expenses(user_id):
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({"error": "Query parameter q is required"}), 400
+
+    try:
+        limit = int(request.args.get('limit') or DEFAULT_SEARCH_PAGE_SIZE)
+        page = int(request.args.get('page') or 1)
+        if limit < 1 or limit > MAX_SEARCH_PAGE_SIZE or page < 1:
+            raise ValueError(f"limit must be between 1 and {MAX_SEARCH_PAGE_SIZE} and page >= 1")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Fetch one extra row to know whether another page exists
+    rows = ExpenseSearch.search(user_id, q, limit=limit + 1, offset=(page - 1) * limit)
+    items = [
+        {
+            "id": row.id,
+            "title": row.title,
+            "amount": row.amount,
+            "category": row.category,
+            "date": serialize_value(row.date),
+            "rank": float(row.rank)
+        }
+        for row in rows[:limit]
+    ]
+    return jsonify({"items": items, "page": page, "has_more": len(rows) > limit})
+
+@expenses.route("/api/expenses/<int:user_id>/export")
+@token_required
+def export_expenses(user_id):
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+
+    try:
+        names = parse_fields(request.args.get('fields'))
+        columns = [EXPENSE_FIELDS[name].label(name) for name in names]
+        query = apply_date_filters(
+            db.session.query(*columns).filter(Expense.user_id == user_id),
+            request.args.get('start_date'),
+            request.args.get('end_date')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # yield_per streams rows through a server-side cursor where the driver supports it
+    query = query.order_by(Expense.date, Expense.id).yield_per(EXPORT_CHUNK_SIZE)
+
+    def generate_ndjson():
+        chunk = []
+        for row in query:
+            record = {name: serialize_value(getattr(row, name)) for name in names}
+            chunk.append(json.dumps(record, default=str))
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        pending = 0
+        for row in query:
+            writer.writerow([serialize_value(getattr(row, name)) for name in names])
+            pending += 1
+            if pending >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        yield buffer.getvalue()
+
+    if export_format == "csv":
+        body, mimetype = generate_csv(), "text/csv"
+    else:
+        body, mimetype = generate_ndjson(), "application/x-ndjson"
+
+    filename = f"expenses_{user_id}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @expenses.route("/api/expense/delete/<int:id>", methods=["DELETE"])
+@token_required
 def delete_expense(id):
     exp = Expense.query.get(id)
+    if not exp or (g.user_id is not None and exp.user_id != g.user_id):
+        return jsonify({"error": "Expense not found"}), 404
     db.session.delete(exp)
+    track_expense_changes([expense_change(exp)], sign=-1)
     db.session.commit()
+    response_cache.bump_user(exp.user_id)
     return jsonify({"message": "Deleted"})
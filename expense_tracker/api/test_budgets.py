@@ -0,0 +1,75 @@
+"""
+Budget spend kept current by expense writes
+"""
+
+from conftest import add_expenses
+from main import app
+from models import db, Category
+
+
+def add_category(user_id, name):
+    with app.app_context():
+        category = Category(user_id=user_id, name=name)
+        db.session.add(category)
+        db.session.commit()
+        return category.id
+
+
+def add_budget(client, headers, **fields):
+    body = {"name": "Budget", "start_date": "2024-05-01", "period": "monthly", **fields}
+    return client.post("/api/budget/add", headers=headers, json=body).get_json()["budget"]
+
+
+def spent(client, user_id, headers):
+    return {budget["name"]: budget["spent_amount"]
+            for budget in client.get(f"/api/budgets/{user_id}", headers=headers).get_json()}
+
+
+def test_expenses_named_by_category_count_towards_its_budget(client, sign_up):
+    user_id, headers = sign_up()
+    food = add_category(user_id, "Food")
+    add_category(user_id, "Transport")
+    add_budget(client, headers, name="Food", limit_amount=500, category_id=food)
+    add_budget(client, headers, name="Everything", limit_amount=1000)
+
+    # Like the frontend: a category name, no category_id
+    lunch = client.post("/api/expense/add", headers=headers, json={
+        "title": "Lunch", "amount": 120, "category": "Food", "date": "2024-05-02",
+    }).get_json()
+    add_expenses(client, headers, [
+        {"title": "Dinner", "amount": 80, "category": "Food", "date": "2024-05-03"},
+        {"title": "Bus", "amount": 30, "category": "Transport", "date": "2024-05-03"},
+        # Outside the May window
+        {"title": "Snack", "amount": 5, "category": "Food", "date": "2024-06-01"},
+    ])
+    assert spent(client, user_id, headers) == {"Food": 200.0, "Everything": 230.0}
+
+    client.delete(f"/api/expense/delete/{lunch['id']}", headers=headers)
+    assert spent(client, user_id, headers) == {"Food": 80.0, "Everything": 110.0}
+
+
+def test_new_budget_is_seeded_from_existing_expenses(client, sign_up):
+    user_id, headers = sign_up()
+    food = add_category(user_id, "Food")
+    add_expenses(client, headers, [
+        {"title": "Lunch", "amount": 120, "category": "Food", "date": "2024-05-02"},
+        {"title": "Bus", "amount": 30, "category": "Transport", "date": "2024-05-03"},
+    ])
+    assert add_budget(client, headers, limit_amount=100, category_id=food)["spent_amount"] == 120.0
+
+
+def test_over_budget_lists_only_exceeded(client, sign_up):
+    user_id, headers = sign_up()
+    add_budget(client, headers, name="Tight", limit_amount=50)
+    add_budget(client, headers, name="Loose", limit_amount=5000)
+    add_expenses(client, headers, [{"title": "Rent", "amount": 900, "date": "2024-05-02"}])
+    over = client.get(f"/api/budgets/{user_id}/over", headers=headers).get_json()
+    assert [budget["name"] for budget in over] == ["Tight"]
+
+
+def test_bad_budget_input_is_400(client, sign_up):
+    _, headers = sign_up()
+    assert client.post("/api/budget/add", headers=headers, json={"name": "No limit"}).status_code == 400
+    assert client.post("/api/budget/add", headers=headers, json={
+        "name": "Odd", "limit_amount": 10, "period": "fortnightly",
+    }).status_code == 400
@@ -0,0 +1,58 @@
+"""
+Bulk expense ingestion: batching and per-row errors
+"""
+
+import io
+
+from conftest import add_expenses
+
+
+def titles(client, user_id, headers):
+    return sorted(item["title"] for item in client.get(f"/api/expenses/{user_id}", headers=headers).get_json())
+
+
+def test_all_valid_rows_are_inserted_across_batches(client, sign_up):
+    user_id, headers = sign_up()
+    rows = [{"title": f"Item {index}", "amount": index + 1, "date": "2024-05-01"} for index in range(5)]
+    response = client.post("/api/expenses/bulk?batch_size=2", headers=headers, json=rows)
+    assert response.status_code == 201
+    assert response.get_json() == {"received": 5, "inserted": 5, "errors": []}
+    assert len(titles(client, user_id, headers)) == 5
+
+
+def test_bad_rows_are_reported_and_the_rest_kept(client, sign_up):
+    user_id, headers = sign_up()
+    other_id, _ = sign_up()
+    response = add_expenses(client, headers, [
+        {"title": "Good", "amount": 10, "date": "2024-05-01"},
+        {"title": "No amount", "date": "2024-05-01"},
+        {"title": "Bad date", "amount": 10, "date": "05/01/2024"},
+        {"title": "Not a number", "amount": "NaN", "date": "2024-05-01"},
+        {"title": "Someone else's", "amount": 10, "date": "2024-05-01", "user_id": other_id},
+        "not an object",
+    ])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body["inserted"] == 1
+    assert [error["row"] for error in body["errors"]] == [1, 2, 3, 4, 5]
+    assert "amount" in body["errors"][0]["error"]
+    assert titles(client, user_id, headers) == ["Good"]
+
+
+def test_nothing_valid_is_400(client, sign_up):
+    _, headers = sign_up()
+    response = add_expenses(client, headers, [{"title": "No date", "amount": 1}])
+    assert response.status_code == 400
+    assert response.get_json()["inserted"] == 0
+    assert client.post("/api/expenses/bulk", headers=headers, json={"rows": []}).status_code == 400
+    assert client.post("/api/expenses/bulk?batch_size=0", headers=headers, json=[]).status_code == 400
+
+
+def test_csv_upload(client, sign_up):
+    user_id, headers = sign_up()
+    csv_body = b"\xef\xbb\xbftitle,amount,date,category\nBook,250,2024-05-01,Education\nPen,12.5,2024-05-02,\n"
+    response = client.post("/api/expenses/bulk", headers=headers, content_type="multipart/form-data",
+                           data={"file": (io.BytesIO(csv_body), "import.csv")})
+    assert response.status_code == 201
+    listed = client.get(f"/api/expenses/{user_id}", headers=headers).get_json()
+    assert [(item["title"], item["category"]) for item in listed] == [("Pen", "Other"), ("Book", "Education")]
@@ -0,0 +1,78 @@
+"""
+Per-user response cache: hits, invalidation on writes, and ETag revalidation
+"""
+
+from cache import response_cache
+from conftest import add_expenses
+
+
+def titles(response):
+    return [item["title"] for item in response.get_json()]
+
+
+def test_repeat_reads_are_served_from_the_cache(client, sign_up):
+    user_id, headers = sign_up()
+    add_expenses(client, headers, [{"title": "Tea", "amount": 20, "date": "2024-05-01"}])
+    listing = f"/api/expenses/{user_id}"
+    hits = response_cache.hits
+    first = client.get(listing, headers=headers)
+    second = client.get(listing, headers=headers)
+    assert response_cache.hits == hits + 1
+    assert second.get_data() == first.get_data()
+    assert second.headers["Cache-Control"] == "private, no-cache"
+
+    # Another query string is another entry
+    client.get(listing, headers=headers, query_string={"fields": "id"})
+    assert response_cache.hits == hits + 1
+
+
+def test_every_write_path_invalidates(client, sign_up):
+    user_id, headers = sign_up()
+    listing = f"/api/expenses/{user_id}"
+    assert titles(client.get(listing, headers=headers)) == []
+
+    added = client.post("/api/expense/add", headers=headers, json={
+        "title": "Tea", "amount": 20, "date": "2024-05-01",
+    }).get_json()
+    assert titles(client.get(listing, headers=headers)) == ["Tea"]
+
+    add_expenses(client, headers, [{"title": "Rent", "amount": 9000, "date": "2024-05-03"}])
+    assert titles(client.get(listing, headers=headers)) == ["Rent", "Tea"]
+    assert client.get(f"{listing}/summary", headers=headers).get_json()["count"] == 2
+
+    client.delete(f"/api/expense/delete/{added['id']}", headers=headers)
+    assert titles(client.get(listing, headers=headers)) == ["Rent"]
+    assert client.get(f"{listing}/summary", headers=headers).get_json()["count"] == 1
+
+
+def test_writes_leave_other_users_cached(client, sign_up):
+    user_id, headers = sign_up()
+    other_id, other = sign_up()
+    client.get(f"/api/expenses/{other_id}", headers=other)
+    add_expenses(client, headers, [{"title": "Tea", "amount": 20, "date": "2024-05-01"}])
+    hits = response_cache.hits
+    client.get(f"/api/expenses/{other_id}", headers=other)
+    assert response_cache.hits == hits + 1
+
+
+def test_etag_revalidation(client, sign_up):
+    user_id, headers = sign_up()
+    listing = f"/api/expenses/{user_id}"
+    etag = client.get(listing, headers=headers).headers["ETag"]
+
+    unchanged = client.get(listing, headers={**headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.get_data() == b""
+
+    add_expenses(client, headers, [{"title": "Tea", "amount": 20, "date": "2024-05-01"}])
+    changed = client.get(listing, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_errors_are_not_cached(client, sign_up):
+    user_id, headers = sign_up()
+    hits = response_cache.hits
+    for _ in range(2):
+        assert client.get(f"/api/expenses/{user_id}?cursor=nonsense", headers=headers).status_code == 400
+    assert response_cache.hits == hits
@@ -0,0 +1,50 @@
+"""
+Streaming NDJSON and CSV export of a user's expenses
+"""
+
+import csv
+import io
+import json
+
+from conftest import add_expenses
+
+ROWS = [
+    {"title": "Rent", "amount": 9000, "category": "Housing", "date": "2024-05-03"},
+    {"title": "Tea, large", "amount": "20.5", "date": "2024-05-01"},
+]
+
+
+def test_ndjson_export_in_date_order(client, sign_up):
+    user_id, headers = sign_up()
+    add_expenses(client, headers, ROWS)
+    response = client.get(f"/api/expenses/{user_id}/export", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["Content-Disposition"] == f"attachment; filename=expenses_{user_id}.ndjson"
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(record["title"], record["date"]) for record in records] == [
+        ("Tea, large", "2024-05-01"), ("Rent", "2024-05-03"),
+    ]
+
+
+def test_csv_export_with_fields_and_dates(client, sign_up):
+    user_id, headers = sign_up()
+    add_expenses(client, headers, ROWS)
+    response = client.get(f"/api/expenses/{user_id}/export", headers=headers, query_string={
+        "format": "csv", "fields": "title,amount,category", "start_date": "2024-05-01", "end_date": "2024-05-02",
+    })
+    assert response.mimetype == "text/csv"
+    assert list(csv.reader(io.StringIO(response.get_data(as_text=True)))) == [
+        ["title", "amount", "category"], ["Tea, large", "20.50", "Other"],
+    ]
+
+
+def test_empty_export_and_bad_arguments(client, sign_up):
+    user_id, headers = sign_up()
+    export = f"/api/expenses/{user_id}/export"
+    assert client.get(export, headers=headers).get_data() == b""
+    assert client.get(export, headers=headers, query_string={"format": "csv"}).get_data(as_text=True) == (
+        "id,title,amount,category,date\r\n"
+    )
+    assert client.get(export, headers=headers, query_string={"format": "xml"}).status_code == 400
+    assert client.get(export, headers=headers, query_string={"fields": "nope"}).status_code == 400
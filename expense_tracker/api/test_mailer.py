@@ -0,0 +1,170 @@
+"""
+Outbox delivery against a fake SMTP connection
+
+    python -m pytest test_mailer.py
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from mailer import Mailer
+from models import db, EmailOutbox
+
+
+class FakeSMTP:
+    """Records what was sent; fails the first `failures` sends"""
+
+    def __init__(self, outbox, failures=0, delay=0.0):
+        self.outbox = outbox
+        self.failures = failures
+        self.delay = delay
+
+    def send_message(self, email):
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        self.outbox.append(email["To"])
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def app_and_outbox(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'mail.db'}",
+        MAIL_WORKERS=1,
+        MAIL_RETRY_BACKOFF=0.01,
+        MAIL_MAX_RETRIES=3,
+    )
+    db.init_app(app)
+    with app.app_context():
+        EmailOutbox.__table__.create(db.engine)
+    sent, connections = [], []
+
+    def connect():
+        connections.append(FakeSMTP(sent, failures=app.config.get("FAKE_FAILURES", 0)))
+        app.config["FAKE_FAILURES"] = 0
+        return connections[-1]
+
+    mailer = Mailer(connection_factory=connect)
+    mailer.init_app(app)
+    yield app, mailer, sent, connections
+    mailer.shutdown()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def statuses(app):
+    with app.app_context():
+        rows = EmailOutbox.query.order_by(EmailOutbox.id).all()
+        return [(row.status, row.attempts) for row in rows]
+
+
+def test_delivers_over_one_connection(app_and_outbox):
+    app, mailer, sent, connections = app_and_outbox
+    with app.app_context():
+        for index in range(3):
+            mailer.send(f"user{index}@example.com", "Hello", "Body")
+
+    assert wait_for(lambda: len(sent) == 3)
+    assert sorted(sent) == ["user0@example.com", "user1@example.com", "user2@example.com"]
+    assert wait_for(lambda: statuses(app) == [("sent", 1)] * 3)
+    assert len(connections) == 1
+
+
+def test_retries_after_a_failed_send(app_and_outbox):
+    app, mailer, sent, connections = app_and_outbox
+    app.config["FAKE_FAILURES"] = 1
+    with app.app_context():
+        mailer.send("user@example.com", "Hello", "Body")
+
+    assert wait_for(lambda: statuses(app) == [("sent", 2)])
+    assert sent == ["user@example.com"]
+    # The failed connection is dropped, the retry opens a new one
+    assert len(connections) == 2
+
+
+def test_gives_up_after_max_retries(app_and_outbox):
+    app, mailer, sent, _ = app_and_outbox
+
+    def always_failing():
+        return FakeSMTP(sent, failures=10)
+
+    mailer.connection_factory = always_failing
+    with app.app_context():
+        mailer.send("user@example.com", "Hello", "Body")
+
+    assert wait_for(lambda: statuses(app) == [("failed", 3)])
+    assert sent == []
+
+
+def test_recover_requeues_unsent_mail(app_and_outbox):
+    app, mailer, sent, _ = app_and_outbox
+    with app.app_context():
+        # Left behind by a process that stopped before delivering
+        db.session.add_all([
+            EmailOutbox(to_address="queued@example.com", subject="s", body="b"),
+            EmailOutbox(to_address="retrying@example.com", subject="s", body="b", status="retrying", attempts=1),
+            EmailOutbox(to_address="sent@example.com", subject="s", body="b", status="sent", attempts=1),
+        ])
+        db.session.commit()
+        assert mailer.recover() == 2
+
+    assert wait_for(lambda: len(sent) == 2)
+    assert sorted(sent) == ["queued@example.com", "retrying@example.com"]
+    assert wait_for(lambda: [status for status, _ in statuses(app)] == ["sent"] * 3)
+
+
+def test_claimed_message_is_sent_once(app_and_outbox):
+    app, mailer, sent, _ = app_and_outbox
+    # A second process sharing the outbox, with sends slow enough to overlap
+    other = Mailer(connection_factory=lambda: FakeSMTP(sent, delay=0.2))
+    other.init_app(app)
+    mailer.connection_factory = lambda: FakeSMTP(sent, delay=0.2)
+    try:
+        with app.app_context():
+            db.session.add(EmailOutbox(to_address="once@example.com", subject="s", body="b"))
+            db.session.commit()
+            assert mailer.recover() == 1
+            # 0 when the first worker already holds the lease; 1 when both race to claim
+            assert other.recover() in (0, 1)
+
+        assert wait_for(lambda: statuses(app) == [("sent", 1)])
+        time.sleep(0.3)
+        assert sent == ["once@example.com"]
+    finally:
+        other.shutdown()
+
+
+def test_recover_honours_the_claim_lease(app_and_outbox):
+    app, mailer, sent, _ = app_and_outbox
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.add_all([
+            # Still being sent by a live worker elsewhere
+            EmailOutbox(to_address="busy@example.com", subject="s", body="b",
+                        status="sending", attempts=1, claimed_at=now),
+            # Its sender died long ago
+            EmailOutbox(to_address="stale@example.com", subject="s", body="b", status="sending",
+                        attempts=1, claimed_at=now - timedelta(seconds=mailer.claim_lease + 60)),
+        ])
+        db.session.commit()
+        assert mailer.recover() == 1
+
+    assert wait_for(lambda: statuses(app) == [("sending", 1), ("sent", 2)])
+    time.sleep(0.1)
+    assert sent == ["stale@example.com"]
@@ -0,0 +1,43 @@
+"""
+Keyset pagination and field projection on GET /api/expenses/<user_id>
+"""
+
+from conftest import add_expenses
+
+
+def test_plain_list_without_paging_arguments(client, sign_up):
+    user_id, headers = sign_up()
+    add_expenses(client, headers, [
+        {"title": "Tea", "amount": 20, "date": "2024-05-01"},
+        {"title": "Rent", "amount": 9000, "date": "2024-05-03"},
+    ])
+    listed = client.get(f"/api/expenses/{user_id}", headers=headers).get_json()
+    assert [item["title"] for item in listed] == ["Rent", "Tea"]
+    assert set(listed[0]) == {"id", "title", "amount", "category", "date"}
+
+
+def test_cursor_pages_cover_every_expense_once(client, sign_up):
+    user_id, headers = sign_up()
+    # Equal dates: the id breaks the tie, so nothing is skipped or repeated
+    add_expenses(client, headers, [{"title": f"Item {index}", "amount": 1, "date": "2024-05-01"}
+                                   for index in range(7)])
+    add_expenses(client, headers, [{"title": "Newest", "amount": 1, "date": "2024-06-01"}])
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        query = {"limit": 3, "fields": "id,title", **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/api/expenses/{user_id}", headers=headers, query_string=query).get_json()
+        assert all(set(item) == {"id", "title"} for item in page["items"])
+        seen += [item["title"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert pages == 3
+    assert seen == ["Newest"] + [f"Item {index}" for index in reversed(range(7))]
+
+
+def test_bad_cursor_limit_and_fields_are_400(client, sign_up):
+    user_id, headers = sign_up()
+    for query in ({"cursor": "nonsense"}, {"limit": 0}, {"limit": 501}, {"fields": "id,password_hash"}):
+        assert client.get(f"/api/expenses/{user_id}", headers=headers, query_string=query).status_code == 400, query
@@ -0,0 +1,23 @@
+"""
+Query plan regression check (check_query_plans.py) as part of the suite
+"""
+
+import uuid
+
+from check_query_plans import run_checks
+from main import app
+from models import db, User, Category
+
+
+def test_routes_use_indexes():
+    with app.app_context():
+        user = User(username=f"plan-{uuid.uuid4().hex[:8]}", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        category = Category(user_id=user.id, name="Food & Dining")
+        db.session.add(category)
+        db.session.commit()
+
+        checked, failures = run_checks(user.id, category.id)
+    assert checked > 0
+    assert failures == 0
@@ -0,0 +1,55 @@
+"""
+Expense rollups: kept in step by every write path, and served by /summary
+"""
+
+from conftest import add_expenses
+from main import app
+from rollups import check_rollups
+
+
+def test_writes_keep_rollups_equal_to_raw_expenses(client, sign_up):
+    user_id, headers = sign_up()
+    added = client.post("/api/expense/add", headers=headers, json={
+        "title": "Lunch", "amount": 120, "category": "Food", "date": "2024-05-01",
+    }).get_json()
+    add_expenses(client, headers, [
+        {"title": "Dinner", "amount": "80.25", "category": "Food", "date": "2024-05-01"},
+        {"title": "Bus", "amount": 30, "category": "Transport", "date": "2024-04-30"},
+        {"title": "Gift", "amount": 500, "date": "2024-06-15"},
+    ])
+    client.delete(f"/api/expense/delete/{added['id']}", headers=headers)
+    with app.app_context():
+        assert check_rollups() == []
+
+
+def test_summary_totals(client, sign_up):
+    user_id, headers = sign_up()
+    add_expenses(client, headers, [
+        {"title": "Lunch", "amount": 120, "category": "Food", "date": "2024-05-01"},
+        {"title": "Dinner", "amount": "80.25", "category": "Food", "date": "2024-05-02"},
+        {"title": "Bus", "amount": 30, "category": "Transport", "date": "2024-04-30"},
+    ])
+    summary = client.get(f"/api/expenses/{user_id}/summary", headers=headers).get_json()
+    assert summary["total"] == 230.25
+    assert summary["count"] == 3
+    assert summary["by_category"] == [
+        {"key": "Food", "total": 200.25, "count": 2},
+        {"key": "Transport", "total": 30.0, "count": 1},
+    ]
+    assert [row["key"] for row in summary["by_month"]] == ["2024-04", "2024-05"]
+    # 2024-04-30 is a Tuesday: all three fall in the week starting Monday 29 April
+    assert summary["by_week"] == [{"key": "2024-04-29", "total": 230.25, "count": 3}]
+
+    window = client.get(f"/api/expenses/{user_id}/summary", headers=headers,
+                        query_string={"start_date": "2024-05-01", "end_date": "2024-05-01"}).get_json()
+    assert (window["total"], window["count"]) == (120.0, 1)
+
+
+def test_deleting_the_last_expense_empties_the_summary(client, sign_up):
+    user_id, headers = sign_up()
+    added = client.post("/api/expense/add", headers=headers, json={
+        "title": "Lunch", "amount": 120, "category": "Food", "date": "2024-05-01",
+    }).get_json()
+    client.delete(f"/api/expense/delete/{added['id']}", headers=headers)
+    summary = client.get(f"/api/expenses/{user_id}/summary", headers=headers).get_json()
+    assert (summary["total"], summary["count"], summary["by_day"]) == (0, 0, [])
@@ -0,0 +1,97 @@
+"""
+Signed access/refresh tokens: issue, verify, refresh, logout and route guards
+
+TestingConfig leaves TOKEN_AUTH_REQUIRED off for scripts; tests of the guard
+turn it on.
+"""
+
+import time
+
+import pytest
+from tokens import token_auth, InvalidToken, ACCESS, REFRESH
+
+
+@pytest.fixture
+def auth_required(monkeypatch):
+    monkeypatch.setattr(token_auth, "required", True)
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_tokens_verify_only_as_their_own_kind():
+    tokens = token_auth.issue(41)
+    assert token_auth.verify(tokens["access_token"]) == 41
+    assert token_auth.verify(tokens["refresh_token"], kind=REFRESH) == 41
+    with pytest.raises(InvalidToken, match="Invalid token"):
+        token_auth.verify(tokens["refresh_token"], kind=ACCESS)
+    with pytest.raises(InvalidToken, match="Invalid token"):
+        token_auth.verify(tokens["access_token"] + "x")
+
+
+def test_expired_access_token(monkeypatch):
+    token = token_auth.issue(42)["access_token"]
+    monkeypatch.setattr(token_auth, "access_ttl", -1)
+    with pytest.raises(InvalidToken, match="Token expired"):
+        token_auth.verify(token)
+
+
+def test_revocation_covers_only_earlier_tokens():
+    old = token_auth.issue(43)
+    bystander = token_auth.issue(44)
+    token_auth.revoke_user(43)
+    time.sleep(0.01)
+    new = token_auth.issue(43)
+    with pytest.raises(InvalidToken, match="Token revoked"):
+        token_auth.verify(old["access_token"])
+    with pytest.raises(InvalidToken, match="Token revoked"):
+        token_auth.verify(old["refresh_token"], kind=REFRESH)
+    assert token_auth.verify(new["access_token"]) == 43
+    assert token_auth.verify(bystander["access_token"]) == 44
+
+
+def test_guarded_routes_need_a_valid_token(client, sign_up, auth_required):
+    user_id, headers = sign_up()
+    listing = f"/api/expenses/{user_id}"
+    assert client.get(listing).status_code == 401
+    assert client.get(listing, headers=bearer("garbage")).status_code == 401
+    assert client.get(listing, headers=headers).status_code == 200
+
+
+def test_other_users_data_is_403(client, sign_up, auth_required):
+    _, headers = sign_up()
+    other_id, _ = sign_up()
+    for path in (f"/api/expenses/{other_id}", f"/api/expenses/{other_id}/summary",
+                 f"/api/expenses/{other_id}/export", f"/api/budgets/{other_id}"):
+        assert client.get(path, headers=headers).status_code == 403, path
+    response = client.post("/api/expense/add", headers=headers, json={
+        "title": "Tea", "amount": 20, "date": "2024-05-01", "user_id": other_id,
+    })
+    assert response.status_code == 403
+
+
+def test_refresh_issues_new_tokens(client, sign_up):
+    tokens = token_auth.issue(sign_up()[0])
+    refreshed = client.post("/api/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 200
+    body = refreshed.get_json()
+    assert token_auth.verify(body["access_token"]) == body["user_id"]
+
+    for payload in ({"refresh_token": tokens["access_token"]}, {}, None):
+        assert client.post("/api/token/refresh", json=payload).status_code == 401
+
+
+def test_logout_revokes_the_session(client, sign_up, auth_required):
+    user_id, _ = sign_up()
+    tokens = token_auth.issue(user_id)
+    headers = bearer(tokens["access_token"])
+    assert client.post("/api/logout", headers=headers).status_code == 200
+
+    assert client.get(f"/api/expenses/{user_id}", headers=headers).status_code == 401
+    assert client.post("/api/token/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.post("/api/logout").status_code == 401
+
+    time.sleep(0.01)
+    login_again = token_auth.issue(user_id)
+    assert client.get(f"/api/expenses/{user_id}", headers=bearer(login_again["access_token"])).status_code == 200
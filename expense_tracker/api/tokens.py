@@ -0,0 +1,120 @@
+"""
+Stateless signed session tokens
+
+/api/login issues a short-lived access token and a longer-lived refresh token,
+signed with itsdangerous; verifying one needs no database query. Logout
+records a per-user revocation time in memory, per process, which rejects
+tokens issued before it until they would have expired anyway.
+"""
+
+import threading
+import time
+from functools import wraps
+from flask import request, jsonify, g
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+class InvalidToken(Exception):
+    """Raised for missing, malformed, expired or revoked tokens"""
+
+
+class TokenAuth:
+    """Flask extension issuing and verifying signed access/refresh tokens"""
+
+    def __init__(self, app=None):
+        self._serializers = {}
+        self._revoked = {}
+        self._latest_revocation = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        secret = app.config.get("SECRET_KEY") or "dev-secret"
+        self.access_ttl = int(app.config.get("ACCESS_TOKEN_TTL", 15 * 60))
+        self.refresh_ttl = int(app.config.get("REFRESH_TOKEN_TTL", 30 * 24 * 60 * 60))
+        self.required = app.config.get("TOKEN_AUTH_REQUIRED", True)
+        # Serializers are built once; salts keep the two token kinds apart
+        self._serializers = {
+            ACCESS: URLSafeTimedSerializer(secret, salt="access-token"),
+            REFRESH: URLSafeTimedSerializer(secret, salt="refresh-token"),
+        }
+        app.extensions["token_auth"] = self
+
+    def issue(self, user_id):
+        """New access and refresh tokens for a user"""
+        issued_at = time.time()
+        return {
+            "access_token": self._serializers[ACCESS].dumps({"uid": user_id, "iat": issued_at}),
+            "refresh_token": self._serializers[REFRESH].dumps({"uid": user_id, "iat": issued_at}),
+            "token_type": "Bearer",
+            "expires_in": self.access_ttl,
+        }
+
+    def verify(self, token, kind=ACCESS):
+        """Return the user id a token was issued to, or raise InvalidToken"""
+        max_age = self.access_ttl if kind == ACCESS else self.refresh_ttl
+        try:
+            payload = self._serializers[kind].loads(token, max_age=max_age)
+            user_id, issued_at = int(payload["uid"]), float(payload["iat"])
+        except SignatureExpired:
+            raise InvalidToken("Token expired")
+        except (BadSignature, KeyError, TypeError, ValueError):
+            raise InvalidToken("Invalid token")
+
+        if issued_at <= self._latest_revocation:
+            revoked_at = self._revoked.get(user_id)
+            if revoked_at is not None and issued_at <= revoked_at:
+                raise InvalidToken("Token revoked")
+        return user_id
+
+    def revoke_user(self, user_id):
+        """Invalidate every token issued to the user so far"""
+        now = time.time()
+        with self._lock:
+            # Forget revocations older than any still-valid token
+            horizon = now - max(self.access_ttl, self.refresh_ttl)
+            self._revoked = {uid: at for uid, at in self._revoked.items() if at > horizon}
+            self._revoked[user_id] = now
+            self._latest_revocation = now
+
+
+token_auth = TokenAuth()
+
+
+def bearer_token():
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        return header[7:].strip()
+    return None
+
+
+def token_required(view):
+    """
+    Verify the bearer access token and expose its user as g.user_id.
+
+    Routes taking a user_id URL argument are limited to the token's own user.
+    With TOKEN_AUTH_REQUIRED off, requests without a token pass through and
+    g.user_id is None.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = bearer_token()
+        g.user_id = None
+        if token is None:
+            if token_auth.required:
+                return jsonify({"error": "Authorization token required"}), 401
+            return view(*args, **kwargs)
+
+        try:
+            g.user_id = token_auth.verify(token)
+        except InvalidToken as e:
+            return jsonify({"error": str(e)}), 401
+
+        if "user_id" in kwargs and kwargs["user_id"] != g.user_id:
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,14 @@
+"""
+Production entry point
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Defaults to the PostgreSQL configuration (pooled engine, statement timeout)
+unless FLASK_ENV says otherwise. `python main.py` remains the dev server.
+"""
+
+import os
+
+os.environ.setdefault("FLASK_ENV", "postgres")
+
+from main import app  # noqa: E402
@@ -3,6 +3,7 @@ import { BrowserRouter, Routes, Route } from "react-router-dom";
 import Login from "./pages/Login";
 import Dashboard from "./pages/Dashboard";
 import VerifyEmail from "./pages/VerifyEmail";
+import { logout } from "./auth";
 
 export default function App() {
   const [userId, setUserId] = useState(localStorage.getItem("userId") || null);
@@ -13,6 +14,7 @@ export default function App() {
   };
 
   const handleLogout = () => {
+    logout();
     setUserId(null);
     localStorage.removeItem("userId");
   };
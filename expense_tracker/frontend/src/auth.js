@@ -0,0 +1,57 @@
+import axios from "axios";
+
+const API = "http://localhost:5000";
+
+// Access/refresh tokens from /api/login, kept in localStorage beside userId
+export function saveTokens({ access_token, refresh_token }) {
+  localStorage.setItem("accessToken", access_token);
+  localStorage.setItem("refreshToken", refresh_token);
+  axios.defaults.headers.common["Authorization"] = `Bearer ${access_token}`;
+}
+
+export function clearTokens() {
+  localStorage.removeItem("accessToken");
+  localStorage.removeItem("refreshToken");
+  delete axios.defaults.headers.common["Authorization"];
+}
+
+export async function logout() {
+  try {
+    await axios.post(`${API}/api/logout`);
+  } catch (err) {
+    // Token already expired or server unreachable; forget it locally anyway
+  }
+  clearTokens();
+}
+
+export function setupAuth(onSessionExpired) {
+  const token = localStorage.getItem("accessToken");
+  if (token) {
+    axios.defaults.headers.common["Authorization"] = `Bearer ${token}`;
+  }
+
+  // On a 401, swap the refresh token for new tokens once and replay the request
+  let refreshing = null;
+  axios.interceptors.response.use(null, async (error) => {
+    const original = error.config;
+    const refreshToken = localStorage.getItem("refreshToken");
+    if (error.response?.status !== 401 || !original || original._retried || !refreshToken
+        || original.url.endsWith("/api/token/refresh")) {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    try {
+      refreshing = refreshing || axios.post(`${API}/api/token/refresh`, { refresh_token: refreshToken });
+      const res = await refreshing;
+      saveTokens(res.data);
+      original.headers["Authorization"] = `Bearer ${res.data.access_token}`;
+      return axios(original);
+    } catch (refreshErr) {
+      clearTokens();
+      onSessionExpired?.();
+      return Promise.reject(error);
+    } finally {
+      refreshing = null;
+    }
+  });
+}
@@ -29,7 +29,7 @@ export default function Chart({ user_id, refresh, dateFilter }) {
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
-        let url = `http://localhost:5000/api/expenses/${user_id}`;
+        let url = `http://localhost:5000/api/expenses/${user_id}/summary`;
 
         // Add date filter to query params if provided
         if (dateFilter?.startDate && dateFilter?.endDate) {
@@ -43,10 +43,9 @@ export default function Chart({ user_id, refresh, dateFilter }) {
             .then((res) => {
 
                 const categories = {};
-                (res.data || []).forEach((exp) => {
-                    const amt = Number(exp.amount) || 0;
-                    const cat = exp.category || "Uncategorized";
-                    categories[cat] = (categories[cat] || 0) + amt;
+                (res.data?.by_category || []).forEach((row) => {
+                    const cat = row.key || "Uncategorized";
+                    categories[cat] = (categories[cat] || 0) + (Number(row.total) || 0);
                 });
 
                 setChartData({
@@ -35,7 +35,7 @@ export default function LineChart({ user_id, refresh, dateFilter }) {
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
-        let url = `http://localhost:5000/api/expenses/${user_id}`;
+        let url = `http://localhost:5000/api/expenses/${user_id}/summary`;
 
         if (dateFilter?.startDate && dateFilter?.endDate) {
             url += `?start_date=${dateFilter.startDate}&end_date=${dateFilter.endDate}`;
@@ -46,12 +46,10 @@ export default function LineChart({ user_id, refresh, dateFilter }) {
 
         axios.get(url)
             .then((res) => {
-                // Group by date and sum amounts (coerce values)
+                // Daily totals are grouped server-side
                 const dailySpending = {};
-                (res.data || []).forEach((exp) => {
-                    const amt = Number(exp.amount) || 0;
-                    const d = exp.date || 'Unknown';
-                    dailySpending[d] = (dailySpending[d] || 0) + amt;
+                (res.data?.by_day || []).forEach((row) => {
+                    dailySpending[row.key] = Number(row.total) || 0;
                 });
 
                 // Sort by date
@@ -41,7 +41,7 @@ export default function PieChart({ user_id, refresh, dateFilter }) {
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
-        let url = `http://localhost:5000/api/expenses/${user_id}`;
+        let url = `http://localhost:5000/api/expenses/${user_id}/summary`;
 
         if (dateFilter?.startDate && dateFilter?.endDate) {
             url += `?start_date=${dateFilter.startDate}&end_date=${dateFilter.endDate}`;
@@ -53,10 +53,9 @@ export default function PieChart({ user_id, refresh, dateFilter }) {
         axios.get(url)
             .then((res) => {
                 const categories = {};
-                (res.data || []).forEach((exp) => {
-                    const amt = Number(exp.amount) || 0;
-                    const cat = exp.category || "Uncategorized";
-                    categories[cat] = (categories[cat] || 0) + amt;
+                (res.data?.by_category || []).forEach((row) => {
+                    const cat = row.key || "Uncategorized";
+                    categories[cat] = (categories[cat] || 0) + (Number(row.total) || 0);
                 });
 
                 setPieData({
@@ -7,7 +7,7 @@ export default function SpendingAdvice({ user_id, dateFilter }) {
     const [isWarning, setIsWarning] = useState(false);
 
     useEffect(() => {
-        let url = `http://localhost:5000/api/expenses/${user_id}`;
+        let url = `http://localhost:5000/api/expenses/${user_id}/summary`;
 
         if (dateFilter?.startDate && dateFilter?.endDate) {
             url += `?start_date=${dateFilter.startDate}&end_date=${dateFilter.endDate}`;
@@ -16,13 +16,11 @@ export default function SpendingAdvice({ user_id, dateFilter }) {
         axios.get(url)
             .then((res) => {
                 const categories = {};
-                let totalSpending = 0;
+                const totalSpending = Number(res.data?.total) || 0;
 
-                (res.data || []).forEach((exp) => {
-                    const amt = Number(exp.amount) || 0;
-                    const cat = exp.category || 'Uncategorized';
-                    categories[cat] = (categories[cat] || 0) + amt;
-                    totalSpending += amt;
+                (res.data?.by_category || []).forEach((row) => {
+                    const cat = row.key || 'Uncategorized';
+                    categories[cat] = (categories[cat] || 0) + (Number(row.total) || 0);
                 });
 
                 setCategoryData(categories);
@@ -2,6 +2,13 @@ import { StrictMode } from 'react'
 import { createRoot } from 'react-dom/client'
 import './index.css'
 import App from './App.jsx'
+import { setupAuth } from './auth.js'
+
+// Refresh failed: drop the stale session and show the login page
+setupAuth(() => {
+  localStorage.removeItem('userId')
+  window.location.assign('/login')
+})
 
 createRoot(document.getElementById('root')).render(
   <StrictMode>
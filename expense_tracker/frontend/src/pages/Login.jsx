@@ -1,6 +1,7 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
 import axios from "axios";
+import { saveTokens } from "../auth";
 
 export default function Login({ setUserId }) {
     const navigate = useNavigate();
@@ -32,6 +33,7 @@ export default function Login({ setUserId }) {
                 form
             );
 
+            saveTokens(res.data);
             setUserId(res.data.user_id);
             navigate("/dashboard");
 
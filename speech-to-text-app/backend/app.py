@@ -1,16 +1,90 @@
-from flask import Flask
+from flask import Flask, Response
 from flask_cors import CORS
 from extensions import db
+from profiling import request_profiler
+from jobs import job_queue
+from transcript_cache import transcript_cache
+from uploads import UploadRequest, upload_janitor
+from streaming import stream_server
+from credits import credit_bank
+from ratelimit import rate_limiter
+from models import add_missing_columns
+from search import create_search_index
 import os
 
 def create_app():
     app = Flask(__name__)
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///speech.db"
+    # File parts are written to UPLOAD_FOLDER and hashed while they stream in
+    app.request_class = UploadRequest
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///speech.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["UPLOAD_FOLDER"] = "uploads"
+    app.config["UPLOAD_FOLDER"] = os.getenv("UPLOAD_FOLDER", "uploads")
+    # Larger requests are refused with 413 before anything is stored
+    app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_MB", 512)) * 1024 * 1024
+    # Finished jobs' audio is deleted after this long (see uploads.py)
+    app.config["UPLOAD_RETENTION_HOURS"] = float(os.getenv("UPLOAD_RETENTION_HOURS", 24))
+    app.config["JANITOR_INTERVAL"] = float(os.getenv("JANITOR_INTERVAL", 600))
+    # Background transcription (see jobs.py): deepinfra or stub
+    app.config["TRANSCRIBER"] = os.getenv("TRANSCRIBER", "deepinfra")
+    # Seconds each stub call pretends to take (TRANSCRIBER=stub only)
+    app.config["STUB_LATENCY"] = float(os.getenv("STUB_LATENCY", 0))
+    app.config["TRANSCRIBE_WORKERS"] = int(os.getenv("TRANSCRIBE_WORKERS", 2))
+    # A processing job left this long is presumed dead and run again; keep it above the longest transcription
+    app.config["JOB_LEASE_SECONDS"] = float(os.getenv("JOB_LEASE_SECONDS", 3600))
+    # Provider HTTP client: pooling, timeouts, retries, breaker (see provider_client.py)
+    app.config["PROVIDER_CONNECT_TIMEOUT"] = float(os.getenv("PROVIDER_CONNECT_TIMEOUT", 5))
+    app.config["PROVIDER_READ_TIMEOUT"] = float(os.getenv("PROVIDER_READ_TIMEOUT", 300))
+    app.config["PROVIDER_MAX_RETRIES"] = int(os.getenv("PROVIDER_MAX_RETRIES", 3))
+    app.config["PROVIDER_BACKOFF_SECONDS"] = float(os.getenv("PROVIDER_BACKOFF_SECONDS", 0.5))
+    app.config["PROVIDER_CONCURRENCY"] = int(os.getenv("PROVIDER_CONCURRENCY", 8))
+    app.config["PROVIDER_BREAKER_THRESHOLD"] = int(os.getenv("PROVIDER_BREAKER_THRESHOLD", 5))
+    app.config["PROVIDER_BREAKER_RESET"] = float(os.getenv("PROVIDER_BREAKER_RESET", 30))
+    # Uploads: credit in seconds of audio per user, token buckets per user and IP
+    app.config["CREDITS_ENABLED"] = os.getenv("CREDITS_ENABLED", "true").lower() != "false"
+    app.config["CREDITS_DEFAULT_SECONDS"] = int(os.getenv("CREDITS_DEFAULT_SECONDS", 3600))
+    app.config["RATE_LIMIT_ENABLED"] = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+    app.config["RATE_LIMIT_USER_PER_MINUTE"] = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", 10))
+    app.config["RATE_LIMIT_USER_BURST"] = float(os.getenv("RATE_LIMIT_USER_BURST", 5))
+    app.config["RATE_LIMIT_IP_PER_MINUTE"] = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", 30))
+    app.config["RATE_LIMIT_IP_BURST"] = float(os.getenv("RATE_LIMIT_IP_BURST", 10))
+    # Transcript cache keyed by audio hash (see transcript_cache.py)
+    app.config["TRANSCRIPT_CACHE_ENABLED"] = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() != "false"
+    app.config["TRANSCRIPT_CACHE_MAX_ENTRIES"] = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", 10000))
+    # Long recordings: split into chunks transcribed in parallel (see chunking.py)
+    app.config["CHUNKED_TRANSCRIPTION"] = os.getenv("CHUNKED_TRANSCRIPTION", "true").lower() != "false"
+    app.config["CHUNK_MAX_SECONDS"] = float(os.getenv("CHUNK_MAX_SECONDS", 120))
+    app.config["CHUNK_OVERLAP_SECONDS"] = float(os.getenv("CHUNK_OVERLAP_SECONDS", 2))
+    app.config["CHUNK_CONCURRENCY"] = int(os.getenv("CHUNK_CONCURRENCY", 4))
+    # Downmix/resample to 16 kHz mono before upload (see normalize.py)
+    app.config["NORMALIZE_AUDIO"] = os.getenv("NORMALIZE_AUDIO", "true").lower() != "false"
+    app.config["NORMALIZE_SAMPLE_RATE"] = int(os.getenv("NORMALIZE_SAMPLE_RATE", 16000))
+    app.config["NORMALIZE_CODEC"] = os.getenv("NORMALIZE_CODEC", "flac")
+    # Live transcription over Socket.IO (see streaming.py)
+    app.config["STREAM_SAMPLE_RATE"] = int(os.getenv("STREAM_SAMPLE_RATE", 16000))
+    app.config["STREAM_SEGMENT_MS"] = int(os.getenv("STREAM_SEGMENT_MS", 500))
+    app.config["STREAM_END_SILENCE_MS"] = int(os.getenv("STREAM_END_SILENCE_MS", 500))
+    app.config["STREAM_MAX_UTTERANCE_SECONDS"] = float(os.getenv("STREAM_MAX_UTTERANCE_SECONDS", 15))
+    app.config["STREAM_VAD_THRESHOLD_DB"] = float(os.getenv("STREAM_VAD_THRESHOLD_DB", -40))
+    app.config["STREAM_MAX_BACKLOG"] = int(os.getenv("STREAM_MAX_BACKLOG", 4))
+    app.config["STREAM_CREDIT_BLOCK_SECONDS"] = int(os.getenv("STREAM_CREDIT_BLOCK_SECONDS", 60))
+    # Per-request profiling (see profiling.py); off unless asked for
+    app.config["PROFILING_ENABLED"] = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    app.config["SLOW_QUERY_MS"] = float(os.getenv("SLOW_QUERY_MS", 100))
+    app.config["PROFILE_SAMPLE_RATE"] = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+    app.config["PROFILE_DIR"] = os.getenv("PROFILE_DIR")
+    # X-Profile is honoured only when it carries this secret
+    app.config["PROFILE_SECRET"] = os.getenv("PROFILE_SECRET")
+    app.config["PROFILE_MAX_FILES"] = int(os.getenv("PROFILE_MAX_FILES", 50))
 
     CORS(app)
     db.init_app(app)
+    request_profiler.init_app(app, db)
+    job_queue.init_app(app)
+    transcript_cache.init_app(app)
+    upload_janitor.init_app(app)
+    stream_server.init_app(app)
+    credit_bank.init_app(app)
+    rate_limiter.init_app(app)
 
     # Blueprints
     from auth import auth_bp
@@ -22,13 +96,23 @@ def create_app():
     # Create DB
     with app.app_context():
         db.create_all()
+        add_missing_columns()
+        create_search_index()
         print("🔥 Database initialized successfully!")
+        recovered = job_queue.recover()
+        if recovered:
+            print(f"🔁 Requeued {recovered} unfinished transcription job(s)")
 
     # Home route
     @app.route("/")
     def home():
         return "🔥 Backend running successfully! API available at /api/"
 
+    @app.route("/metrics")
+    def metrics():
+        body = request_profiler.prometheus() if request_profiler.enabled else ""
+        return Response(body, mimetype="text/plain; version=0.0.4")
+
     return app
 
 
@@ -36,4 +120,5 @@ app = create_app()
 
 if __name__ == "__main__":
     print("🚀 Starting backend server at http://localhost:5000")
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
+    # Same Werkzeug server as app.run(), plus the WebSocket upgrade streaming needs
+    stream_server.socketio.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), allow_unsafe_werkzeug=True)
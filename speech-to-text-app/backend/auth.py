@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
+from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
 from models import User
 from extensions import db
@@ -19,6 +20,34 @@ def create_token(user):
     )
 
 
+def decode_token(token):
+    """User id from a valid token, or None"""
+    try:
+        return jwt.decode(token, SECRET, algorithms=["HS256"])["id"]
+    except (jwt.InvalidTokenError, KeyError):
+        return None
+
+
+def current_user_id():
+    """User id from a valid Bearer token, or None"""
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    return decode_token(header[7:])
+
+
+def token_required(view):
+    """Reject requests without a valid Bearer token; sets g.user_id"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = current_user_id()
+        if user_id is None:
+            return jsonify({"error": "Authentication required"}), 401
+        g.user_id = user_id
+        return view(*args, **kwargs)
+    return wrapper
+
+
 @auth_bp.route("/signup", methods=["POST"])
 def signup():
     data = request.json
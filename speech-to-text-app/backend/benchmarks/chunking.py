@@ -0,0 +1,93 @@
+"""
+Benchmark: chunked transcription wall time vs concurrency
+
+Usage:
+    python benchmarks/chunking.py                  # 60 minute recording
+    python benchmarks/chunking.py 20 0.005 0.2     # minutes, latency per audio second, latency per call
+
+Synthesizes a speech-like WAV (tone bursts separated by short pauses) and
+transcribes it with a fake provider whose latency grows with the audio it is
+sent, as real providers' does. Prints the wall time of a single whole-file
+call and of chunked transcription at several concurrency levels, plus the
+time spent decoding and planning the cuts.
+"""
+
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pydub import AudioSegment
+from chunking import ChunkedTranscriber
+
+RATE = 16000
+CONCURRENCY = (1, 2, 4, 8, 16)
+
+
+class FakeTranscriber:
+    """Sleeps per_call + per_second * duration, then returns one word per second"""
+
+    def __init__(self, per_second, per_call):
+        self.per_second = per_second
+        self.per_call = per_call
+
+    def transcribe(self, path):
+        with wave.open(path) as wav:
+            seconds = wav.getnframes() / wav.getframerate()
+        time.sleep(self.per_call + self.per_second * seconds)
+        return " ".join(["word"] * int(seconds))
+
+
+def synthesize(path, minutes, seed=3):
+    """Write a mono 16 kHz WAV alternating 3-20s of tone with 0.3-1.5s pauses"""
+    rng = random.Random(seed)
+    tone = b"".join(struct.pack("<h", int(8000 * math.sin(2 * math.pi * 220 * i / RATE))) for i in range(RATE))
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        written = 0
+        while written < minutes * 60 * RATE:
+            speech = rng.randint(3, 20)
+            pause = int(rng.uniform(0.3, 1.5) * RATE)
+            wav.writeframes(tone * speech + b"\0\0" * pause)
+            written += speech * RATE + pause
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    per_second = float(sys.argv[2]) if len(sys.argv) > 2 else 0.005
+    per_call = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    fake = FakeTranscriber(per_second, per_call)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "recording.wav")
+        synthesize(path, minutes)
+
+        start = time.perf_counter()
+        audio = AudioSegment.from_file(path)
+        decoded = time.perf_counter() - start
+        start = time.perf_counter()
+        chunks = ChunkedTranscriber(fake).plan(audio)
+        planned = time.perf_counter() - start
+        print(f"{minutes:.0f} min recording: decode {decoded:.2f}s, plan {planned:.2f}s, {len(chunks)} chunks")
+
+        print(f"{'mode':<18} | {'wall':>8}")
+        print("-" * 30)
+        print(f"{'whole file':<18} | {per_call + per_second * len(audio) / 1000:>7.1f}s  (modelled)")
+        for concurrency in CONCURRENCY:
+            transcriber = ChunkedTranscriber(fake, concurrency=concurrency)
+            start = time.perf_counter()
+            transcriber.transcribe(path)
+            print(f"{f'chunked x{concurrency}':<18} | {time.perf_counter() - start:>7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: transcription history listing as a user's history grows
+
+Usage:
+    python benchmarks/history.py                  # 1k, 10k, 100k conversions
+    python benchmarks/history.py 1000 50000
+
+Seeds a temporary SQLite database with the given number of conversions for
+one user (plus as many again for other users, with ~2 KB transcripts), then
+times GET /api/convert/history for the first page and for a page deep in the
+history, reached by following cursors. For comparison it times the same
+deep page fetched with LIMIT/OFFSET and full transcripts, as a naive
+offset-paginated listing would. Also prints the query plan.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+
+WORKDIR = tempfile.mkdtemp(prefix="history-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'history.db')}"
+os.environ["UPLOAD_FOLDER"] = os.path.join(WORKDIR, "uploads")
+os.environ["TRANSCRIBER"] = "stub"
+
+from app import app
+from auth import create_token
+from extensions import db
+from models import Conversion, User
+
+REPEAT = 20
+PAGE = 20
+
+
+def seed(total, user_id, rng):
+    words = "the quick brown fox jumps over a lazy dog while speech becomes text".split()
+    texts = [" ".join(rng.choice(words) for _ in range(400)) for _ in range(100)]
+    start = datetime(2024, 1, 1)
+    batch = []
+    for index in range(total):
+        batch.append({
+            "user_id": user_id if index % 2 == 0 else user_id + 1 + index % 50,
+            "filename": f"recording-{index}.mp3",
+            "text": texts[index % len(texts)],
+            "status": Conversion.DONE,
+            "created_at": start + timedelta(seconds=index * 37),
+        })
+        if len(batch) == 5000:
+            db.session.execute(db.insert(Conversion), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Conversion), batch)
+    db.session.commit()
+
+
+def timed(fn):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    rng = random.Random(11)
+    client = app.test_client()
+
+    with app.app_context():
+        user = User(username="bench", email="bench@example.com", password="x")
+        db.session.add(user)
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+        seeded = 0
+
+        plan = db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT id FROM conversion WHERE user_id = :u "
+            "AND created_at <= :c AND (created_at < :c OR id < :i) "
+            "ORDER BY created_at DESC, id DESC LIMIT 21"
+        ), {"u": user.id, "c": datetime(2025, 1, 1), "i": 1}).all()
+        print("Query plan:", "; ".join(row[-1] for row in plan))
+
+        print(f"\n{'history':>9}{'first page ms':>15}{'deep page ms':>14}{'offset+full ms':>16}")
+        for size in sorted(sizes):
+            # Every other row belongs to the user, so seed twice the size
+            seed(size * 2 - seeded, user.id, rng)
+            seeded = size * 2
+
+            first = timed(lambda: client.get("/api/convert/history", headers=headers))
+
+            # Follow cursors to ~90% of the history, then time that page
+            depth = int(size * 0.9) // 100 * 100
+            cursor = None
+            for _ in range(depth // 100):
+                page = client.get("/api/convert/history", headers=headers,
+                                  query_string={"limit": 100, **({"cursor": cursor} if cursor else {})}).get_json()
+                cursor = page["next_cursor"]
+            query = {"cursor": cursor} if cursor else {}
+            deep = timed(lambda: client.get("/api/convert/history", headers=headers, query_string=query))
+
+            def offset_page():
+                rows = Conversion.query.filter_by(user_id=user.id).order_by(
+                    Conversion.created_at.desc()).offset(depth).limit(PAGE).all()
+                return [row.to_dict() for row in rows]
+            offset = timed(offset_page)
+
+            print(f"{size:>9}{first:>15.2f}{deep:>14.2f}{offset:>16.2f}")
+
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        import shutil
+        shutil.rmtree(WORKDIR, ignore_errors=True)
@@ -0,0 +1,94 @@
+"""
+Benchmark: request latency and throughput of background transcription jobs
+
+Usage:
+    python benchmarks/jobs.py                 # 40 uploads, 2s stub latency
+    python benchmarks/jobs.py 100 0.5         # uploads, seconds per transcription
+
+Runs against a temporary SQLite database with the stub transcriber, so no
+audio or API key is needed. For each worker count it reports how long the
+upload request takes to return (previously the whole transcription) and how
+long the queue takes to drain.
+"""
+
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'jobs_bench.db')}"
+os.environ["UPLOAD_FOLDER"] = os.path.join(_tmp, "uploads")
+os.environ["TRANSCRIBER"] = "stub"
+# Measures the queue, not quotas: no credit checks, no throttling
+os.environ["CREDITS_ENABLED"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import app
+from auth import create_token
+from extensions import db
+from jobs import job_queue
+from models import Conversion, User
+from transcribers import StubTranscriber
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def run(uploads, workers, headers):
+    job_queue.shutdown()
+    job_queue.worker_count = workers
+    client = app.test_client()
+    submit_times, ids = [], []
+    lock = threading.Lock()
+
+    def upload(index):
+        start = time.perf_counter()
+        resp = client.post("/api/convert/", data={"file": (io.BytesIO(b"RIFF"), f"clip{index}.wav")},
+                           headers=headers, content_type="multipart/form-data")
+        with lock:
+            submit_times.append(time.perf_counter() - start)
+            ids.append(resp.get_json()["id"])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=upload, args=(i,)) for i in range(uploads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        while Conversion.query.filter(Conversion.id.in_(ids), Conversion.status.notin_(Conversion.FINISHED)).count():
+            time.sleep(0.05)
+        db.session.remove()
+    return submit_times, time.perf_counter() - start
+
+
+def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    job_queue.transcriber = StubTranscriber(latency=latency)
+    with app.app_context():
+        user = User(username="bench", email="bench@example.com", password="x")
+        db.session.add(user)
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+
+    print(f"{uploads} uploads, {latency:.1f}s per transcription (blocking request: {latency * 1000:.0f}ms each)")
+    print(f"{'workers':>8} | {'submit p50':>10} {'submit max':>10} | {'drain':>8} {'jobs/s':>7}")
+    print("-" * 56)
+    for workers in WORKER_COUNTS:
+        submit_times, wall = run(uploads, workers, headers)
+        print(
+            f"{workers:>8} | {statistics.median(submit_times) * 1000:>8.1f}ms {max(submit_times) * 1000:>8.1f}ms | "
+            f"{wall:>7.1f}s {uploads / wall:>7.1f}"
+        )
+    job_queue.shutdown()
+
+
+if __name__ == "__main__":
+    main()
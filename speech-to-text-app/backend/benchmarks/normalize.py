@@ -0,0 +1,105 @@
+"""
+Benchmark: audio normalization before upload
+
+Usage:
+    python benchmarks/normalize.py              # assumes a 20 Mbit/s uplink
+    python benchmarks/normalize.py 5            # uplink in Mbit/s
+
+Synthesizes sample clips (stereo 48 and 44.1 kHz WAV of several lengths,
+plus a clip that is already 16 kHz mono) and normalizes each one with every
+backend available here: ffmpeg (FLAC and Opus) when it is on the PATH, and
+the pydub WAV fallback. Reports bytes in and out, CPU time added per file,
+and the upload time saved at the given uplink speed.
+"""
+
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from normalize import NormalizingTranscriber
+
+CLIPS = [
+    # (name, seconds, sample rate, channels)
+    ("stereo-48k-30s", 30, 48000, 2),
+    ("stereo-48k-5min", 300, 48000, 2),
+    ("stereo-44k-5min", 300, 44100, 2),
+    ("mono-16k-5min", 300, 16000, 1),
+]
+
+
+def synthesize(path, seconds, rate, channels, seed=5):
+    """Voice-band tones with a little noise and pauses, so codecs have real work to do"""
+    rng = random.Random(seed)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        written = 0
+        while written < seconds * rate:
+            pitch = rng.uniform(120, 300)
+            length = int(rng.uniform(0.5, 3) * rate)
+            pause = int(rng.uniform(0.2, 0.8) * rate)
+            frames = bytearray()
+            for i in range(length):
+                value = 6000 * math.sin(2 * math.pi * pitch * i / rate) + 2000 * math.sin(2 * math.pi * 3 * pitch * i / rate)
+                frames += struct.pack("<h", int(value + rng.gauss(0, 300))) * channels
+            frames += b"\0\0" * channels * pause
+            wav.writeframes(bytes(frames))
+            written += length + pause
+
+
+def backends():
+    probe = NormalizingTranscriber(None)
+    if probe.use_ffmpeg:
+        yield "ffmpeg flac", NormalizingTranscriber(None, codec="flac")
+        yield "ffmpeg opus", NormalizingTranscriber(None, codec="opus")
+    else:
+        print("ffmpeg not found; only the pydub fallback is measured\n")
+    fallback = NormalizingTranscriber(None)
+    fallback.use_ffmpeg = False
+    yield "pydub wav", fallback
+
+
+def main():
+    uplink = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    bytes_per_second = uplink * 1e6 / 8
+
+    with tempfile.TemporaryDirectory() as workdir:
+        clips = []
+        for name, seconds, rate, channels in CLIPS:
+            path = os.path.join(workdir, f"{name}.wav")
+            synthesize(path, seconds, rate, channels)
+            clips.append((name, path))
+
+        measured = list(backends())
+        print(f"{'backend':<13}{'clip':<17}{'in MB':>8}{'out MB':>8}{'saved':>7}{'CPU ms':>8}{'upload s saved':>16}")
+        for label, normalizer in measured:
+            for name, path in clips:
+                size_in = os.path.getsize(path)
+                before = normalizer.cpu_seconds
+                out = normalizer.normalize(path)
+                cpu = normalizer.cpu_seconds - before
+                size_out = os.path.getsize(out) if out else size_in
+                if out:
+                    os.remove(out)
+                saved = size_in - size_out
+                print(
+                    f"{label:<13}{name:<17}{size_in / 1e6:>8.1f}{size_out / 1e6:>8.1f}"
+                    f"{saved / size_in:>7.0%}{cpu * 1000:>8.0f}{saved / bytes_per_second:>16.1f}"
+                )
+            stats = normalizer.stats()
+            print(f"{label:<13}{'total':<17}{stats['bytes_in'] / 1e6:>8.1f}{stats['bytes_out'] / 1e6:>8.1f}"
+                  f"{stats['bytes_saved'] / stats['bytes_in']:>7.0%}{stats['cpu_seconds'] * 1000:>8.0f}"
+                  f"{stats['bytes_saved'] / bytes_per_second:>16.1f}\n")
+
+
+if __name__ == "__main__":
+    main()
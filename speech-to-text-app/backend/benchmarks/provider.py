@@ -0,0 +1,277 @@
+"""
+Benchmark and behaviour check: provider HTTP client against a local stub
+
+Usage:
+    python benchmarks/provider.py            # 200 calls for the reuse comparison
+    python benchmarks/provider.py 1000
+
+Runs a stub provider on localhost whose behaviour is scripted per scenario
+(fail N times, answer 429 with Retry-After, hang, stay down), drives
+DeepInfraTranscriber through it and checks retries, timeouts, the
+concurrency limit and the circuit breaker. Then compares one-off
+requests.post() calls with the pooled client: connections opened and
+mean latency per call. Exits non-zero if any check fails.
+"""
+
+import http.server
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from provider_client import CircuitBreaker, ProviderClient
+from transcribers import DeepInfraTranscriber, MultipartFileBody, TranscriptionError
+
+
+class Stub:
+    """Scripted behaviour shared by the handler threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, fail=0, status=503, retry_after=None, hang=0.0, delay=0.0):
+        with self.lock:
+            self.fail = fail
+            self.status = status
+            self.retry_after = retry_after
+            self.hang = hang
+            self.delay = delay
+            self.requests = 0
+            self.connections = set()
+            self.active = 0
+            self.peak = 0
+
+
+stub = Stub()
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, so a pooled client can reuse the connection
+    protocol_version = "HTTP/1.1"
+    # Headers and body in one segment; otherwise delayed ACKs stall reused connections
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining:
+            block = self.rfile.read(min(remaining, 64 * 1024))
+            if not block:
+                break
+            remaining -= len(block)
+
+        with stub.lock:
+            stub.requests += 1
+            stub.connections.add(self.client_address)
+            stub.active += 1
+            stub.peak = max(stub.peak, stub.active)
+            failing = stub.fail > 0
+            if failing:
+                stub.fail -= 1
+            hang, delay = stub.hang, stub.delay
+        try:
+            if hang:
+                time.sleep(hang)
+            if delay:
+                time.sleep(delay)
+            if failing:
+                headers = {"Retry-After": stub.retry_after} if stub.retry_after is not None else {}
+                self._reply(stub.status, {"error": "scripted failure"}, headers)
+            else:
+                self._reply(200, {"text": "hello from the stub"})
+        finally:
+            with stub.lock:
+                stub.active -= 1
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clients that timed out on purpose leave broken pipes behind
+
+
+failures = []
+
+
+def check(name, condition, detail=""):
+    print(f"  {'ok  ' if condition else 'FAIL'} {name}{f'  ({detail})' if detail else ''}")
+    if not condition:
+        failures.append(name)
+
+
+def transcriber(url, **options):
+    options = {"backoff": 0.05, "read_timeout": 2.0, **options}
+    return DeepInfraTranscriber(api_key="test", url=url, client=ProviderClient(**options))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/transcribe"
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as audio:
+        audio.write(os.urandom(256 * 1024))
+    path = audio.name
+
+    try:
+        print("Retries")
+        stub.reset(fail=2, status=503)
+        t = transcriber(url)
+        check("503 twice, then success", t.transcribe(path) == "hello from the stub")
+        check("three attempts made", stub.requests == 3, f"{stub.requests} requests")
+        check("file body re-sent on every attempt", t.client.stats()["statuses"] == {"503": 2, "200": 1})
+
+        stub.reset(fail=1, status=429, retry_after=1)
+        t = transcriber(url)
+        started = time.perf_counter()
+        t.transcribe(path)
+        waited = time.perf_counter() - started
+        check("429 honours Retry-After", waited >= 1.0, f"{waited:.2f}s")
+        check("429 does not count toward the breaker", t.client.breaker.failures == 0)
+
+        stub.reset(fail=1, status=400)
+        t = transcriber(url)
+        try:
+            t.transcribe(path)
+            raised = False
+        except TranscriptionError:
+            raised = True
+        check("400 is not retried", raised and stub.requests == 1, f"{stub.requests} requests")
+
+        stub.reset(fail=10, status=502)
+        t = transcriber(url, max_retries=2)
+        try:
+            t.transcribe(path)
+            message = ""
+        except TranscriptionError as e:
+            message = str(e)
+        check("gives up after max_retries", stub.requests == 3 and "502" in message, f"{stub.requests} requests")
+
+        print("Timeouts")
+        stub.reset(hang=1.0)
+        t = transcriber(url, read_timeout=0.3, max_retries=1)
+        started = time.perf_counter()
+        try:
+            t.transcribe(path)
+            raised = False
+        except TranscriptionError:
+            raised = True
+        elapsed = time.perf_counter() - started
+        check("hung provider fails the call", raised and elapsed < 1.0, f"{elapsed:.2f}s")
+        # It may still be transcribing (and billing); a second POST could pay twice
+        check("read timeout is not retried", stub.requests == 1, f"{stub.requests} requests")
+
+        t = transcriber("http://10.255.255.1/transcribe", connect_timeout=0.2, max_retries=0)
+        started = time.perf_counter()
+        try:
+            t.transcribe(path)
+        except TranscriptionError:
+            pass
+        elapsed = time.perf_counter() - started
+        check("connect timeout is bounded", elapsed < 1.0, f"{elapsed:.2f}s")
+
+        print("Connection failures")
+        with socket.socket() as closed:
+            closed.bind(("127.0.0.1", 0))
+            dead_url = f"http://127.0.0.1:{closed.getsockname()[1]}/transcribe"
+        t = transcriber(dead_url, max_retries=2)
+        try:
+            t.transcribe(path)
+            message = ""
+        except TranscriptionError as e:
+            message = str(e)
+        check("refused connection is retried", "3 attempt(s)" in message, message[:60])
+
+        print("Circuit breaker")
+        stub.reset(fail=1000, status=500)
+        t = transcriber(url, max_retries=0, breaker_threshold=3, breaker_reset=0.5)
+        for _ in range(3):
+            try:
+                t.transcribe(path)
+            except TranscriptionError:
+                pass
+        sent = stub.requests
+        try:
+            t.transcribe(path)
+            message = ""
+        except TranscriptionError as e:
+            message = str(e)
+        check("opens after 3 failures", t.client.breaker.state == CircuitBreaker.OPEN)
+        check("open breaker fails fast", stub.requests == sent and "circuit open" in message)
+        stub.reset()
+        time.sleep(0.6)
+        t.transcribe(path)
+        check("half-open trial closes it", t.client.breaker.state == CircuitBreaker.CLOSED)
+
+        print("Concurrency limit")
+        stub.reset(delay=0.1)
+        t = transcriber(url, concurrency=3)
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            list(pool.map(lambda _: t.transcribe(path), range(12)))
+        check("at most 3 calls in flight", stub.peak <= 3, f"peak {stub.peak}")
+        check("pool holds no more connections than the limit", len(stub.connections) <= 3,
+              f"{len(stub.connections)} connections")
+
+        print(f"Connection reuse ({calls} sequential calls)")
+        stub.reset()
+        started = time.perf_counter()
+        for _ in range(calls):
+            body = MultipartFileBody(path)
+            try:
+                requests.post(url, data=body, headers={"Content-Type": body.content_type}, timeout=5)
+            finally:
+                body.close()
+        one_off = (time.perf_counter() - started) / calls
+        one_off_connections = len(stub.connections)
+
+        stub.reset()
+        t = transcriber(url)
+        started = time.perf_counter()
+        for _ in range(calls):
+            t.transcribe(path)
+        pooled = (time.perf_counter() - started) / calls
+        pooled_connections = len(stub.connections)
+        stats = t.client.stats()
+
+        print(f"  {'client':<16}{'connections':>12}{'mean ms':>10}")
+        print(f"  {'requests.post':<16}{one_off_connections:>12}{one_off * 1000:>10.2f}")
+        print(f"  {'ProviderClient':<16}{pooled_connections:>12}{pooled * 1000:>10.2f}")
+        print(f"  latency p50 {stats['latency_ms']['p50']} ms, p99 {stats['latency_ms']['p99']} ms")
+        check("pooled client reuses one connection", pooled_connections == 1)
+    finally:
+        os.remove(path)
+        server.shutdown()
+
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\nAll checks passed")
+
+
+if __name__ == "__main__":
+    main()
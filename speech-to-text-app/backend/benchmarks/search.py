@@ -0,0 +1,258 @@
+"""
+Benchmark and behaviour check: transcript search, FTS5 against a LIKE scan
+
+Usage:
+    python benchmarks/search.py            # 100k transcripts
+    python benchmarks/search.py 20000
+
+Seeds a temporary SQLite database with synthetic transcripts (Zipf-
+distributed words, ~1 KB each), half of them belonging to the benchmark
+user. The conversion_fts triggers index them as they are inserted. Then,
+for common, rare and multi-word queries, it times
+GET /api/convert/search for the first page. It compares that with naive
+LIKE '%word%' search over the user's transcripts: newest first, which may
+stop after a page of (unranked) hits, and over all of them, which ranking
+or counting the hits would need. The speed-up is against the latter.
+Also checks that the index follows inserts, updates and deletes, that one
+user never sees another's transcripts, that snippets are HTML-safe, that
+FTS5 syntax in a query cannot cause an error, and that a response says
+when matches beyond the ranked window were left out.
+Exits non-zero if a check fails.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+
+WORKDIR = tempfile.mkdtemp(prefix="search-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'search.db')}"
+os.environ["UPLOAD_FOLDER"] = os.path.join(WORKDIR, "uploads")
+os.environ["TRANSCRIBER"] = "stub"
+
+from app import app
+from auth import create_token
+from extensions import db
+from models import Conversion, User
+from search import MAX_RANKED
+
+REPEAT = 10
+PAGE = 20
+VOCABULARY = 20000
+failures = []
+
+
+def check(name, condition, detail=""):
+    print(f"  {'ok  ' if condition else 'FAIL'} {name}{f'  ({detail})' if detail else ''}")
+    if not condition:
+        failures.append(name)
+
+
+def vocabulary(rng):
+    syllables = ["ka", "lo", "mi", "ten", "ra", "so", "vel", "qui", "dor", "an", "pe", "shu", "ix", "bre", "on"]
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def seed(total, user_id, rng):
+    words = vocabulary(rng)
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    start = datetime(2024, 1, 1)
+    batch = []
+    for index in range(total):
+        batch.append({
+            "user_id": user_id if index % 2 == 0 else user_id + 1 + index % 50,
+            "filename": f"meeting-{index}.mp3",
+            "text": " ".join(rng.choices(words, weights, k=rng.randint(100, 200))),
+            "status": Conversion.DONE,
+            "created_at": start + timedelta(seconds=index * 37),
+        })
+        if len(batch) == 5000:
+            db.session.execute(db.insert(Conversion), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Conversion), batch)
+    db.session.commit()
+    return words
+
+
+def rare_word(words):
+    """A word from the tail that is no part of any other word, so LIKE finds only it"""
+    for word in reversed(words):
+        if not any(word in other for other in words if other != word):
+            return word
+
+
+def like_scan(user_id, query, full=False):
+    """
+    The naive search: every word as a substring of the user's transcripts.
+    Newest first it can stop at a page of hits; ranking them, or counting
+    them, means reading every transcript.
+    """
+    rows = db.session.query(Conversion.id).filter(
+        Conversion.user_id == user_id, *[Conversion.text.like(f"%{word}%") for word in query.split()]
+    )
+    if full:
+        return rows.count()
+    return rows.order_by(Conversion.created_at.desc(), Conversion.id.desc()).limit(PAGE).all()
+
+
+def timed(fn):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def benchmark(client, headers, user_id, words):
+    queries = [
+        ("common word", words[0]),
+        ("mid-frequency word", words[500]),
+        ("rare word", rare_word(words)),
+        ("two words", f"{words[3]} {words[200]}"),
+        ("three words", f"{words[1]} {words[30]} {words[90]}"),
+    ]
+    print(f"\n{'query':<20}{'matches':>9}{'FTS5 ms':>10}{'LIKE page ms':>14}{'LIKE all ms':>13}{'speed-up':>10}")
+    for label, query in queries:
+        def fts():
+            response = client.get("/api/convert/search", headers=headers, query_string={"q": query, "limit": PAGE})
+            assert response.status_code == 200, response.get_json()
+            return response
+
+        def like(full=False):
+            with app.app_context():
+                rows = like_scan(user_id, query, full)
+                db.session.remove()
+                return rows
+
+        with app.app_context():
+            from search import match_expression
+            matches = db.session.execute(
+                db.text("SELECT count(*) FROM conversion_fts WHERE conversion_fts MATCH :q"),
+                {"q": match_expression(query, user_id)},
+            ).scalar()
+        fts_ms, like_ms, scan_ms = timed(fts), timed(like), timed(lambda: like(full=True))
+        print(f"{label:<20}{matches:>9}{fts_ms:>10.2f}{like_ms:>14.2f}{scan_ms:>13.2f}{scan_ms / fts_ms:>9.1f}x")
+
+        page = fts().get_json()
+        items = page["items"]
+        check(f"{label}: truncated only past {MAX_RANKED} matches", page["truncated"] == (matches > MAX_RANKED),
+              f"truncated={page['truncated']}")
+        check(f"{label}: every snippet marks a match",
+              all("<mark>" in item["snippet"] for item in items) and len(items) == min(PAGE, matches),
+              f"{len(items)} items")
+        if label == "rare word":
+            with app.app_context():
+                rows = db.session.query(Conversion.id, Conversion.text).filter(
+                    Conversion.user_id == user_id, Conversion.text.like(f"%{query}%")).all()
+            exact = {row.id for row in rows}
+            items = client.get("/api/convert/search", headers=headers,
+                               query_string={"q": query, "limit": 100}).get_json()["items"]
+            check("rare word: same documents as the LIKE scan", exact == {item["id"] for item in items},
+                  f"{len(exact)} vs {len(items)}")
+        if label == "common word":
+            scores = [item["score"] for item in items]
+            check("common word: ranked by BM25", scores == sorted(scores, reverse=True))
+            cursor = fts().get_json()["next_cursor"]
+            second = client.get("/api/convert/search", headers=headers,
+                                query_string={"q": query, "limit": PAGE, "cursor": cursor}).get_json()["items"]
+            check("common word: second page continues the first",
+                  len(second) == PAGE and not {i["id"] for i in second} & {i["id"] for i in items})
+
+
+def behaviour(client, headers, other_headers, user_id):
+    print("\nBehaviour")
+
+    def ids(query, who=headers):
+        response = client.get("/api/convert/search", headers=who, query_string={"q": query})
+        return response.status_code, [item["id"] for item in (response.get_json() or {}).get("items", [])]
+
+    with app.app_context():
+        conversion = Conversion(user_id=user_id, filename="standup.wav", status=Conversion.DONE,
+                                text="Zebrafish <script>alert(1)</script> roadmap & quarterly numbers")
+        db.session.add(conversion)
+        db.session.commit()
+        conversion_id = conversion.id
+    check("insert is searchable at once", ids("zebrafish")[1] == [conversion_id])
+    check("stemming: 'number' finds 'numbers'", conversion_id in ids("zebrafish number")[1])
+
+    snippet = client.get("/api/convert/search", headers=headers, query_string={"q": "zebrafish"}).get_json()["items"][0]
+    check("snippet is HTML-escaped", "<script>" not in snippet["snippet"] and "&lt;script&gt;" in snippet["snippet"],
+          snippet["snippet"])
+    check("filename matches are marked",
+          client.get("/api/convert/search", headers=headers, query_string={"q": "standup"})
+          .get_json()["items"][0]["filename_marked"] == "<mark>standup</mark>.wav")
+
+    check("other users don't see it", ids("zebrafish", other_headers)[1] == [])
+
+    with app.app_context():
+        db.session.get(Conversion, conversion_id).text = "an okapi instead"
+        db.session.commit()
+    check("update replaces the indexed text", ids("zebrafish")[1] == [] and ids("okapi")[1] == [conversion_id])
+
+    with app.app_context():
+        db.session.delete(db.session.get(Conversion, conversion_id))
+        db.session.commit()
+    check("delete removes it", ids("okapi")[1] == [])
+
+    for hostile in ['"unbalanced', "NEAR(a b", "a AND OR b", "owner:u1", "*", "text:x -y ^z"]:
+        status, _ = ids(hostile)
+        check(f"query {hostile!r} is taken as plain words", status == 200, f"status {status}")
+    check("empty query is a 400", ids("   ")[0] == 400)
+    check("anonymous search is a 401", client.get("/api/convert/search?q=x").status_code == 401)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(5)
+    client = app.test_client()
+
+    with app.app_context():
+        user = User(username="bench", email="bench@example.com", password="x")
+        other = User(username="other", email="other@example.com", password="x")
+        db.session.add_all([user, other])
+        db.session.commit()
+        user_id = user.id
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+        other_headers = {"Authorization": f"Bearer {create_token(other)}"}
+
+        start = time.perf_counter()
+        words = seed(total, user_id, rng)
+        seeded = time.perf_counter() - start
+        pages = {name: db.session.execute(db.text(
+            "SELECT sum(pgsize) FROM dbstat WHERE name LIKE :name"), {"name": name}).scalar() or 0
+            for name in ("conversion", "conversion_fts%")}
+
+    print(f"{total} transcripts ({total // 2} for the user) seeded and indexed in {seeded:.1f} s")
+    print(f"conversion table {pages['conversion'] / 2 ** 20:.1f} MB, "
+          f"FTS5 index {pages['conversion_fts%'] / 2 ** 20:.1f} MB")
+    benchmark(client, headers, user_id, words)
+    behaviour(client, headers, other_headers, user_id)
+
+    with app.app_context():
+        db.engine.dispose()
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\nAll checks passed")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        import shutil
+        shutil.rmtree(WORKDIR, ignore_errors=True)
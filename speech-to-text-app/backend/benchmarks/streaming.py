@@ -0,0 +1,225 @@
+"""
+Benchmark: latency of live transcription over Socket.IO
+
+Usage:
+    python benchmarks/streaming.py                      # synthesized clip, stub model
+    python benchmarks/streaming.py talk.wav other.wav   # your recordings
+    STUB_LATENCY=0.3 python benchmarks/streaming.py     # slower pretend model
+
+Starts the backend in a subprocess with the deterministic stub transcriber
+(STUB_LATENCY seconds per call, default 0.15), signs up a user, and replays
+each WAV file to /stream at real-time speed in 100 ms frames. Also checks
+that an anonymous connection is refused and that the unused credit is
+refunded. Reports:
+
+- time to first word: from sending the first loud frame to the first
+  "partial" event;
+- partial and final lag: from the moment the audio that completes a segment
+  or utterance has been sent to the matching event arriving (a local
+  Segmenter replica tells when that is);
+- for comparison, how long upload-then-wait would take before any text:
+  the clip's duration plus one call.
+"""
+
+import math
+import os
+import random
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+import requests
+import socketio
+
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from pydub import AudioSegment
+from streaming import NAMESPACE, Segmenter
+
+RATE = 16000
+FRAME_MS = 100
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", 0.15))
+
+
+def synthesize(path, seconds=30, seed=7):
+    """Mono 16 kHz WAV: 1-4 s 'utterances' of voiced tones between 0.6-1.5 s pauses"""
+    rng = random.Random(seed)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        written = 0
+        while written < seconds * RATE:
+            pause = int(rng.uniform(0.6, 1.5) * RATE)
+            length = int(rng.uniform(1, 4) * RATE)
+            pitch = rng.uniform(120, 250)
+            voiced = b"".join(
+                struct.pack("<h", int(7000 * math.sin(2 * math.pi * pitch * i / RATE))) for i in range(length)
+            )
+            wav.writeframes(b"\0\0" * pause + voiced)
+            written += pause + length
+
+
+def load_pcm(path):
+    audio = AudioSegment.from_file(path).set_channels(1).set_frame_rate(RATE).set_sample_width(2)
+    return audio.raw_data
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def sign_up(port):
+    """Token for a new user, through the HTTP API"""
+    response = requests.post(f"http://127.0.0.1:{port}/api/auth/signup", json={
+        "username": "streamer", "email": "streamer@example.com", "password": "streaming-bench",
+    })
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+def anonymous_refused(port):
+    client = socketio.Client()
+    try:
+        client.connect(f"http://127.0.0.1:{port}", namespaces=[NAMESPACE], transports=["websocket"])
+    except socketio.exceptions.ConnectionError:
+        return True
+    client.disconnect()
+    return False
+
+
+def replay(port, token, pcm, config):
+    """Stream pcm in real time; returns the timings of one run"""
+    events = []
+    done = threading.Event()
+    client = socketio.Client()
+
+    @client.on("partial", namespace=NAMESPACE)
+    def on_partial(data):
+        events.append(("partial", data["utterance"], time.perf_counter()))
+
+    @client.on("final", namespace=NAMESPACE)
+    def on_final(data):
+        events.append(("final", data["utterance"], time.perf_counter()))
+
+    @client.on("done", namespace=NAMESPACE)
+    def on_done(data):
+        done.set()
+
+    client.connect(f"http://127.0.0.1:{port}", namespaces=[NAMESPACE], transports=["websocket"],
+                   auth={"token": token})
+    ack = client.call("start", {"sample_rate": RATE}, namespace=NAMESPACE)
+    if not ack.get("ok"):
+        raise SystemExit(f"start refused: {ack}")
+
+    replica = Segmenter(RATE, config["segment_ms"], config["end_silence_ms"])
+    ready = {"partial": {}, "final": {}}
+    first_loud = None
+    frame_bytes = RATE * FRAME_MS // 1000 * 2
+    started = time.perf_counter()
+    for index, offset in enumerate(range(0, len(pcm), frame_bytes)):
+        frame = pcm[offset:offset + frame_bytes]
+        # Real time: frame n leaves no earlier than n * FRAME_MS after the start
+        delay = started + index * FRAME_MS / 1000 - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        client.emit("audio", frame, namespace=NAMESPACE)
+        sent = time.perf_counter()
+        if first_loud is None and replica.loud(frame[:len(frame) // 2 * 2]):
+            first_loud = sent
+        for kind, utterance, _ in replica.feed(frame):
+            ready[kind].setdefault(utterance, []).append(sent)
+    client.call("stop", namespace=NAMESPACE)
+    for kind, utterance, _ in replica.flush():
+        ready[kind].setdefault(utterance, []).append(time.perf_counter())
+    done.wait(60)
+    client.disconnect()
+
+    first_partial = next((at for kind, _, at in events if kind == "partial"), None)
+    lags = {"partial": [], "final": []}
+    seen = {"partial": {}, "final": {}}
+    for kind, utterance, at in events:
+        index = seen[kind].get(utterance, 0)
+        seen[kind][utterance] = index + 1
+        times = ready[kind].get(utterance, [])
+        if index < len(times):
+            lags[kind].append(at - times[index])
+    return {
+        "ttfw": (first_partial - first_loud) if first_partial and first_loud else float("nan"),
+        "partials": lags["partial"],
+        "finals": lags["final"],
+        "utterances": len(ready["final"]),
+    }
+
+
+def main():
+    config = {"segment_ms": 500, "end_silence_ms": 500}
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = sys.argv[1:]
+        if not paths:
+            paths = [os.path.join(workdir, "synthetic.wav")]
+            synthesize(paths[0])
+
+        port = free_port()
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'stream_bench.db')}",
+            UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+            TRANSCRIBER="stub",
+            STUB_LATENCY=str(STUB_LATENCY),
+            STREAM_SEGMENT_MS=str(config["segment_ms"]),
+            STREAM_END_SILENCE_MS=str(config["end_silence_ms"]),
+        )
+        server = subprocess.Popen([sys.executable, "app.py"], cwd=BACKEND, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+            print(f"stub latency {STUB_LATENCY * 1000:.0f} ms, segment {config['segment_ms']} ms, "
+                  f"end of utterance after {config['end_silence_ms']} ms of silence\n")
+            print(f"{'clip':<20}{'length s':>9}{'utts':>6}{'first word ms':>15}"
+                  f"{'partial p50/max ms':>20}{'final p50/max ms':>18}{'upload+wait ms':>16}")
+            if not anonymous_refused(port):
+                raise SystemExit("anonymous stream was accepted")
+            token = sign_up(port)
+            headers = {"Authorization": f"Bearer {token}"}
+            credits = f"http://127.0.0.1:{port}/api/convert/credits"
+            for path in paths:
+                pcm = load_pcm(path)
+                seconds = len(pcm) / (RATE * 2)
+                before = requests.get(credits, headers=headers).json()["balance_seconds"]
+                result = replay(port, token, pcm, config)
+                spent = before - requests.get(credits, headers=headers).json()["balance_seconds"]
+                if spent != math.ceil(seconds):
+                    raise SystemExit(f"charged {spent} s for a {seconds:.1f} s stream")
+                partials, finals = result["partials"], result["finals"]
+                print(
+                    f"{os.path.basename(path)[:19]:<20}{seconds:>9.1f}{result['utterances']:>6}"
+                    f"{result['ttfw'] * 1000:>15.0f}"
+                    f"{statistics.median(partials or [0]) * 1000:>11.0f}/{max(partials, default=0) * 1000:<8.0f}"
+                    f"{statistics.median(finals or [0]) * 1000:>9.0f}/{max(finals, default=0) * 1000:<8.0f}"
+                    f"{(seconds + STUB_LATENCY) * 1000:>16.0f}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Benchmark and behaviour check: word timing storage and subtitle export
+
+Usage:
+    python benchmarks/timing.py          # one synthetic audio hour
+    python benchmarks/timing.py 10       # ten
+
+Synthesizes a Whisper verbose_json response for the given number of hours
+of speech: about 150 words a minute, in segments of 6-20 words, with
+per-word start and end times. Reports storage bytes per audio hour for:
+- the text alone (all that was kept before);
+- the provider's segment and word timing as compact JSON;
+- the same JSON zlib-compressed;
+- the columnar blobs now stored in transcript_timing.
+Also times encoding, decoding and SRT/VTT/JSON export, checks that blobs
+round-trip exactly, and that an export only inflates the blocks it has
+reached. Then checks end to end through the app, with the stub model:
+- a finished job has its timing stored;
+- /download?format=srt|vtt|json are served;
+- a cache hit keeps the timing;
+- chunked transcription shifts each chunk's timing into place.
+Exits non-zero if a check fails.
+"""
+
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+import zlib
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+
+WORKDIR = tempfile.mkdtemp(prefix="timing-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'timing.db')}"
+os.environ["UPLOAD_FOLDER"] = os.path.join(WORKDIR, "uploads")
+os.environ["TRANSCRIBER"] = "stub"
+os.environ["CREDITS_ENABLED"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import timings
+from app import app
+from auth import create_token
+from chunking import ChunkedTranscriber
+from extensions import db
+from jobs import job_queue
+from models import Conversion, TranscriptTiming, User
+from timings import Transcript, decode_rows, encode_rows
+from transcribers import StubTranscriber
+
+failures = []
+
+
+def check(name, condition, detail=""):
+    print(f"  {'ok  ' if condition else 'FAIL'} {name}{f'  ({detail})' if detail else ''}")
+    if not condition:
+        failures.append(name)
+
+
+def whisper_response(hours, seed=3):
+    """A verbose_json-shaped response: text, segments, and words inside each segment"""
+    rng = random.Random(seed)
+    vocabulary = ("so the we think that our team will ship this quarter and then review "
+                  "customer feedback about latency pricing onboarding roadmap metrics "
+                  "really important question because everyone agreed next week").split()
+    segments, pieces = [], []
+    clock = 0.0
+    while clock < hours * 3600:
+        clock += rng.uniform(0.1, 0.9)
+        words = []
+        for index in range(rng.randint(6, 20)):
+            word = rng.choice(vocabulary)
+            if index == 0:
+                word = word.capitalize()
+            duration = rng.uniform(0.15, 0.6)
+            words.append({"word": " " + word, "start": round(clock, 2), "end": round(clock + duration, 2),
+                          "probability": round(rng.uniform(0.6, 1.0), 4)})
+            clock += duration + rng.uniform(0.0, 0.15)
+        words[-1]["word"] += rng.choice([".", "?", ","])
+        text = "".join(word["word"] for word in words)
+        segments.append({"id": len(segments), "start": words[0]["start"], "end": words[-1]["end"],
+                         "text": text, "words": words})
+        pieces.append(text)
+    return {"text": "".join(pieces).strip(), "segments": segments, "language": "en"}
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def storage(hours):
+    response = whisper_response(hours)
+    text = response["text"]
+    # What a JSON column would hold: the timing, without text duplicated in the words
+    timing_json = json.dumps(
+        [{"start": s["start"], "end": s["end"], "text": s["text"],
+          "words": [{"word": w["word"], "start": w["start"], "end": w["end"]} for w in s["words"]]}
+         for s in response["segments"]],
+        separators=(",", ":"),
+    ).encode()
+
+    parse_s, transcript = timed(lambda: Transcript.from_response(response))
+    encode_s, blobs = timed(lambda: (encode_rows(transcript.segments), encode_rows(transcript.words)))
+    decode_s, decoded = timed(lambda: (list(decode_rows(blobs[0])), list(decode_rows(blobs[1]))))
+    rows = len(transcript.segments) + len(transcript.words)
+
+    per_hour = lambda size: size / hours
+    text_bytes = len(text.encode())
+    print(f"{hours} audio hour(s): {len(transcript.words)} words in {len(transcript.segments)} segments, "
+          f"{text_bytes / hours / 1024:.0f} KiB of text per hour\n")
+    print(f"{'storage per audio hour':<44}{'timing KiB':>12}{'with text KiB':>15}")
+    for label, size in [
+        ("text only (before)", 0),
+        ("text + timing as compact JSON", len(timing_json)),
+        ("text + timing as zlib(JSON)", len(zlib.compress(timing_json, 9))),
+        ("text + columnar blobs (after)", len(blobs[0]) + len(blobs[1])),
+    ]:
+        print(f"{label:<44}{per_hour(size) / 1024:>12.1f}{per_hour(size + text_bytes) / 1024:>15.1f}")
+    blob_bytes = len(blobs[0]) + len(blobs[1])
+    print(f"\n  bytes per word timed: {blob_bytes / len(transcript.words):.2f} "
+          f"(JSON {len(timing_json) / len(transcript.words):.1f})")
+    print(f"  parse {parse_s * 1000:.0f} ms, encode {encode_s * 1000:.0f} ms "
+          f"({rows / encode_s / 1e6:.2f} M rows/s), decode {decode_s * 1000:.0f} ms "
+          f"({rows / decode_s / 1e6:.2f} M rows/s)")
+
+    check("every word and segment aligned to the text",
+          len(transcript.words) == sum(len(s["words"]) for s in response["segments"])
+          and len(transcript.segments) == len(response["segments"]))
+    check("blobs round-trip exactly", decoded == (transcript.segments, transcript.words))
+    check("blobs under a fifth of the compact JSON", blob_bytes * 5 < len(timing_json),
+          f"{blob_bytes} vs {len(timing_json)} bytes")
+    first = transcript.words[0]
+    check("word offsets point at the word", text[first[2]:first[3]] == response["segments"][0]["words"][0]["word"].strip())
+    return text, transcript, blobs
+
+
+def export(text, transcript, blobs):
+    print("\nExport")
+    timing = TranscriptTiming(segment_count=len(transcript.segments), word_count=len(transcript.words),
+                              duration_ms=transcript.segments[-1][1], segments=blobs[0], words=blobs[1])
+    for name, (exporter, _) in timings.EXPORTERS.items():
+        seconds, size = timed(lambda: sum(len(chunk) for chunk in timings.buffered(exporter(text, timing))))
+        print(f"  {name:<5}{size / 1024:>9.0f} KiB in {seconds * 1000:>5.0f} ms")
+
+    srt = "".join(timings.to_srt(text, timing))
+    cues = srt.strip().split("\n\n")
+    check("one SRT cue per segment", len(cues) == len(transcript.segments), f"{len(cues)} cues")
+    check("SRT cue is numbered and timed", cues[0].split("\n")[0] == "1" and " --> " in cues[0].split("\n")[1], cues[0][:60])
+    vtt = "".join(timings.to_vtt(text, timing))
+    check("VTT header and dot separator", vtt.startswith("WEBVTT\n\n") and "." in vtt.split("\n")[2].split(" --> ")[0])
+    exported = json.loads("".join(timings.to_json(text, timing)))
+    check("JSON export parses", len(exported["words"]) == len(transcript.words))
+
+    words_only = TranscriptTiming(segment_count=0, word_count=len(transcript.words),
+                                  duration_ms=timing.duration_ms, segments=encode_rows([]), words=blobs[1])
+    longest = max(end - start for start, end, _ in timings.cues(text, words_only))
+    check("cues from words when there are no segments", longest <= timings.CUE_MAX_MS, f"longest {longest} ms")
+
+    # Lazy decoding: the first cue costs one block, however long the transcript
+    # (cues from words, which take more than one block an hour)
+    inflated = []
+    original = zlib.decompress
+    timings.zlib.decompress = lambda data: inflated.append(len(data)) or original(data)
+    try:
+        next(timings.to_srt(text, words_only))
+    finally:
+        timings.zlib.decompress = original
+    blocks = -(-len(transcript.words) // timings.BLOCK_ROWS)
+    check("first cue inflates one block", len(inflated) == 1, f"1 of {blocks} word blocks")
+
+
+def write_wav(path, seconds, rate=8000):
+    rng = random.Random(1)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        # Three seconds of noise, then one of silence, so the chunker finds pauses
+        for second in range(seconds):
+            if second % 4 == 3:
+                wav.writeframes(b"\0\0" * rate)
+            else:
+                wav.writeframes(bytes(rng.getrandbits(8) for _ in range(2 * rate)))
+
+
+def end_to_end():
+    print("\nEnd to end")
+    client = app.test_client()
+    with app.app_context():
+        user = User(username="timing", email="timing@example.com", password="x")
+        db.session.add(user)
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+
+    ids = []
+    for _ in range(2):
+        # The same bytes twice: the second job is a cache hit
+        response = client.post("/api/convert/", headers=headers,
+                               data={"file": (io.BytesIO(b"RIFF timing bench"), "meeting.wav")})
+        ids.append(response.get_json()["id"])
+        job_queue.shutdown()
+    with app.app_context():
+        stored = [db.session.get(TranscriptTiming, conversion_id) for conversion_id in ids]
+        cache_hit = db.session.get(Conversion, ids[1]).cache_hit
+        words = [stored_timing.word_count if stored_timing else 0 for stored_timing in stored]
+    check("finished job stores word timing", words[0] == 3, f"{words[0]} words")
+    check("cache hit keeps the timing", cache_hit and words[1] == 3)
+
+    srt = client.get(f"/api/convert/download/{ids[0]}?format=srt", headers=headers)
+    check("SRT download", srt.status_code == 200 and srt.mimetype == "application/x-subrip"
+          and srt.get_data(as_text=True).startswith("1\n00:00:00,000 --> 00:00:01,200\nstub transcript"),
+          srt.get_data(as_text=True)[:60].replace("\n", "|"))
+    vtt = client.get(f"/api/convert/download/{ids[0]}?format=vtt", headers=headers)
+    check("VTT download", vtt.status_code == 200 and vtt.get_data(as_text=True).startswith("WEBVTT"))
+    exported = client.get(f"/api/convert/download/{ids[0]}?format=json", headers=headers).get_json()
+    check("JSON download", [word["text"] for word in exported["words"]][:2] == ["stub", "transcript"])
+    check("unknown format is a 400", client.get(f"/api/convert/download/{ids[0]}?format=doc", headers=headers).status_code == 400)
+
+    path = os.path.join(WORKDIR, "long.wav")
+    write_wav(path, 40)
+    chunked = ChunkedTranscriber(StubTranscriber(), max_chunk_seconds=10, overlap_seconds=1, concurrency=2)
+    transcript = chunked.transcribe(path)
+    starts = [start for start, _, _, _ in transcript.words]
+    chunk_count = len(chunked.plan(chunked_audio(path)))
+    check("chunk timing shifted into place", starts == sorted(starts) and starts[-1] >= 20000,
+          f"{chunk_count} chunks, last word at {starts[-1] / 1000:.1f} s")
+    check("chunk words aligned to the stitched text",
+          all(transcript[a:b] in transcript.split() for _, _, a, b in transcript.words)
+          and len(transcript.words) == len(transcript.split()))
+
+
+def chunked_audio(path):
+    from pydub import AudioSegment
+    return AudioSegment.from_wav(path)
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    text, transcript, blobs = storage(hours)
+    export(text, transcript, blobs)
+    end_to_end()
+
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\nAll checks passed")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        import shutil
+        shutil.rmtree(WORKDIR, ignore_errors=True)
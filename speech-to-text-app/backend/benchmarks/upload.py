@@ -0,0 +1,138 @@
+"""
+Benchmark: server memory while accepting and forwarding a large upload
+
+Usage:
+    python benchmarks/upload.py            # 500 MB upload
+    python benchmarks/upload.py 2000       # size in MB
+
+Starts the backend in a subprocess (temporary database and upload folder)
+with the DeepInfra transcriber pointed at a local sink that reads and
+discards the request body. Uploads a file of the given size, waits for the
+job to finish and reports the server's peak RSS (VmHWM, Linux only)
+before and after.
+"""
+
+import http.client
+import http.server
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from transcribers import MultipartFileBody
+
+
+class SinkHandler(http.server.BaseHTTPRequestHandler):
+    """Stands in for the provider: drains the body, answers with its size"""
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        received = 0
+        while remaining:
+            block = self.rfile.read(min(remaining, 1024 * 1024))
+            if not block:
+                break
+            received += len(block)
+            remaining -= len(block)
+        body = json.dumps({"text": f"received {received} bytes"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read() or b"null")
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    sink = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SinkHandler)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'upload_bench.db')}",
+            UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+            MAX_UPLOAD_MB=str(size_mb + 1),
+            TRANSCRIBER="deepinfra",
+            DEEPINFRA_URL=f"http://127.0.0.1:{sink.server_port}/",
+            # Chunking decodes the audio in memory; this measures the upload path alone
+            CHUNKED_TRANSCRIPTION="false",
+            CREDITS_ENABLED="false",
+        )
+        server = subprocess.Popen([sys.executable, "app.py"], cwd=BACKEND, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                try:
+                    request(port, "GET", "/api/convert/cache/stats")
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            baseline = peak_rss_mb(server.pid)
+            _, signup = request(port, "POST", "/api/auth/signup", body=json.dumps(
+                {"username": "bench", "email": "bench@example.com", "password": "x"}),
+                headers={"Content-Type": "application/json"})
+            auth = {"Authorization": f"Bearer {signup['token']}"}
+
+            # Sparse file: no disk or memory needed on the client side
+            audio = os.path.join(workdir, "big.wav")
+            with open(audio, "wb") as f:
+                f.truncate(size_mb * 1024 * 1024)
+
+            body = MultipartFileBody(audio)
+            start = time.perf_counter()
+            status, job = request(port, "POST", "/api/convert/", body=body,
+                                  headers={"Content-Type": body.content_type, "Content-Length": str(len(body)), **auth})
+            uploaded = time.perf_counter() - start
+            if status != 202:
+                raise SystemExit(f"Upload failed: {status} {job}")
+            while job["status"] not in ("done", "failed"):
+                time.sleep(0.2)
+                _, job = request(port, "GET", f"/api/convert/{job['id']}", headers=auth)
+            finished = time.perf_counter() - start
+
+            print(f"{size_mb} MB upload: accepted in {uploaded:.1f}s, transcribed in {finished:.1f}s -> {job['text'] or job['error']}")
+            print(f"server peak RSS: {baseline:.0f} MB idle, {peak_rss_mb(server.pid):.0f} MB after")
+        finally:
+            server.terminate()
+            server.wait()
+            sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Chunked, parallel transcription of long recordings
+
+ChunkedTranscriber wraps another transcriber. Audio longer than one chunk is
+decoded once, cut into pieces of at most CHUNK_MAX_SECONDS and sent to the
+inner transcriber CHUNK_CONCURRENCY pieces at a time, so wall-clock time
+grows with length / concurrency instead of length.
+
+Cuts are placed in the middle of pauses where possible. Where a stretch has
+no pause long enough, it is cut into fixed windows that overlap by
+CHUNK_OVERLAP_SECONDS, and the words repeated across the overlap are
+dropped when the transcripts are stitched back together. Segment and word
+timing, when the inner transcriber returns it, is shifted to each chunk's
+place in the recording.
+"""
+
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pydub import AudioSegment
+from timings import Transcript
+
+# Loudness is measured over windows of this many milliseconds
+SCAN_STEP_MS = 50
+# Longest run of words the overlap de-duplication will look for
+MAX_OVERLAP_WORDS = 40
+
+
+def silent_spans(audio, min_silence_ms, silence_thresh):
+    """(start_ms, end_ms) of every run quieter than silence_thresh dBFS"""
+    spans = []
+    run_start = None
+    for start in range(0, len(audio), SCAN_STEP_MS):
+        quiet = audio[start:start + SCAN_STEP_MS].dBFS < silence_thresh
+        if quiet and run_start is None:
+            run_start = start
+        elif not quiet and run_start is not None:
+            if start - run_start >= min_silence_ms:
+                spans.append((run_start, start))
+            run_start = None
+    if run_start is not None and len(audio) - run_start >= min_silence_ms:
+        spans.append((run_start, len(audio)))
+    return spans
+
+
+def plan_chunks(duration_ms, cut_points, max_ms, overlap_ms, min_ms=None):
+    """
+    Split [0, duration_ms) into (start, end) chunks no longer than max_ms.
+
+    Each chunk ends at the last cut point that fits. When none fits it ends at
+    start + max_ms and the next chunk starts overlap_ms earlier.
+    """
+    min_ms = max_ms // 2 if min_ms is None else min_ms
+    chunks = []
+    start = 0
+    while duration_ms - start > max_ms:
+        limit = start + max_ms
+        fitting = [cut for cut in cut_points if start + min_ms <= cut <= limit]
+        if fitting:
+            end = fitting[-1]
+            chunks.append((start, end))
+            start = end
+        else:
+            chunks.append((start, limit))
+            start = limit - overlap_ms
+    chunks.append((start, duration_ms))
+    return chunks
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def stitch(texts, overlapped):
+    """
+    Join chunk transcripts in order. overlapped[i] says chunk i began inside
+    the previous chunk; for those the longest run of words that ends chunk
+    i-1 and starts chunk i is kept only once.
+    """
+    words = []
+    for index, text in enumerate(texts):
+        current = text.split()
+        if index and overlapped[index] and words:
+            tail = [_normalize(w) for w in words[-MAX_OVERLAP_WORDS:]]
+            head = [_normalize(w) for w in current[:MAX_OVERLAP_WORDS]]
+            for size in range(min(len(tail), len(head)), 0, -1):
+                if tail[-size:] == head[:size]:
+                    current = current[size:]
+                    break
+        words.extend(current)
+    return " ".join(words)
+
+
+def timing_parts(texts, chunks, overlapped):
+    """
+    Transcript.stitched() parts: each chunk's timing moves to its place in
+    the recording; an overlap is split at its middle, the first half kept
+    from the earlier chunk and the second from the later one.
+    """
+    bounds = [
+        (start + chunks[index - 1][1]) // 2 if overlapped[index] else start
+        for index, (start, _) in enumerate(chunks)
+    ]
+    bounds.append(float("inf"))
+    return [
+        (texts[index], start, bounds[index], bounds[index + 1])
+        for index, (start, _) in enumerate(chunks)
+    ]
+
+
+class ChunkedTranscriber:
+    """Transcriber wrapper that splits long audio and transcribes pieces concurrently"""
+
+    def __init__(self, inner, max_chunk_seconds=120, overlap_seconds=2, concurrency=4,
+                 min_silence_ms=500, silence_offset_db=16, logger=None):
+        self.inner = inner
+        self.max_chunk_ms = int(max_chunk_seconds * 1000)
+        self.overlap_ms = int(overlap_seconds * 1000)
+        self.min_silence_ms = min_silence_ms
+        self.silence_offset_db = silence_offset_db
+        self.logger = logger
+        # Different cuts can give different text, so they are part of the cache key
+        self.cache_options = {"chunk_max_ms": self.max_chunk_ms, "chunk_overlap_ms": self.overlap_ms}
+        # Shared by every job, so it bounds the provider calls in flight overall
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="chunk")
+
+    def transcribe(self, path):
+        try:
+            audio = AudioSegment.from_file(path)
+        except Exception as e:
+            # Undecodable here (e.g. no ffmpeg); let the provider have the whole file
+            if self.logger:
+                self.logger.warning(f"Could not decode {path} for chunking, sending whole file: {e}")
+            return self.inner.transcribe(path)
+
+        if len(audio) <= self.max_chunk_ms:
+            return self.inner.transcribe(path)
+
+        chunks = self.plan(audio)
+        with tempfile.TemporaryDirectory(prefix="chunks-") as workdir:
+            futures = [
+                self._pool.submit(self._transcribe_chunk, audio, start, end, os.path.join(workdir, f"{index:05d}.wav"))
+                for index, (start, end) in enumerate(chunks)
+            ]
+            texts = [future.result() for future in futures]
+
+        overlapped = [index > 0 and start < chunks[index - 1][1] for index, (start, _) in enumerate(chunks)]
+        text = stitch(texts, overlapped)
+        if not all(getattr(chunk_text, "timed", False) for chunk_text in texts):
+            return text
+        return Transcript.stitched(text, timing_parts(texts, chunks, overlapped))
+
+    def plan(self, audio):
+        threshold = audio.dBFS - self.silence_offset_db
+        spans = silent_spans(audio, self.min_silence_ms, threshold)
+        cut_points = [(start + end) // 2 for start, end in spans]
+        return plan_chunks(len(audio), cut_points, self.max_chunk_ms, self.overlap_ms)
+
+    def _transcribe_chunk(self, audio, start, end, chunk_path):
+        # WAV export needs no encoder, so this is a memory copy plus a write
+        audio[start:end].export(chunk_path, format="wav")
+        try:
+            return self.inner.transcribe(chunk_path)
+        finally:
+            os.remove(chunk_path)
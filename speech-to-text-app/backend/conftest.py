@@ -0,0 +1,113 @@
+"""
+Shared setup for the backend tests
+
+    python -m pytest
+
+app.py creates the app when imported, so the environment is set first: a
+throwaway database and upload folder, the stub transcriber (a short fixed
+transcript, timed one word per STUB_WORD_MS), no rate limiting and a
+small credit grant.
+"""
+
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+import wave
+from datetime import datetime
+
+import pytest
+
+WORKDIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    "UPLOAD_FOLDER": os.path.join(WORKDIR, "uploads"),
+    "TRANSCRIBER": "stub",
+    # Long enough that a second upload of the same audio finds the first still running
+    "STUB_LATENCY": "0.3",
+    "RATE_LIMIT_ENABLED": "false",
+    "CREDITS_DEFAULT_SECONDS": "60",
+    "NORMALIZE_AUDIO": "false",
+    "CHUNKED_TRANSCRIPTION": "false",
+})
+
+from app import app  # noqa: E402
+from auth import decode_token  # noqa: E402
+from extensions import db  # noqa: E402
+from jobs import job_queue  # noqa: E402
+from models import Conversion, CreditBalance  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    job_queue.shutdown()
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def sign_up(client):
+    """Make a new user; returns (user_id, headers)"""
+
+    def sign_up():
+        name = uuid.uuid4().hex[:12]
+        response = client.post("/api/auth/signup", json={
+            "username": name, "email": f"{name}@example.com", "password": "correct horse",
+        })
+        token = response.get_json()["token"]
+        return decode_token(token), {"Authorization": f"Bearer {token}"}
+
+    return sign_up
+
+
+def wav_bytes(seconds, seed=None, rate=8000):
+    """A mono 16-bit WAV of noise; a fresh seed gives different audio"""
+    rng = random.Random(seed if seed is not None else uuid.uuid4().int)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(rng.randbytes(2 * int(rate * seconds)))
+    return out.getvalue()
+
+
+def upload(client, headers, audio, filename="meeting.wav"):
+    return client.post("/api/convert/", headers=headers, data={"file": (io.BytesIO(audio), filename)})
+
+
+def wait_finished(client, headers, conversion_id, timeout=10.0):
+    """The job's status dict once it is done or failed"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/convert/{conversion_id}", headers=headers).get_json()
+        if job["status"] in Conversion.FINISHED:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {conversion_id} still {job['status']}")
+
+
+def add_conversions(user_id, texts, created_at=None, status=Conversion.DONE):
+    """Conversions inserted directly, without a job; returns their ids"""
+    with app.app_context():
+        rows = [
+            Conversion(user_id=user_id, filename=f"note-{index}.wav", text=text, status=status,
+                       created_at=created_at or datetime.utcnow())
+            for index, text in enumerate(texts)
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
+
+
+def balance(user_id):
+    with app.app_context():
+        return db.session.get(CreditBalance, user_id).balance_seconds
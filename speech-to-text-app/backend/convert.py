@@ -1,18 +1,113 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, url_for, g
 from extensions import db
+from models import Conversion, TranscriptTiming
+from jobs import job_queue
+from transcript_cache import transcript_cache
+from auth import current_user_id, token_required
+from uploads import HashingFile, upload_janitor
+from transcribers import layers, provider_client
+from normalize import NormalizingTranscriber
+from credits import credit_bank
+from ratelimit import rate_limiter
+import search as transcript_search
+from timings import EXPORTERS, buffered, save_timing
 import os
-import requests
+import json
+import queue
+import uuid
+import hashlib
+import math
+import base64
+from datetime import datetime
 from werkzeug.utils import secure_filename
-from pydub import AudioSegment
+from werkzeug.exceptions import RequestEntityTooLarge
 
 convert_bp = Blueprint("convert", __name__)
 
 UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {"mp3", "wav", "m4a", "ogg"}
+# Bytes copied per read when saving an upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Seconds between SSE keep-alive comments, so proxies keep the stream open
+SSE_HEARTBEAT = 15
+# History listing: page sizes and how much of each transcript it shows
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+PREVIEW_CHARS = 200
+# Transcript search: longest query, and how deep pages may go
+MAX_QUERY_CHARS = 200
+MAX_SEARCH_OFFSET = 1000
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def save_upload(audio, filepath):
+    """Move the upload to filepath; returns its SHA-256 hex digest"""
+    if isinstance(audio.stream, HashingFile):
+        # Already on disk and hashed by UploadRequest; just rename it
+        audio.stream.keep(filepath)
+        return audio.stream.hexdigest()
+
+    digest = hashlib.sha256()
+    with open(filepath, "wb") as out:
+        while True:
+            block = audio.stream.read(UPLOAD_CHUNK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            out.write(block)
+    return digest.hexdigest()
+
+def encode_cursor(created_at, conversion_id):
+    """Opaque keyset cursor pointing at the last (created_at, id) of a page"""
+    raw = json.dumps([created_at.isoformat(), conversion_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        created_at, conversion_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(conversion_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def encode_offset(offset):
+    """Opaque cursor for ranked search results, which page by position"""
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode("utf-8")).decode("ascii")
+
+def decode_offset(cursor):
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["offset"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if offset < 0 or offset > MAX_SEARCH_OFFSET:
+        raise ValueError("Invalid cursor")
+    return offset
+
+def job_response(conversion, status_code=200):
+    data = conversion.to_dict()
+    data["status_url"] = url_for("convert.job_status", conversion_id=conversion.id)
+    data["events_url"] = url_for("convert.job_events", conversion_id=conversion.id)
+    return jsonify(data), status_code
+
+@convert_bp.before_request
+def limit_uploads():
+    # Runs before anything touches request.files, so refusals never read the body.
+    # CORS preflights (OPTIONS) carry no token and are not uploads; let them through.
+    if request.endpoint != "convert.convert_audio" or request.method != "POST":
+        return None
+    g.user_id = current_user_id()
+    wait = rate_limiter.check(g.user_id, request.remote_addr)
+    if wait:
+        response = jsonify({"error": "Too many uploads, slow down", "retry_after": math.ceil(wait)})
+        response.headers["Retry-After"] = str(math.ceil(wait))
+        return response, 429
+    # Jobs are only ever readable by their owner, so an anonymous one could never be collected
+    if g.user_id is None:
+        return jsonify({"error": "Sign in to transcribe"}), 401
+    if credit_bank.enabled and credit_bank.balance(g.user_id) <= 0:
+        return jsonify({"error": "No transcription credit left", "balance_seconds": 0}), 402
+    return None
+
 @convert_bp.route("/", methods=["POST"])
 def convert_audio():
     try:
@@ -28,26 +123,235 @@ def convert_audio():
             return jsonify({"error": "Invalid file type"}), 400
 
         filename = secure_filename(audio.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        audio.save(filepath)
-
-        # ---- DeepInfra API call ----
-        API_KEY = os.getenv("DEEPINFRA_API_KEY")
-        url = "https://api.deepinfra.com/v1/inference/openai/whisper-large-v3"
-
-        with open(filepath, "rb") as f:
-            response = requests.post(
-                url,
-                headers={"Authorization": f"Bearer {API_KEY}"},
-                files={"file": f},
-            )
+        upload_folder = current_app.config.get("UPLOAD_FOLDER", UPLOAD_FOLDER)
+        os.makedirs(upload_folder, exist_ok=True)
+        # Unique name on disk so two uploads called audio.mp3 never collide
+        filepath = os.path.join(upload_folder, f"{uuid.uuid4().hex}_{filename}")
+        audio_sha256 = save_upload(audio, filepath)
+
+        conversion = Conversion(
+            user_id=g.user_id,
+            filename=filename,
+            filepath=filepath,
+            audio_sha256=audio_sha256,
+            status=Conversion.QUEUED
+        )
 
-        if response.status_code != 200:
-            return jsonify({"error": "DeepInfra failed", "details": response.text}), 500
+        # Already transcribed this exact recording: answer without queueing
+        cached = transcript_cache.lookup(audio_sha256, job_queue.transcriber)
+        if cached is not None:
+            conversion.text = str(cached)
+            conversion.status = Conversion.DONE
+            conversion.cache_hit = True
+            conversion.completed_at = datetime.utcnow()
+            conversion.filepath = None
+            db.session.add(conversion)
+            db.session.flush()
+            save_timing(conversion.id, cached)
+            db.session.commit()
+            os.remove(filepath)
+            return job_response(conversion)
 
-        transcript = response.json().get("text", "")
+        if credit_bank.enabled:
+            cost = credit_bank.cost(filepath)
+            if not credit_bank.charge(g.user_id, cost):
+                os.remove(filepath)
+                return jsonify({
+                    "error": "Not enough transcription credit",
+                    "required_seconds": cost,
+                    "balance_seconds": credit_bank.balance(g.user_id)
+                }), 402
+            conversion.credits_charged = cost
 
-        return jsonify({"text": transcript})
+        db.session.add(conversion)
+        db.session.commit()
 
+        job_queue.submit(conversion.id)
+        upload_janitor.ensure_started()
+        return job_response(conversion, 202)
+
+    except RequestEntityTooLarge:
+        limit_mb = (current_app.config.get("MAX_CONTENT_LENGTH") or 0) // (1024 * 1024)
+        return jsonify({"error": f"File too large (limit {limit_mb} MB)"}), 413
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
+
+@convert_bp.route("/history", methods=["GET"])
+@token_required
+def history():
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        # One character more than shown, to know whether the preview was cut
+        query = db.session.query(
+            Conversion.id, Conversion.filename, Conversion.status, Conversion.created_at,
+            db.func.substr(Conversion.text, 1, PREVIEW_CHARS + 1).label("preview")
+        ).filter(Conversion.user_id == g.user_id)
+
+        cursor = request.args.get("cursor")
+        if cursor:
+            last_created, last_id = decode_cursor(cursor)
+            # The <= bound lets the index seek to the cursor; a bare OR would scan the user's rows
+            query = query.filter(
+                Conversion.created_at <= last_created,
+                db.or_(Conversion.created_at < last_created, Conversion.id < last_id)
+            )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Walks ix_conversion_user_created backwards; cost is one page, however long the history
+    rows = query.order_by(Conversion.created_at.desc(), Conversion.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    items = [
+        {
+            "id": row.id,
+            "filename": row.filename,
+            "status": row.status,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "preview": (row.preview or "")[:PREVIEW_CHARS],
+            "truncated": len(row.preview or "") > PREVIEW_CHARS,
+            "url": url_for("convert.history_item", conversion_id=row.id),
+        }
+        for row in rows
+    ]
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+@convert_bp.route("/search", methods=["GET"])
+@token_required
+def search():
+    query = request.args.get("q", "").strip()
+    try:
+        if not query:
+            raise ValueError("q is required")
+        if len(query) > MAX_QUERY_CHARS:
+            raise ValueError(f"q must be at most {MAX_QUERY_CHARS} characters")
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        offset = decode_offset(request.args["cursor"]) if request.args.get("cursor") else 0
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Ranked results can't be keyset-paginated by position, but ranking scores every match anyway
+    items, has_more, truncated = transcript_search.search(g.user_id, query, limit, offset)
+    for item in items:
+        item["url"] = url_for("convert.history_item", conversion_id=item["id"])
+    next_cursor = encode_offset(offset + limit) if has_more else None
+    # Only the newest MAX_RANKED matches are ranked; say when older ones were left out
+    return jsonify({"items": items, "next_cursor": next_cursor, "truncated": truncated})
+
+def owned_conversion(conversion_id):
+    """The user's conversion, or None (other users' ids look like missing ones)"""
+    conversion = db.session.get(Conversion, conversion_id)
+    if conversion is None or conversion.user_id != g.user_id:
+        return None
+    return conversion
+
+@convert_bp.route("/history/<int:conversion_id>", methods=["GET"])
+@token_required
+def history_item(conversion_id):
+    conversion = owned_conversion(conversion_id)
+    if not conversion:
+        return jsonify({"error": "Conversion not found"}), 404
+    return jsonify(conversion.to_dict())
+
+@convert_bp.route("/download/<int:conversion_id>", methods=["GET"])
+@token_required
+def download(conversion_id):
+    export_format = request.args.get("format", "txt")
+    if export_format != "txt" and export_format not in EXPORTERS:
+        return jsonify({"error": f"format must be one of txt, {', '.join(EXPORTERS)}"}), 400
+    conversion = owned_conversion(conversion_id)
+    if not conversion or conversion.status != Conversion.DONE:
+        return jsonify({"error": "Transcript not found"}), 404
+    name = os.path.splitext(conversion.filename or "transcript")[0]
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{export_format}"'}
+    if export_format == "txt":
+        return Response(conversion.text or "", mimetype="text/plain", headers=headers)
+
+    timing = db.session.get(TranscriptTiming, conversion_id)
+    if timing is None:
+        return jsonify({"error": "No timing was recorded for this transcript"}), 404
+    # Blocks are inflated as the response is written, not up front
+    exporter, mimetype = EXPORTERS[export_format]
+    return Response(
+        stream_with_context(buffered(exporter(conversion.text or "", timing))),
+        mimetype=mimetype,
+        headers=headers
+    )
+
+@convert_bp.route("/credits", methods=["GET"])
+@token_required
+def credit_balance():
+    account = credit_bank.account(g.user_id)
+    return jsonify({"balance_seconds": account.balance_seconds, "spent_seconds": account.spent_seconds})
+
+@convert_bp.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(transcript_cache.stats())
+
+@convert_bp.route("/provider/stats", methods=["GET"])
+def provider_stats():
+    client = provider_client(job_queue.transcriber)
+    if client is None:
+        return jsonify({"error": "Transcriber makes no HTTP calls"}), 404
+    return jsonify(client.stats())
+
+@convert_bp.route("/normalize/stats", methods=["GET"])
+def normalize_stats():
+    normalizer = next((layer for layer in layers(job_queue.transcriber) if isinstance(layer, NormalizingTranscriber)), None)
+    if normalizer is None:
+        return jsonify({"error": "Audio normalization is off"}), 404
+    return jsonify(normalizer.stats())
+
+@convert_bp.route("/<int:conversion_id>", methods=["GET"])
+@token_required
+def job_status(conversion_id):
+    conversion = owned_conversion(conversion_id)
+    if not conversion:
+        return jsonify({"error": "Job not found"}), 404
+    return job_response(conversion)
+
+@convert_bp.route("/<int:conversion_id>/events", methods=["GET"])
+@token_required
+def job_events(conversion_id):
+    conversion = owned_conversion(conversion_id)
+    if not conversion:
+        return jsonify({"error": "Job not found"}), 404
+
+    # Subscribe before reading the current state so no transition is missed
+    events = job_queue.subscribe(conversion_id)
+    db.session.refresh(conversion)
+    current = conversion.to_dict()
+    db.session.remove()
+
+    def stream():
+        try:
+            payload, sent = current, None
+            while True:
+                # The job may have moved on before we subscribed; skip repeats
+                if payload != sent:
+                    yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+                    sent = payload
+                if payload["status"] in Conversion.FINISHED:
+                    return
+                while True:
+                    try:
+                        payload = events.get(timeout=SSE_HEARTBEAT)
+                        break
+                    except queue.Empty:
+                        yield ": keep-alive\n\n"
+        finally:
+            job_queue.unsubscribe(conversion_id, events)
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
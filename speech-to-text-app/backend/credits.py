@@ -0,0 +1,129 @@
+"""
+Per-user transcription credit, in seconds of audio
+
+Add credit with `python credits.py grant <email> <seconds>`.
+"""
+
+import math
+import os
+import shutil
+import sys
+import wave
+from datetime import datetime
+from pydub.utils import mediainfo
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import CreditBalance
+
+# Size-based duration estimate when the format can't be read here (128 kbit/s)
+ESTIMATE_BYTES_PER_SECOND = 16000
+
+
+def audio_seconds(path):
+    """Duration of an audio file in seconds, exact where possible"""
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (wave.Error, EOFError, ZeroDivisionError):
+        pass
+    if shutil.which("ffprobe"):
+        try:
+            return float(mediainfo(path)["duration"])
+        except (KeyError, ValueError):
+            pass
+    return os.path.getsize(path) / ESTIMATE_BYTES_PER_SECOND
+
+
+class CreditBank:
+    """Flask extension over the credit_balance table"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.default_seconds = 3600
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("CREDITS_ENABLED", True))
+        self.default_seconds = int(app.config.get("CREDITS_DEFAULT_SECONDS", 3600))
+        app.extensions["credit_bank"] = self
+
+    @staticmethod
+    def cost(path):
+        """Seconds of credit an upload costs; at least one"""
+        return max(1, math.ceil(audio_seconds(path)))
+
+    def account(self, user_id):
+        """The user's CreditBalance row, opened with the default grant if missing"""
+        account = db.session.get(CreditBalance, user_id)
+        if account is None:
+            db.session.add(CreditBalance(user_id=user_id, balance_seconds=self.default_seconds))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Opened concurrently by another request
+                db.session.rollback()
+            account = db.session.get(CreditBalance, user_id)
+        return account
+
+    def balance(self, user_id):
+        return self.account(user_id).balance_seconds
+
+    def charge(self, user_id, seconds):
+        """Take seconds from the balance; False (and nothing taken) if it is short"""
+        self.account(user_id)
+        # One conditional UPDATE: concurrent charges can never overdraw the balance
+        result = db.session.execute(
+            db.update(CreditBalance)
+            .where(CreditBalance.user_id == user_id, CreditBalance.balance_seconds >= seconds)
+            .values(
+                balance_seconds=CreditBalance.balance_seconds - seconds,
+                spent_seconds=CreditBalance.spent_seconds + seconds,
+                updated_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def refund(self, user_id, seconds):
+        if user_id is None or not seconds:
+            return
+        db.session.execute(
+            db.update(CreditBalance)
+            .where(CreditBalance.user_id == user_id)
+            .values(
+                balance_seconds=CreditBalance.balance_seconds + seconds,
+                spent_seconds=CreditBalance.spent_seconds - seconds,
+                updated_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def grant(self, user_id, seconds):
+        self.account(user_id)
+        db.session.execute(
+            db.update(CreditBalance)
+            .where(CreditBalance.user_id == user_id)
+            .values(balance_seconds=CreditBalance.balance_seconds + seconds, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+
+credit_bank = CreditBank()
+
+
+if __name__ == "__main__":
+    from app import app
+    from models import User
+
+    if len(sys.argv) != 4 or sys.argv[1] != "grant":
+        sys.exit("usage: python credits.py grant <email> <seconds>")
+    with app.app_context():
+        user = User.query.filter_by(email=sys.argv[2]).first()
+        if user is None:
+            sys.exit(f"No user {sys.argv[2]}")
+        credit_bank.grant(user.id, int(sys.argv[3]))
+        print(f"💳 {user.email} now has {credit_bank.balance(user.id)} seconds of credit")
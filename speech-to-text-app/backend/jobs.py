@@ -0,0 +1,173 @@
+"""
+Background transcription jobs
+
+POST /api/convert/ stores the upload, records a queued Conversion and returns
+its id straight away. A pool of TRANSCRIBE_WORKERS threads takes ids off the
+queue and runs them through the configured transcriber, so a long file ties
+up one transcription worker instead of an HTTP worker.
+
+Clients follow a job by polling GET /api/convert/<id> or by subscribing to
+GET /api/convert/<id>/events (server-sent events). Status changes are
+published in-process, so with several server processes each client must hit
+the process that is running its job or fall back to polling.
+
+Every process recovers unfinished jobs on start, so a worker claims a job
+with a conditional UPDATE before transcribing it. A processing job is only
+taken over once its JOB_LEASE_SECONDS have run out.
+"""
+
+import queue
+import threading
+from datetime import datetime, timedelta
+from extensions import db
+from models import Conversion
+from transcribers import make_transcriber
+from transcript_cache import transcript_cache
+from credits import credit_bank
+from timings import save_timing
+
+
+class JobQueue:
+    """Flask extension owning the transcription queue and its worker threads"""
+
+    def __init__(self, app=None, transcriber=None):
+        self.app = None
+        self.transcriber = transcriber
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.worker_count = int(app.config.get("TRANSCRIBE_WORKERS", 2))
+        self.lease_seconds = float(app.config.get("JOB_LEASE_SECONDS", 3600))
+        if self.transcriber is None:
+            self.transcriber = make_transcriber(app.config.get("TRANSCRIBER", "deepinfra"), app.config, app.logger)
+        app.extensions["job_queue"] = self
+
+    def submit(self, conversion_id):
+        self._ensure_started()
+        self._queue.put(conversion_id)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def recover(self):
+        """Requeue jobs a previous process accepted but never finished"""
+        unfinished = Conversion.query.with_entities(Conversion.id).filter(
+            self._claimable()
+        ).order_by(Conversion.id).all()
+        for row in unfinished:
+            self.submit(row.id)
+        return len(unfinished)
+
+    def shutdown(self, timeout=5.0):
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    # Status events
+
+    def subscribe(self, conversion_id):
+        """A queue receiving this job's status dicts as they change"""
+        events = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(conversion_id, []).append(events)
+        return events
+
+    def unsubscribe(self, conversion_id, events):
+        with self._lock:
+            listeners = self._subscribers.get(conversion_id, [])
+            if events in listeners:
+                listeners.remove(events)
+            if not listeners:
+                self._subscribers.pop(conversion_id, None)
+
+    def _publish(self, conversion):
+        payload = conversion.to_dict()
+        with self._lock:
+            listeners = list(self._subscribers.get(conversion.id, []))
+        for events in listeners:
+            events.put(payload)
+
+    # Workers
+
+    def _claimable(self):
+        """Queued jobs, and processing ones whose worker has been silent past the lease"""
+        stale = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        return db.or_(
+            Conversion.status == Conversion.QUEUED,
+            db.and_(Conversion.status == Conversion.PROCESSING, Conversion.started_at < stale),
+        )
+
+    def _claim(self, conversion_id):
+        """Move the job to processing; False if another worker or process has it"""
+        won = Conversion.query.filter(Conversion.id == conversion_id, self._claimable()).update(
+            {"status": Conversion.PROCESSING, "started_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+        return bool(won)
+
+    def _ensure_started(self):
+        # Threads start on first use so importing the app never spawns them
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.worker_count):
+                worker = threading.Thread(target=self._run, name=f"transcriber-{index}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _run(self):
+        while True:
+            conversion_id = self._queue.get()
+            if conversion_id is None:
+                return
+            with self.app.app_context():
+                try:
+                    self._process(conversion_id)
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.exception(f"Transcription job {conversion_id} crashed: {e}")
+                finally:
+                    db.session.remove()
+
+    def _process(self, conversion_id):
+        if not self._claim(conversion_id):
+            return
+        conversion = db.session.get(Conversion, conversion_id)
+        path, audio_sha256 = conversion.filepath, conversion.audio_sha256
+        self._publish(conversion)
+        # Nothing is held open against the database while the provider works
+        db.session.close()
+
+        try:
+            text, cached = transcript_cache.transcribe(audio_sha256, path, self.transcriber)
+            conversion = db.session.get(Conversion, conversion_id)
+            conversion.text = str(text)
+            save_timing(conversion_id, text)
+            conversion.cache_hit = cached
+            conversion.status = Conversion.DONE
+            conversion.error = None
+        except Exception as e:
+            conversion = db.session.get(Conversion, conversion_id)
+            conversion.status = Conversion.FAILED
+            conversion.error = str(e)[:1000]
+            self.app.logger.warning(f"Transcription job {conversion_id} failed: {e}")
+        if conversion.credits_charged and (conversion.cache_hit or conversion.status == Conversion.FAILED):
+            # The provider was never paid for this one
+            credit_bank.refund(conversion.user_id, conversion.credits_charged)
+            conversion.credits_charged = 0
+        conversion.completed_at = datetime.utcnow()
+        db.session.commit()
+        self._publish(conversion)
+
+
+job_queue = JobQueue()
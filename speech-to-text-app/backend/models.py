@@ -1,5 +1,6 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy import text
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -8,8 +9,94 @@ class User(db.Model):
     password = db.Column(db.String(200))
 
 class Conversion(db.Model):
+    """One transcription job; text is filled in once status reaches done"""
+    # Serves the per-user history listing, newest first, keyset-paginated
+    __table_args__ = (db.Index("ix_conversion_user_created", "user_id", "created_at", "id"),)
+
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+    FINISHED = (DONE, FAILED)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer)
     filename = db.Column(db.String(255))
     text = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default=QUEUED)
+    error = db.Column(db.Text)
+    # Where the upload waits until a worker picks it up
+    filepath = db.Column(db.String(500))
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    # SHA-256 of the uploaded bytes; keys the transcript cache
+    audio_sha256 = db.Column(db.String(64), index=True)
+    cache_hit = db.Column(db.Boolean, default=False)
+    # Seconds of credit taken at upload; given back if the provider is never paid
+    credits_charged = db.Column(db.Integer, default=0)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "text": self.text,
+            "error": self.error,
+            "cache_hit": bool(self.cache_hit),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
+
+
+class TranscriptCache(db.Model):
+    """Transcript for a given audio hash, model and transcription options"""
+    id = db.Column(db.Integer, primary_key=True)
+    # sha256 over audio hash + model + options
+    cache_key = db.Column(db.String(64), unique=True, nullable=False)
+    audio_sha256 = db.Column(db.String(64), nullable=False)
+    model = db.Column(db.String(100))
+    text = db.Column(db.Text, nullable=False)
+    # Timing blobs as in TranscriptTiming, when the provider sent timing
+    segments = db.Column(db.LargeBinary)
+    words = db.Column(db.LargeBinary)
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class TranscriptTiming(db.Model):
+    """Segment and word timing of a conversion's transcript, as timings.encode_rows() blobs"""
+    conversion_id = db.Column(db.Integer, primary_key=True)
+    segment_count = db.Column(db.Integer, nullable=False, default=0)
+    word_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_ms = db.Column(db.Integer, nullable=False, default=0)
+    segments = db.Column(db.LargeBinary)
+    words = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class CreditBalance(db.Model):
+    """A user's remaining transcription credit, in seconds of audio"""
+    user_id = db.Column(db.Integer, primary_key=True)
+    balance_seconds = db.Column(db.Integer, nullable=False, default=0)
+    spent_seconds = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def add_missing_columns():
+    """create_all() never alters existing tables; add columns introduced since"""
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {column.name} {column_type}'))
+        db.session.commit()
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(db.engine)
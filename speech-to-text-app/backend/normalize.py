@@ -0,0 +1,168 @@
+"""
+Audio normalization before upload
+
+Whisper-family models resample everything to 16 kHz mono on their side, so
+sending the user's 48 kHz stereo WAV or a high-bitrate m4a only costs upload
+bandwidth and provider time. NormalizingTranscriber wraps the transcriber
+chain and hands it a 16 kHz mono copy instead.
+
+With ffmpeg on the PATH, one ffmpeg process reads the upload in place,
+decodes, downmixes, resamples and re-encodes it (FLAC by default, or Opus)
+and writes to a pipe. The output is streamed to disk and abandoned as soon
+as it grows past the original, in which case the original is sent. Without
+ffmpeg, WAV uploads are converted with pydub to 16-bit mono WAV and other
+formats are sent as they are.
+
+Bytes in and out and the CPU time spent, ffmpeg's included, are logged for
+every file and totalled in stats().
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pydub import AudioSegment
+
+try:
+    import ffmpeg
+except ImportError:  # ffmpeg-python is optional; the pydub path still works
+    ffmpeg = None
+
+# ffmpeg output options and file suffix per NORMALIZE_CODEC
+CODECS = {
+    "flac": ({"format": "flac", "sample_fmt": "s16"}, ".flac"),
+    "opus": ({"format": "ogg", "acodec": "libopus", "audio_bitrate": "24k"}, ".ogg"),
+}
+PIPE_BLOCK = 64 * 1024
+
+
+class NormalizingTranscriber:
+    """Transcriber wrapper that sends a downmixed, resampled copy of the audio"""
+
+    def __init__(self, inner, sample_rate=16000, codec="flac", logger=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown NORMALIZE_CODEC {codec!r}; choose from {', '.join(CODECS)}")
+        self.inner = inner
+        self.sample_rate = sample_rate
+        self.codec = codec
+        self.logger = logger
+        self.use_ffmpeg = ffmpeg is not None and shutil.which("ffmpeg") is not None
+        # The provider hears different audio, so it is part of the cache key
+        self.cache_options = {"normalize_rate": sample_rate, "normalize_codec": codec}
+
+        self._lock = threading.Lock()
+        self.files = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def transcribe(self, path):
+        try:
+            normalized = self.normalize(path)
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"Could not normalize {path}, sending it as is: {e}")
+            normalized = None
+        if normalized is None:
+            return self.inner.transcribe(path)
+        try:
+            return self.inner.transcribe(normalized)
+        finally:
+            os.remove(normalized)
+
+    def normalize(self, path):
+        """Path of a temporary 16 kHz mono copy, or None if the original should be sent"""
+        size_in = os.path.getsize(path)
+        started = time.thread_time()
+        if self.use_ffmpeg:
+            normalized, child_cpu = self._ffmpeg(path, size_in)
+        else:
+            normalized, child_cpu = self._pydub(path), 0.0
+        cpu = time.thread_time() - started + child_cpu
+        size_out = os.path.getsize(normalized) if normalized else size_in
+
+        with self._lock:
+            self.files += 1
+            self.skipped += normalized is None
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+            self.cpu_seconds += cpu
+        if self.logger:
+            saved = 1 - size_out / size_in if size_in else 0.0
+            self.logger.info(
+                f"Normalized {os.path.basename(path)}: {size_in} -> {size_out} bytes "
+                f"({saved:.0%} saved), {cpu * 1000:.0f} ms CPU"
+            )
+        return normalized
+
+    def _ffmpeg(self, path, limit):
+        options, suffix = CODECS[self.codec]
+        fd, out_path = tempfile.mkstemp(prefix="normalized-", suffix=suffix)
+        process = (
+            ffmpeg.input(path, nostdin=None, loglevel="error")
+            .output("pipe:", ac=1, ar=self.sample_rate, **options)
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        written = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while written <= limit:
+                    block = process.stdout.read(PIPE_BLOCK)
+                    if not block:
+                        break
+                    out.write(block)
+                    written += len(block)
+            if written > limit:
+                # Already bigger than what the user sent; not worth finishing
+                process.kill()
+            process.stdout.close()
+            errors = process.stderr.read().decode(errors="replace").strip()
+        except BaseException:
+            process.kill()
+            os.remove(out_path)
+            raise
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+            # Always reaped, even when reading failed. wait4 rather than wait()
+            # so the child's own CPU time is known.
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        child_cpu = usage.ru_utime + usage.ru_stime
+
+        if written > limit or process.returncode != 0:
+            os.remove(out_path)
+            if written <= limit:
+                raise RuntimeError(f"ffmpeg exited with {process.returncode}: {errors[-500:]}")
+            return None, child_cpu
+        return out_path, child_cpu
+
+    def _pydub(self, path):
+        # Without ffmpeg pydub can only decode WAV
+        if not path.lower().endswith(".wav"):
+            return None
+        audio = AudioSegment.from_wav(path)
+        if audio.channels == 1 and audio.frame_rate <= self.sample_rate and audio.sample_width <= 2:
+            return None
+        audio = audio.set_channels(1).set_frame_rate(self.sample_rate).set_sample_width(2)
+        fd, out_path = tempfile.mkstemp(prefix="normalized-", suffix=".wav")
+        os.close(fd)
+        audio.export(out_path, format="wav")
+        return out_path
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "ffmpeg" if self.use_ffmpeg else "pydub",
+                "sample_rate": self.sample_rate,
+                "codec": self.codec if self.use_ffmpeg else "wav",
+                "files": self.files,
+                "skipped": self.skipped,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "cpu_seconds": round(self.cpu_seconds, 3),
+                "cpu_ms_per_file": round(self.cpu_seconds * 1000 / self.files, 1) if self.files else 0.0,
+            }
@@ -0,0 +1,180 @@
+"""
+Opt-in per-request profiling
+
+With PROFILING_ENABLED on, each route's wall time and SQL count and time are
+totalled for /metrics, and statements slower than SLOW_QUERY_MS are logged.
+A request whose X-Profile header carries PROFILE_SECRET (or one picked by
+PROFILE_SAMPLE_RATE) runs under cProfile, dumped to PROFILE_DIR.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from flask import request
+from sqlalchemy import event
+
+_state = threading.local()
+
+
+def _current():
+    return getattr(_state, "request", None)
+
+
+class RequestStats:
+    """What one request has spent so far"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.profile = None
+
+
+class RequestProfiler:
+    """Flask extension collecting per-route timings and query counts"""
+
+    def __init__(self, app=None, db=None):
+        self.db = db
+        self.enabled = False
+        self.routes = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        """Call after db.init_app; engines are created there"""
+        self.db = db or self.db
+        self.enabled = bool(app.config.get("PROFILING_ENABLED", False))
+        app.extensions["request_profiler"] = self
+        if not self.enabled:
+            return
+
+        self.logger = app.logger
+        self.slow_query = float(app.config.get("SLOW_QUERY_MS", 100)) / 1000
+        self.secret = app.config.get("PROFILE_SECRET") or ""
+        self.max_files = int(app.config.get("PROFILE_MAX_FILES", 50))
+        self.sample_rate = float(app.config.get("PROFILE_SAMPLE_RATE", 0.0))
+        self.profile_dir = app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        with app.app_context():
+            engine = self.db.engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    # Request hooks
+
+    def _before_request(self):
+        stats = RequestStats()
+        _state.request = stats
+        # Without a secret the header is ignored, so clients can't make the server write files
+        sent = request.headers.get("X-Profile")
+        authorized = bool(self.secret and sent) and hmac.compare_digest(sent.encode(), self.secret.encode())
+        # cProfile allows one active profiler at a time; busy means skip, not wait
+        if (authorized or random.random() < self.sample_rate) and self._profiling.acquire(blocking=False):
+            stats.profile = cProfile.Profile()
+            stats.profile.enable()
+
+    def _after_request(self, response):
+        stats = _current()
+        if stats is None:
+            return response
+        # Stops when the view returns, so streamed bodies (SSE, exports) are not included
+        wall = time.perf_counter() - stats.started
+
+        if stats.profile is not None:
+            stats.profile.disable()
+            self._profiling.release()
+            response.headers["X-Profile-Dump"] = self._dump(stats.profile)
+            stats.profile = None
+
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        with self._lock:
+            totals = self.routes[(request.method, route)]
+            totals["requests"] += 1
+            totals["seconds"] += wall
+            totals["queries"] += stats.queries
+            totals["query_seconds"] += stats.query_time
+            totals["max_seconds"] = max(totals["max_seconds"], wall)
+        response.headers["Server-Timing"] = (
+            f"app;dur={wall * 1000:.1f}, db;dur={stats.query_time * 1000:.1f};desc=\"{stats.queries} queries\""
+        )
+        return response
+
+    def _teardown_request(self, exc):
+        stats = _current()
+        if stats is not None and stats.profile is not None:
+            # The view raised before after_request could stop the profiler
+            stats.profile.disable()
+            self._profiling.release()
+        _state.request = None
+
+    def _dump(self, profile):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9]+", "_", request.path).strip("_") or "root"
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}.{time.time_ns() // 1000 % 1000000:06d}"
+        path = os.path.join(self.profile_dir, f"{stamp}-{request.method}-{name}.prof")
+        profile.dump_stats(path)
+        # Keep the newest max_files; runs under the _profiling lock, so dumps never race here
+        dumps = sorted(
+            (entry for entry in os.scandir(self.profile_dir) if entry.name.endswith(".prof")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in dumps[:max(0, len(dumps) - self.max_files)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        return os.path.basename(path)
+
+    # Engine events
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current() is not None:
+            conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = _current()
+        if stats is None or not conn.info.get("profiler_started"):
+            return
+        elapsed = time.perf_counter() - conn.info["profiler_started"].pop()
+        stats.queries += 1
+        stats.query_time += elapsed
+        if elapsed >= self.slow_query:
+            self.logger.warning(
+                f"Slow query ({elapsed * 1000:.0f}ms) in {request.path}: "
+                f"{' '.join(statement.split())[:500]} params={parameters!r:.500}"
+            )
+
+    # Export
+
+    def prometheus(self):
+        """Per-route totals in the Prometheus text exposition format"""
+        metrics = (
+            ("requests", "http_requests_total", "counter"),
+            ("seconds", "http_request_seconds_total", "counter"),
+            ("max_seconds", "http_request_seconds_max", "gauge"),
+            ("queries", "http_request_db_queries_total", "counter"),
+            ("query_seconds", "http_request_db_seconds_total", "counter"),
+        )
+        with self._lock:
+            routes = {key: dict(totals) for key, totals in self.routes.items()}
+        lines = []
+        for field, metric, kind in metrics:
+            lines.append(f"# TYPE {metric} {kind}")
+            for (method, route), totals in sorted(routes.items()):
+                value = totals.get(field, 0)
+                lines.append(f'{metric}{{method="{method}",route="{route}"}} {round(float(value), 6)}')
+        return "\n".join(lines) + "\n"
+
+
+request_profiler = RequestProfiler()
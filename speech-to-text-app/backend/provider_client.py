@@ -0,0 +1,252 @@
+"""
+HTTP client for the transcription provider
+
+One pooled requests.Session for every provider call, with timeouts, a cap on
+calls in flight, retries and a circuit breaker.
+"""
+
+import random
+import statistics
+import threading
+import time
+from collections import Counter, deque
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Errors raised before the provider could have taken the request. A read
+# timeout may mean it is still transcribing, and billing, so it is never
+# retried. ConnectTimeout is a ConnectionError.
+RETRY_ERRORS = (requests.ConnectionError,)
+# Latencies kept for the percentiles in stats()
+LATENCY_WINDOW = 1000
+
+
+class ProviderError(Exception):
+    """The provider could not be reached or kept failing"""
+
+
+class CircuitOpenError(ProviderError):
+    """The breaker is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Opens after threshold failed attempts in a row: closed -> open -> half-open -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold=5, reset_seconds=30.0):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.HALF_OPEN and not self._trial:
+                # Exactly one caller probes the provider
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a trial call through"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+
+class ProviderClient:
+    """Pooled, retrying, rate-limited HTTP client shared by all provider calls"""
+
+    def __init__(self, connect_timeout=5.0, read_timeout=300.0, max_retries=3, backoff=0.5,
+                 backoff_max=30.0, concurrency=8, breaker_threshold=5, breaker_reset=30.0, logger=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.concurrency = concurrency
+        self.logger = logger
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+        self.session = requests.Session()
+        # Retries are ours (they need a fresh body and count toward the breaker)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._statuses = Counter()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.wait_seconds = 0.0
+
+    @classmethod
+    def from_config(cls, config, logger=None):
+        return cls(
+            connect_timeout=config.get("PROVIDER_CONNECT_TIMEOUT", 5.0),
+            read_timeout=config.get("PROVIDER_READ_TIMEOUT", 300.0),
+            max_retries=config.get("PROVIDER_MAX_RETRIES", 3),
+            backoff=config.get("PROVIDER_BACKOFF_SECONDS", 0.5),
+            concurrency=config.get("PROVIDER_CONCURRENCY", 8),
+            breaker_threshold=config.get("PROVIDER_BREAKER_THRESHOLD", 5),
+            breaker_reset=config.get("PROVIDER_BREAKER_RESET", 30.0),
+            logger=logger,
+        )
+
+    def post(self, url, body=None, headers=None):
+        """
+        POST to url and return the final response (2xx, a non-retryable
+        status, or the last retryable one once retries run out).
+
+        body is a callable returning the request body, called once per
+        attempt so a streamed file body is re-opened for every retry. If the
+        body has a content_type it is sent as Content-Type.
+        Raises ProviderError when no response could be had.
+        """
+        with self._lock:
+            self.calls += 1
+        started = time.perf_counter()
+        self._slots.acquire()
+        with self._lock:
+            self.wait_seconds += time.perf_counter() - started
+            self.in_flight += 1
+        try:
+            return self._post(url, body, headers or {})
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def _post(self, url, body, headers):
+        attempt = 0
+        while True:
+            # Built before asking the breaker, so a bad body never holds the trial slot
+            data = body() if callable(body) else body
+            if not self.breaker.allow():
+                if hasattr(data, "close"):
+                    data.close()
+                with self._lock:
+                    self.rejected += 1
+                raise CircuitOpenError(
+                    f"Provider circuit open after repeated failures; retry in {self.breaker.retry_in():.0f}s"
+                )
+
+            request_headers = dict(headers)
+            if getattr(data, "content_type", None):
+                request_headers["Content-Type"] = data.content_type
+            started = time.perf_counter()
+            try:
+                response = self.session.post(url, data=data, headers=request_headers, timeout=self.timeout)
+                error, status = None, response.status_code
+            except requests.RequestException as e:
+                response, error, status = None, e, type(e).__name__
+            finally:
+                if hasattr(data, "close"):
+                    data.close()
+            self._record(time.perf_counter() - started, status)
+
+            if error is None and status not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+            if status == 429:
+                # Up but busy: retried, and a sign of life for the breaker
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+            if attempt >= self.max_retries or (error is not None and not isinstance(error, RETRY_ERRORS)):
+                if response is not None:
+                    return response
+                with self._lock:
+                    self.failures += 1
+                raise ProviderError(f"Provider call failed after {attempt + 1} attempt(s): {error}")
+
+            delay = self._delay(attempt, response)
+            if self.logger:
+                self.logger.warning(f"Provider call failed ({status}); retry {attempt + 1} in {delay:.2f}s")
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def _delay(self, attempt, response):
+        # Full jitter: concurrent callers that failed together retry apart
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(self.backoff_max, float(retry_after)))
+            except ValueError:
+                pass  # HTTP-date form; the jittered backoff will do
+        return delay
+
+    def _record(self, seconds, status):
+        with self._lock:
+            self.attempts += 1
+            self._latencies.append(seconds)
+            self._statuses[str(status)] += 1
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            # Nearest cut points; quantiles() wants at least two values
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+            cuts = cuts or [0.0] * 99
+            return {
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "concurrency": self.concurrency,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "statuses": dict(self._statuses),
+                "latency_ms": {
+                    "p50": round(cuts[49] * 1000, 1),
+                    "p95": round(cuts[94] * 1000, 1),
+                    "p99": round(cuts[98] * 1000, 1),
+                    "max": round(max(latencies, default=0.0) * 1000, 1),
+                },
+                "breaker": {
+                    "state": self.breaker.state,
+                    "consecutive_failures": self.breaker.failures,
+                    "times_opened": self.breaker.opened,
+                },
+            }
@@ -0,0 +1,86 @@
+"""
+In-process token-bucket rate limiting for uploads and streams
+
+Buckets live in this process's memory, so with several workers each enforces
+its own share of the limit.
+"""
+
+import threading
+import time
+
+# Fully refilled buckets are pruned once there are more than this many
+MAX_BUCKETS = 100000
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by any hashable, all sharing one rate and burst"""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.burst = float(burst)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, now=None):
+        """0.0 if a token was taken, else seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune(now)
+                bucket = self._buckets[key] = [self.burst, now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1.0:
+                bucket[0] = tokens - 1.0
+                return 0.0
+            bucket[0] = tokens
+            return (1.0 - tokens) / self.rate if self.rate else float("inf")
+
+    def _prune(self, now):
+        # A full bucket behaves exactly like a missing one
+        full = [key for key, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for key in full:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """Flask extension holding the per-user and per-IP upload limiters"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.users = TokenBucketLimiter(10, 5)
+        self.ips = TokenBucketLimiter(30, 10)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("RATE_LIMIT_ENABLED", True))
+        self.users = TokenBucketLimiter(
+            float(app.config.get("RATE_LIMIT_USER_PER_MINUTE", 10)),
+            float(app.config.get("RATE_LIMIT_USER_BURST", 5)),
+        )
+        self.ips = TokenBucketLimiter(
+            float(app.config.get("RATE_LIMIT_IP_PER_MINUTE", 30)),
+            float(app.config.get("RATE_LIMIT_IP_BURST", 10)),
+        )
+        app.extensions["rate_limiter"] = self
+
+    def check(self, user_id, ip):
+        """0.0 if the call may proceed, else seconds the client should wait"""
+        # Called from a before_request hook, so a refused upload is never read
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        wait = self.ips.take(ip, now)
+        if not wait and user_id is not None:
+            wait = self.users.take(user_id, now)
+        return wait
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,164 @@
+"""
+Full-text search over a user's transcripts
+
+On SQLite an FTS5 index, kept in step by triggers, ranks matches by BM25;
+other databases fall back to a LIKE scan of the user's transcripts.
+"""
+
+import html
+import re
+from sqlalchemy import text
+from extensions import db
+
+# Placeholders FTS5 puts around matches; swapped for <mark> after escaping
+OPEN, CLOSE = "\ue000", "\ue001"
+SNIPPET_TOKENS = 16
+# BM25 scores every match before sorting, so only the newest this many are
+# ranked; older matches are left out and the response says "truncated"
+MAX_RANKED = 2000
+# BM25 column weights: owner, filename, text
+RANK = "bm25(conversion_fts, 0.0, 2.0, 1.0)"
+
+# External content: the index reads columns back from the view, so transcripts
+# are stored once. owner is "u<user_id>", so a search is owner:u7 AND (terms)
+# and never visits other users' documents.
+SCHEMA = [
+    """CREATE VIEW IF NOT EXISTS conversion_search AS
+       SELECT id, 'u' || COALESCE(user_id, 0) AS owner, filename, text FROM conversion""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS conversion_fts USING fts5(
+       owner, filename, text,
+       content='conversion_search', content_rowid='id', tokenize='porter unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS conversion_fts_insert AFTER INSERT ON conversion BEGIN
+       INSERT INTO conversion_fts(rowid, owner, filename, text)
+       VALUES (new.id, 'u' || COALESCE(new.user_id, 0), new.filename, new.text);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS conversion_fts_delete AFTER DELETE ON conversion BEGIN
+       INSERT INTO conversion_fts(conversion_fts, rowid, owner, filename, text)
+       VALUES ('delete', old.id, 'u' || COALESCE(old.user_id, 0), old.filename, old.text);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS conversion_fts_update AFTER UPDATE OF user_id, filename, text ON conversion BEGIN
+       INSERT INTO conversion_fts(conversion_fts, rowid, owner, filename, text)
+       VALUES ('delete', old.id, 'u' || COALESCE(old.user_id, 0), old.filename, old.text);
+       INSERT INTO conversion_fts(rowid, owner, filename, text)
+       VALUES (new.id, 'u' || COALESCE(new.user_id, 0), new.filename, new.text);
+       END""",
+]
+
+
+def fts_available():
+    return db.engine.dialect.name == "sqlite"
+
+
+def create_search_index():
+    """Create the FTS5 index and its triggers; index existing rows the first time"""
+    if not fts_available():
+        return
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = 'conversion_fts'")
+    ).first() is not None
+    for statement in SCHEMA:
+        db.session.execute(text(statement))
+    if not exists:
+        db.session.execute(text("INSERT INTO conversion_fts(conversion_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def match_expression(query, user_id):
+    """FTS5 query matching every word within the user's documents; None if there are no words"""
+    # Quoted, so FTS5 operators are plain words. No prefix matching: expanding a
+    # prefix over the whole vocabulary makes every lookup tens of times slower.
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    terms = " ".join(f'"{word}"' for word in words)
+    return f"owner:u{int(user_id)} AND ({terms})"
+
+
+def marked(fragment):
+    """HTML-escape a snippet and turn the match placeholders into <mark>"""
+    escaped = html.escape(fragment or "")
+    return escaped.replace(OPEN, "<mark>").replace(CLOSE, "</mark>")
+
+
+def search(user_id, query, limit, offset):
+    """(rows, has_more, truncated) for one page of the user's best matches"""
+    if fts_available():
+        expression = match_expression(query, user_id)
+        if expression is None:
+            return [], False, False
+        # Rank first, then snippet only the page: SQLite would otherwise build a
+        # snippet for every match before sorting. CROSS JOIN keeps page as the
+        # outer loop, so each snippet is a rowid lookup, not another full MATCH.
+        rows = db.session.execute(text(f"""
+            WITH oldest_ranked AS (
+                SELECT rowid FROM conversion_fts WHERE conversion_fts MATCH :expression
+                ORDER BY rowid DESC LIMIT 1 OFFSET :max_ranked
+            ), page AS (
+                SELECT rowid AS id, {RANK} AS score FROM conversion_fts
+                WHERE conversion_fts MATCH :expression
+                  AND rowid > COALESCE((SELECT rowid FROM oldest_ranked), 0)
+                ORDER BY score LIMIT :limit OFFSET :offset
+            )
+            SELECT c.id, c.filename, c.status, c.created_at,
+                   highlight(conversion_fts, 1, :open, :close) AS filename_marked,
+                   snippet(conversion_fts, 2, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet,
+                   page.score,
+                   EXISTS (SELECT 1 FROM oldest_ranked) AS truncated
+            FROM page
+            CROSS JOIN conversion_fts
+            JOIN conversion c ON c.id = page.id
+            WHERE conversion_fts MATCH :expression AND conversion_fts.rowid = page.id
+              AND c.user_id = :user_id
+            ORDER BY page.score, page.id
+        """).columns(created_at=db.DateTime), {
+            "open": OPEN, "close": CLOSE, "expression": expression,
+            "user_id": user_id, "limit": limit + 1, "offset": offset, "max_ranked": MAX_RANKED,
+        }).all()
+        items = [
+            {
+                "id": row.id,
+                "filename": row.filename,
+                "status": row.status,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "filename_marked": marked(row.filename_marked),
+                "snippet": marked(row.snippet),
+                "score": round(-row.score, 4),
+            }
+            for row in rows[:limit]
+        ]
+        truncated = bool(rows) and bool(rows[0].truncated)
+        return items, len(rows) > limit, truncated
+    return like_search(user_id, query, limit, offset)
+
+
+def like_search(user_id, query, limit, offset):
+    """Fallback without FTS5: substring scan of the user's transcripts, never truncated"""
+    from models import Conversion
+
+    needle = query.strip()
+    if not needle:
+        return [], False, False
+    pattern = "%" + needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    rows = Conversion.query.filter(
+        Conversion.user_id == user_id,
+        db.or_(Conversion.text.ilike(pattern, escape="\\"), Conversion.filename.ilike(pattern, escape="\\"))
+    ).order_by(Conversion.created_at.desc(), Conversion.id.desc()).offset(offset).limit(limit + 1).all()
+
+    items = []
+    for row in rows[:limit]:
+        body = row.text or ""
+        at = body.lower().find(needle.lower())
+        start = max(0, at - 60) if at >= 0 else 0
+        fragment = body[start:start + 160]
+        if at >= 0:
+            fragment = fragment.replace(body[at:at + len(needle)], OPEN + body[at:at + len(needle)] + CLOSE, 1)
+        items.append({
+            "id": row.id,
+            "filename": row.filename,
+            "status": row.status,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "filename_marked": html.escape(row.filename or ""),
+            "snippet": marked(("…" if start else "") + fragment + ("…" if start + 160 < len(body) else "")),
+            "score": None,
+        })
+    return items, len(rows) > limit, False
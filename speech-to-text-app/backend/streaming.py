@@ -0,0 +1,374 @@
+"""
+Real-time streaming transcription over Socket.IO
+
+Clients connect to /stream with {"token": jwt} as auth, emit "start" with the
+sample rate, "audio" events of raw 16-bit mono PCM, then "stop". While someone
+speaks a "partial" comes back every STREAM_SEGMENT_MS, then one "final" per
+utterance; on "stop" the finals are saved as a Conversion. Needs a server that
+speaks WebSocket: `python app.py`, or a single gthread worker under gunicorn.
+"""
+
+import math
+import os
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import request
+from flask_socketio import SocketIO
+from pydub import AudioSegment
+from auth import decode_token
+from credits import credit_bank
+from extensions import db
+from jobs import job_queue
+from models import Conversion
+from ratelimit import rate_limiter
+from transcribers import layers
+
+NAMESPACE = "/stream"
+# VAD decision granularity
+FRAME_MS = 30
+# Audio kept from before speech is detected, so first syllables are not clipped
+PREROLL_MS = 300
+SAMPLE_WIDTH = 2
+SUPPORTED_SAMPLE_RATES = (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000)
+
+
+class Segmenter:
+    """
+    Voice-activity segmentation of a PCM stream.
+
+    feed() returns the work it made ready, as tuples:
+    ("partial", utterance, pcm) for each STREAM_SEGMENT_MS of speech and
+    ("final", utterance, pcm) for a complete utterance.
+    """
+
+    def __init__(self, sample_rate=16000, segment_ms=500, end_silence_ms=500,
+                 max_utterance_ms=15000, threshold_db=-40.0):
+        self.sample_rate = sample_rate
+        self.threshold_db = threshold_db
+        self.end_silence_ms = end_silence_ms
+        self.frame_bytes = self._bytes(FRAME_MS)
+        if self.frame_bytes <= 0:
+            raise ValueError(f"Sample rate {sample_rate} is too low")
+        self.segment_bytes = self._bytes(segment_ms)
+        self.max_utterance_bytes = self._bytes(max_utterance_ms)
+        self.preroll_frames = PREROLL_MS // FRAME_MS
+        self.utterance = 0
+        self._pending = bytearray()
+        self._preroll = []
+        self._speech = None
+        self._sent = 0
+        self._silence_ms = 0
+
+    def _bytes(self, ms):
+        return self.sample_rate * ms // 1000 * SAMPLE_WIDTH
+
+    def loud(self, frame):
+        segment = AudioSegment(data=bytes(frame), sample_width=SAMPLE_WIDTH, frame_rate=self.sample_rate, channels=1)
+        return segment.dBFS > self.threshold_db
+
+    def feed(self, pcm):
+        self._pending += pcm
+        ready = []
+        while len(self._pending) >= self.frame_bytes:
+            frame = bytes(self._pending[:self.frame_bytes])
+            del self._pending[:self.frame_bytes]
+            ready.extend(self._frame(frame))
+        return ready
+
+    def flush(self):
+        """End of stream: finalize whatever utterance is open"""
+        if self._speech is None:
+            return []
+        self._speech += self._pending
+        self._pending = bytearray()
+        return self._finish()
+
+    def _frame(self, frame):
+        loud = self.loud(frame)
+        if self._speech is None:
+            if not loud:
+                self._preroll = (self._preroll + [frame])[-self.preroll_frames:]
+                return []
+            self._speech = bytearray(b"".join(self._preroll))
+            self._preroll = []
+            self._sent = 0
+            self._silence_ms = 0
+
+        self._speech += frame
+        self._silence_ms = 0 if loud else self._silence_ms + FRAME_MS
+        if self._silence_ms >= self.end_silence_ms or len(self._speech) >= self.max_utterance_bytes:
+            return self._finish()
+        if len(self._speech) - self._sent >= self.segment_bytes:
+            segment = bytes(self._speech[self._sent:])
+            self._sent = len(self._speech)
+            return [("partial", self.utterance, segment)]
+        return []
+
+    def _finish(self):
+        # Trailing silence adds provider time and nothing else
+        speech = self._speech[:len(self._speech) - self._bytes(self._silence_ms)] or self._speech
+        ready = [("final", self.utterance, bytes(speech))]
+        self.utterance += 1
+        self._speech = None
+        return ready
+
+
+def transcribe_pcm(transcriber, pcm, sample_rate):
+    """Text for raw mono PCM, through transcribe_pcm() or a temporary WAV"""
+    if hasattr(transcriber, "transcribe_pcm"):
+        return transcriber.transcribe_pcm(pcm, sample_rate)
+    fd, path = tempfile.mkstemp(prefix="stream-", suffix=".wav")
+    os.close(fd)
+    try:
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(SAMPLE_WIDTH)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)
+        return transcriber.transcribe(path)
+    finally:
+        os.remove(path)
+
+
+class StreamSession:
+    """One client's stream: its segmenter, its worker and the texts so far"""
+
+    def __init__(self, server, sid, user_id, sample_rate):
+        self.server = server
+        self.sid = sid
+        self.user_id = user_id
+        self.sample_rate = sample_rate
+        config = server.app.config
+        self.segmenter = Segmenter(
+            sample_rate=sample_rate,
+            segment_ms=int(config.get("STREAM_SEGMENT_MS", 500)),
+            end_silence_ms=int(config.get("STREAM_END_SILENCE_MS", 500)),
+            max_utterance_ms=int(float(config.get("STREAM_MAX_UTTERANCE_SECONDS", 15)) * 1000),
+            threshold_db=float(config.get("STREAM_VAD_THRESHOLD_DB", -40)),
+        )
+        self.transcriber = server.transcriber()
+        self.partials = {}
+        self.finals = {}
+        self.stopped = False
+        self.credit_block = int(config.get("STREAM_CREDIT_BLOCK_SECONDS", 60))
+        self.max_backlog = int(config.get("STREAM_MAX_BACKLOG", 4))
+        self.backlog = 0
+        self._backlog_lock = threading.Lock()
+        self.charged = 0
+        self.received = 0
+        self._settled = False
+        self._settle_lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"stream-{sid[:8]}")
+
+    def audio_seconds(self):
+        return self.received / (self.sample_rate * SAMPLE_WIDTH)
+
+    def charge(self):
+        """Charge another block of credit; False if the balance can't cover it"""
+        if not credit_bank.enabled:
+            return True
+        if not credit_bank.charge(self.user_id, self.credit_block):
+            return False
+        self.charged += self.credit_block
+        return True
+
+    def feed(self, pcm):
+        """None, or an error once the audio outruns the credit that can be charged"""
+        self.received += len(pcm)
+        if credit_bank.enabled and self.audio_seconds() > self.charged and not self.charge():
+            self.stop()
+            return "No transcription credit left"
+        for kind, utterance, segment in self.segmenter.feed(pcm):
+            # One worker per stream keeps results in order; stop rather than queue without bound
+            if kind == "final" and self.backlog >= self.max_backlog:
+                self.stop()
+                return "Transcription is falling behind, stream stopped"
+            self._submit(kind, utterance, segment)
+        return None
+
+    def stop(self):
+        self.stopped = True
+        for work in self.segmenter.flush():
+            self._submit(*work)
+        self._worker.submit(self._finish)
+        self._worker.shutdown(wait=False)
+
+    def close(self):
+        if self.stopped:
+            return  # already draining towards "done"
+        # Client went away: drop queued work, let the running call finish
+        self._worker.shutdown(wait=False, cancel_futures=True)
+        self.settle()
+
+    def settle(self):
+        """Refund the unused part of the credit charged; once per stream"""
+        with self._settle_lock:
+            if self._settled:
+                return
+            self._settled = True
+        unused = self.charged - math.ceil(self.audio_seconds())
+        if unused > 0:
+            with self.server.app.app_context():
+                credit_bank.refund(self.user_id, unused)
+                db.session.remove()
+
+    def _submit(self, kind, utterance, pcm):
+        if kind == "final":
+            # Queued partials of this utterance are stale from here on
+            self.finals.setdefault(utterance, None)
+        elif self.backlog:
+            # Behind already: the next final covers this audio
+            return
+        with self._backlog_lock:
+            self.backlog += 1
+        self._worker.submit(self._run, kind, utterance, pcm)
+
+    def _run(self, kind, utterance, pcm):
+        try:
+            self._transcribe(kind, utterance, pcm)
+        finally:
+            with self._backlog_lock:
+                self.backlog -= 1
+
+    def _transcribe(self, kind, utterance, pcm):
+        if kind == "partial" and utterance in self.finals:
+            return
+        started = time.monotonic()
+        try:
+            text = transcribe_pcm(self.transcriber, pcm, self.sample_rate).strip()
+        except Exception as e:
+            self.server.emit("error", {"utterance": utterance, "error": str(e)[:500]}, self.sid)
+            return
+        payload = {
+            "utterance": utterance,
+            "audio_ms": len(pcm) * 1000 // (self.sample_rate * SAMPLE_WIDTH),
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+        if kind == "partial":
+            self.partials.setdefault(utterance, []).append(text)
+            self.server.emit("partial", {**payload, "text": " ".join(self.partials[utterance])}, self.sid)
+        else:
+            self.finals[utterance] = text
+            self.partials.pop(utterance, None)
+            self.server.emit("final", {**payload, "text": text}, self.sid)
+
+    def _finish(self):
+        self.settle()
+        text = " ".join(t for _, t in sorted(self.finals.items()) if t)
+        conversion_id = None
+        if text:
+            with self.server.app.app_context():
+                conversion = Conversion(
+                    user_id=self.user_id,
+                    filename=f"live-{datetime.utcnow():%Y%m%d-%H%M%S}.wav",
+                    text=text,
+                    status=Conversion.DONE,
+                    started_at=datetime.utcnow(),
+                    completed_at=datetime.utcnow(),
+                )
+                db.session.add(conversion)
+                db.session.commit()
+                conversion_id = conversion.id
+                db.session.remove()
+        self.server.emit("done", {"text": text, "conversion_id": conversion_id}, self.sid)
+        # A new "start" may have replaced this stream while it drained
+        if self.server.sessions.get(self.sid) is self:
+            self.server.sessions.pop(self.sid, None)
+
+
+class StreamServer:
+    """Flask extension owning the Socket.IO server and the live streams"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.socketio = SocketIO()
+        self.sessions = {}
+        self._users = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        # Events are handled in arrival order; transcription runs on each stream's worker
+        self.socketio.init_app(
+            app,
+            async_mode="threading",
+            async_handlers=False,
+            cors_allowed_origins="*",
+            max_http_buffer_size=1024 * 1024,
+        )
+        self.socketio.on_event("connect", self._connect, namespace=NAMESPACE)
+        self.socketio.on_event("start", self._start, namespace=NAMESPACE)
+        self.socketio.on_event("audio", self._audio, namespace=NAMESPACE)
+        self.socketio.on_event("stop", self._stop, namespace=NAMESPACE)
+        self.socketio.on_event("disconnect", self._disconnect, namespace=NAMESPACE)
+        app.extensions["stream_server"] = self
+
+    def transcriber(self):
+        # Innermost layer: no chunking, normalization or cache for live segments
+        return list(layers(job_queue.transcriber))[-1]
+
+    def emit(self, event, data, sid):
+        self.socketio.emit(event, data, to=sid, namespace=NAMESPACE)
+
+    def _connect(self, auth=None):
+        token = auth.get("token") if isinstance(auth, dict) else None
+        user_id = decode_token(token) if token else None
+        if user_id is None:
+            raise ConnectionRefusedError("Sign in to stream")
+        self._users[request.sid] = user_id
+
+    def _start(self, data=None):
+        data = data if isinstance(data, dict) else {}
+        user_id = self._users.get(request.sid)
+        if user_id is None:
+            return {"error": "Sign in to stream"}
+        try:
+            sample_rate = int(data.get("sample_rate", self.app.config.get("STREAM_SAMPLE_RATE", 16000)))
+        except (TypeError, ValueError):
+            sample_rate = None
+        if sample_rate not in SUPPORTED_SAMPLE_RATES:
+            return {"error": "Unsupported sample rate", "supported": list(SUPPORTED_SAMPLE_RATES)}
+        wait = rate_limiter.check(user_id, request.remote_addr)
+        if wait:
+            return {"error": "Too many streams, slow down", "retry_after": math.ceil(wait)}
+
+        previous = self.sessions.pop(request.sid, None)
+        if previous:
+            previous.close()
+        session = StreamSession(self, request.sid, user_id, sample_rate)
+        if not session.charge():
+            session.close()
+            return {"error": "No transcription credit left", "balance_seconds": credit_bank.balance(user_id)}
+        self.sessions[request.sid] = session
+        return {"ok": True, "sample_rate": sample_rate, "charged_seconds": session.charged}
+
+    def _audio(self, pcm):
+        session = self.sessions.get(request.sid)
+        if session is None or session.stopped:
+            return {"error": "Send start first"}
+        if not isinstance(pcm, (bytes, bytearray)):
+            return {"error": "Audio must be binary PCM"}
+        error = session.feed(pcm)
+        if error:
+            self.emit("error", {"error": error}, request.sid)
+
+    def _stop(self, data=None):
+        session = self.sessions.get(request.sid)
+        if session is None:
+            return {"error": "No stream"}
+        session.stop()
+        return {"ok": True}
+
+    def _disconnect(self, *args):
+        self._users.pop(request.sid, None)
+        session = self.sessions.pop(request.sid, None)
+        if session:
+            session.close()
+
+
+stream_server = StreamServer()
@@ -0,0 +1,79 @@
+"""
+Transcription credit: charges, refunds and the upload rate limit
+"""
+
+import threading
+
+from conftest import balance, upload, wait_finished, wav_bytes
+from app import app
+from credits import credit_bank
+from models import Conversion
+from ratelimit import rate_limiter
+
+
+def test_upload_charges_its_duration(client, sign_up):
+    user_id, headers = sign_up()
+    response = upload(client, headers, wav_bytes(5))
+    assert response.status_code == 202
+    assert wait_finished(client, headers, response.get_json()["id"])["status"] == Conversion.DONE
+    assert balance(user_id) == 55
+
+
+def test_upload_without_enough_credit_is_refused_untouched(client, sign_up):
+    user_id, headers = sign_up()
+    response = upload(client, headers, wav_bytes(61))
+    assert response.status_code == 402
+    assert response.get_json()["required_seconds"] == 61
+    assert balance(user_id) == 60
+
+
+def test_charge_never_overdraws(sign_up):
+    user_id, _ = sign_up()
+    results = []
+
+    def charge():
+        with app.app_context():
+            results.append(credit_bank.charge(user_id, 7))
+
+    threads = [threading.Thread(target=charge) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 60 seconds cover eight charges of 7
+    assert results.count(True) == 8
+    assert balance(user_id) == 4
+
+
+def test_cache_hit_refunds_the_charge(client, sign_up):
+    user_id, headers = sign_up()
+    audio = wav_bytes(4)
+    # Both are charged on upload; the job that gets the other's transcript
+    # without a provider call is refunded
+    jobs = [upload(client, headers, audio).get_json() for _ in range(2)]
+    assert balance(user_id) == 52
+    for job in jobs:
+        wait_finished(client, headers, job["id"])
+    assert balance(user_id) == 56
+
+    # Answered from the cache at upload time: never charged
+    assert upload(client, headers, audio).status_code == 200
+    assert balance(user_id) == 56
+
+
+def test_uploads_are_rate_limited(client, sign_up, monkeypatch):
+    _, headers = sign_up()
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    burst = int(rate_limiter.users.burst)
+    statuses = [upload(client, headers, wav_bytes(0.1)).status_code for _ in range(burst + 1)]
+    assert statuses == [202] * burst + [429]
+    response = upload(client, headers, wav_bytes(0.1))
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_cors_preflight_skips_the_limiter(client, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    headers = {"Origin": "http://localhost:5173", "Access-Control-Request-Method": "POST"}
+    for _ in range(int(rate_limiter.ips.burst) + 1):
+        assert client.options("/api/convert/", headers=headers).status_code == 200
@@ -0,0 +1,72 @@
+"""
+Word timing storage and the SRT/VTT/JSON exports
+"""
+
+import random
+
+from conftest import upload, wait_finished, wav_bytes
+from timings import BLOCK_ROWS, Transcript, decode_rows, encode_rows
+
+
+def finished_upload(client, headers):
+    conversion_id = upload(client, headers, wav_bytes(2)).get_json()["id"]
+    wait_finished(client, headers, conversion_id)
+    return conversion_id
+
+
+def test_rows_round_trip_across_blocks():
+    rng = random.Random(3)
+    rows, start, char = [], 0, 0
+    for _ in range(BLOCK_ROWS * 2 + 17):
+        start += rng.randint(0, 900)
+        length = rng.randint(1, 12)
+        rows.append((start, start + rng.randint(50, 800), char, char + length))
+        char += length + 1
+    assert list(decode_rows(encode_rows(rows))) == rows
+    assert list(decode_rows(encode_rows([]))) == []
+
+
+def test_response_timing_is_aligned_to_the_text():
+    transcript = Transcript.from_response({
+        "text": " Hello there world",
+        "segments": [{"start": 0.0, "end": 1.5, "text": "Hello there world",
+                      "words": [{"word": "Hello", "start": 0.0, "end": 0.4},
+                                {"word": "there", "start": 0.5, "end": 0.9},
+                                {"word": "world", "start": 1.0, "end": 1.5}]}],
+    })
+    assert transcript.segments == [(0, 1500, 1, 18)]
+    assert [transcript[start:end] for _, _, start, end in transcript.words] == ["Hello", "there", "world"]
+
+
+def test_srt_export(client, sign_up):
+    _, headers = sign_up()
+    conversion_id = finished_upload(client, headers)
+    response = client.get(f"/api/convert/download/{conversion_id}?format=srt", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-subrip"
+    # The stub's "stub transcript (<file>)": three words at 400 ms each, as one segment
+    cues = response.get_data(as_text=True).split("\n\n")
+    assert cues[0].startswith("1\n00:00:00,000 --> 00:00:01,200\nstub transcript (")
+    assert cues[1:] == [""]
+
+
+def test_vtt_export(client, sign_up):
+    _, headers = sign_up()
+    conversion_id = finished_upload(client, headers)
+    response = client.get(f"/api/convert/download/{conversion_id}?format=vtt", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "text/vtt"
+    body = response.get_data(as_text=True)
+    assert body.startswith("WEBVTT\n\n00:00:00.000 --> 00:00:01.200\nstub transcript (")
+    assert body.endswith(")\n\n")
+
+
+def test_json_export_and_unknown_format(client, sign_up):
+    _, headers = sign_up()
+    conversion_id = finished_upload(client, headers)
+    exported = client.get(f"/api/convert/download/{conversion_id}?format=json", headers=headers).get_json()
+    assert [(word["text"], word["start"], word["end"]) for word in exported["words"]][:2] == [
+        ("stub", 0.0, 0.4), ("transcript", 0.4, 0.8),
+    ]
+    assert exported["duration"] == 1.2
+    assert client.get(f"/api/convert/download/{conversion_id}?format=doc", headers=headers).status_code == 400
@@ -0,0 +1,50 @@
+"""
+Transcription history: per-user listing and keyset pagination
+"""
+
+from datetime import datetime
+
+from conftest import add_conversions
+
+
+def test_history_lists_only_own_conversions(client, sign_up):
+    owner_id, owner = sign_up()
+    _, stranger = sign_up()
+    add_conversions(owner_id, ["one", "two"])
+
+    assert len(client.get("/api/convert/history", headers=owner).get_json()["items"]) == 2
+    assert client.get("/api/convert/history", headers=stranger).get_json()["items"] == []
+
+
+def test_cursor_pages_cover_history_once(client, sign_up):
+    user_id, headers = sign_up()
+    # Equal timestamps: the id breaks the tie, so nothing is skipped or repeated
+    ids = add_conversions(user_id, [f"entry {index}" for index in range(7)], created_at=datetime(2024, 5, 1))
+    ids += add_conversions(user_id, ["newest"])
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        query = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/convert/history", headers=headers, query_string=query).get_json()
+        seen += [item["id"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert pages == 3
+    assert seen == [ids[-1]] + sorted(ids[:-1], reverse=True)
+
+
+def test_preview_is_cut_and_flagged(client, sign_up):
+    user_id, headers = sign_up()
+    add_conversions(user_id, ["word " * 100])
+    item = client.get("/api/convert/history", headers=headers).get_json()["items"][0]
+    assert len(item["preview"]) == 200
+    assert item["truncated"] is True
+
+
+def test_bad_cursor_and_limit_are_400(client, sign_up):
+    _, headers = sign_up()
+    assert client.get("/api/convert/history?cursor=nonsense", headers=headers).status_code == 400
+    assert client.get("/api/convert/history?limit=0", headers=headers).status_code == 400
+    assert client.get("/api/convert/history", query_string={"limit": 101}, headers=headers).status_code == 400
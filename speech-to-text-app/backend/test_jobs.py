@@ -0,0 +1,72 @@
+"""
+Background jobs: who may upload and read them, and claiming across processes
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import add_conversions, upload, wait_finished, wav_bytes
+from app import app
+from credits import credit_bank
+from extensions import db
+from jobs import job_queue
+from models import Conversion
+
+
+def test_upload_runs_as_a_background_job(client, sign_up):
+    _, headers = sign_up()
+    response = upload(client, headers, wav_bytes(1))
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job["status"] == Conversion.QUEUED
+    assert wait_finished(client, headers, job["id"])["text"].startswith("stub transcript")
+
+
+@pytest.mark.parametrize("credits_enabled", [True, False])
+def test_anonymous_upload_is_refused(client, monkeypatch, credits_enabled):
+    monkeypatch.setattr(credit_bank, "enabled", credits_enabled)
+    with app.app_context():
+        before = Conversion.query.count()
+    assert upload(client, {}, wav_bytes(1)).status_code == 401
+    with app.app_context():
+        assert Conversion.query.count() == before
+
+
+def test_other_users_conversions_are_not_found(client, sign_up):
+    owner_id, owner = sign_up()
+    _, stranger = sign_up()
+    conversion_id = add_conversions(owner_id, ["private minutes"])[0]
+
+    for path in (f"/api/convert/{conversion_id}", f"/api/convert/{conversion_id}/events",
+                 f"/api/convert/history/{conversion_id}", f"/api/convert/download/{conversion_id}"):
+        assert client.get(path, headers=stranger).status_code == 404, path
+        assert client.get(path).status_code == 401, path
+    assert client.get(f"/api/convert/{conversion_id}", headers=owner).get_json()["status"] == Conversion.DONE
+
+
+def test_a_job_is_claimed_once(sign_up):
+    user_id, _ = sign_up()
+    conversion_id = add_conversions(user_id, [None], status=Conversion.QUEUED)[0]
+    with app.app_context():
+        # Another process recovering the same row loses the race
+        assert job_queue._claim(conversion_id)
+        assert not job_queue._claim(conversion_id)
+        assert db.session.get(Conversion, conversion_id).status == Conversion.PROCESSING
+
+
+def test_only_stale_processing_jobs_are_reclaimed(sign_up):
+    user_id, _ = sign_up()
+    live, stale = add_conversions(user_id, [None, None], status=Conversion.PROCESSING)
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.get(Conversion, live).started_at = now - timedelta(seconds=job_queue.lease_seconds / 2)
+        db.session.get(Conversion, stale).started_at = now - timedelta(seconds=job_queue.lease_seconds * 2)
+        db.session.commit()
+
+        claimable = {row.id for row in Conversion.query.filter(job_queue._claimable())}
+        assert stale in claimable and live not in claimable
+        assert not job_queue._claim(live)
+        assert job_queue._claim(stale)
+        # The new claim restarts the lease
+        assert not job_queue._claim(stale)
@@ -0,0 +1,59 @@
+"""
+Transcript search: isolation, query syntax, highlighting and truncation
+"""
+
+import search as transcript_search
+from conftest import add_conversions
+
+
+def find(client, headers, query, **args):
+    return client.get("/api/convert/search", headers=headers, query_string={"q": query, **args})
+
+
+def test_search_finds_only_own_transcripts(client, sign_up):
+    owner_id, owner = sign_up()
+    other_id, other = sign_up()
+    mine = add_conversions(owner_id, ["quarterly narwhal forecast", "unrelated standup"])
+    add_conversions(other_id, ["the other narwhal budget"])
+
+    found = find(client, owner, "narwhal").get_json()
+    assert [item["id"] for item in found["items"]] == [mine[0]]
+    assert "<mark>narwhal</mark>" in found["items"][0]["snippet"]
+    assert found["truncated"] is False
+
+    assert find(client, other, "forecast").get_json()["items"] == []
+
+
+def test_search_takes_query_syntax_as_words(client, sign_up):
+    _, headers = sign_up()
+    for query in ('"unbalanced', "owner:u1", "NEAR(a b", "*"):
+        response = find(client, headers, query)
+        assert response.status_code == 200, query
+        assert response.get_json()["items"] == []
+
+
+def test_snippets_are_escaped_around_the_marks(client, sign_up):
+    user_id, headers = sign_up()
+    add_conversions(user_id, ["<script>alert(1)</script> the gryphon report"])
+    snippet = find(client, headers, "gryphon").get_json()["items"][0]["snippet"]
+    assert "<script>" not in snippet and "&lt;script&gt;" in snippet
+    assert "<mark>gryphon</mark>" in snippet
+
+
+def test_search_pages_and_flags_truncation(client, sign_up, monkeypatch):
+    user_id, headers = sign_up()
+    ids = add_conversions(user_id, ["kestrel sighting"] * 5)
+    monkeypatch.setattr(transcript_search, "MAX_RANKED", 3)
+
+    first = find(client, headers, "kestrel", limit=2).get_json()
+    second = find(client, headers, "kestrel", limit=2, cursor=first["next_cursor"]).get_json()
+    # Only the three newest are ranked; the two oldest are left out, and said to be
+    assert sorted(item["id"] for item in first["items"] + second["items"]) == sorted(ids[2:])
+    assert second["next_cursor"] is None
+    assert first["truncated"] is True
+
+
+def test_empty_and_overlong_queries_are_400(client, sign_up):
+    _, headers = sign_up()
+    assert find(client, headers, "").status_code == 400
+    assert find(client, headers, "word " * 50).status_code == 400
@@ -0,0 +1,213 @@
+"""
+Live streaming: Segmenter sequencing and the /stream Socket.IO namespace
+"""
+
+import math
+import random
+import time
+
+import pytest
+
+from conftest import app, balance
+from credits import credit_bank
+from extensions import db
+from models import Conversion
+from streaming import FRAME_MS, NAMESPACE, PREROLL_MS, Segmenter
+
+RATE = 16000
+
+
+def noise(ms, seed=1):
+    return random.Random(seed).randbytes(RATE * ms // 1000 * 2)
+
+
+def silence(ms):
+    return bytes(RATE * ms // 1000 * 2)
+
+
+def feed_in_pieces(segmenter, pcm, piece=777):
+    """Odd-sized writes, so frames straddle them as they do off the network"""
+    ready = []
+    for offset in range(0, len(pcm), piece):
+        ready += segmenter.feed(pcm[offset:offset + piece])
+    return ready
+
+
+# Segmenter
+
+def test_partials_then_final_per_utterance():
+    segmenter = Segmenter(RATE, segment_ms=300, end_silence_ms=300)
+    pcm = silence(600) + noise(990) + silence(600) + noise(600, seed=2) + silence(600)
+    ready = feed_in_pieces(segmenter, pcm)
+
+    # An utterance runs from its pre-roll to the end of the silence that ends it:
+    # 300 + 990 + 300 ms, then 300 + 600 + 300 ms. A partial every 300 ms of
+    # that, except where the final is due.
+    assert [(kind, utterance) for kind, utterance, _ in ready] == (
+        [("partial", 0)] * 5 + [("final", 0)] + [("partial", 1)] * 3 + [("final", 1)]
+    )
+    partials = [segment for kind, utterance, segment in ready if kind == "partial" and utterance == 0]
+    final = ready[5][2]
+    # Partials are consecutive pieces of the utterance as it came in, so they may
+    # end in some of the silence; the final is the whole utterance without it
+    assert b"".join(partials)[:len(final)] == final
+    # Pre-roll and speech, without the trailing silence that ended it
+    assert len(final) == len(silence(PREROLL_MS)) + len(noise(990))
+    assert segmenter.flush() == []
+
+
+def test_flush_finalizes_open_utterance():
+    segmenter = Segmenter(RATE, segment_ms=500, end_silence_ms=500)
+    ready = segmenter.feed(noise(200) + b"\1\0" * 7)
+    assert ready == []
+    flushed = segmenter.flush()
+    assert [(kind, utterance) for kind, utterance, _ in flushed] == [("final", 0)]
+    # The part-frame still pending goes with it
+    assert len(flushed[0][2]) == len(noise(200)) + 14
+
+
+def test_long_speech_is_cut_at_max_utterance():
+    segmenter = Segmenter(RATE, segment_ms=10000, end_silence_ms=500, max_utterance_ms=1500)
+    ready = feed_in_pieces(segmenter, noise(3100))
+    assert [(kind, utterance) for kind, utterance, _ in ready] == [("final", 0), ("final", 1)]
+    assert all(len(pcm) == len(silence(1500 // FRAME_MS * FRAME_MS)) for _, _, pcm in ready)
+
+
+def test_rate_too_low_for_a_frame_is_refused():
+    with pytest.raises(ValueError):
+        Segmenter(20)
+
+
+# /stream
+
+@pytest.fixture
+def stream(sign_up):
+    """Socket.IO test client connected to /stream as a new user; yields (client, user_id)"""
+    user_id, headers = sign_up()
+    token = headers["Authorization"].split(" ", 1)[1]
+    client = app.extensions["socketio"].test_client(app, namespace=NAMESPACE, auth={"token": token})
+    yield client, user_id
+    if client.is_connected(NAMESPACE):
+        client.disconnect(namespace=NAMESPACE)
+
+
+def received(client, name, timeout=10.0):
+    """Events received so far, waiting until one called name has arrived"""
+    events = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        events += client.get_received(NAMESPACE)
+        if any(event["name"] == name for event in events):
+            return events
+        time.sleep(0.05)
+    raise AssertionError(f"no {name!r} event in {[event['name'] for event in events]}")
+
+
+@pytest.mark.parametrize("sample_rate", [10, 12345, "fast", None])
+def test_unsupported_sample_rate_is_refused(stream, sample_rate):
+    client, _ = stream
+    ack = client.emit("start", {"sample_rate": sample_rate}, namespace=NAMESPACE, callback=True)
+    assert ack["error"] == "Unsupported sample rate"
+
+
+def test_audio_must_be_binary(stream):
+    client, _ = stream
+    assert client.emit("audio", b"\0\0", namespace=NAMESPACE, callback=True) == {"error": "Send start first"}
+    client.emit("start", {"sample_rate": RATE}, namespace=NAMESPACE, callback=True)
+    ack = client.emit("audio", "not pcm", namespace=NAMESPACE, callback=True)
+    assert ack == {"error": "Audio must be binary PCM"}
+
+
+def test_stream_is_transcribed_and_saved(stream):
+    client, user_id = stream
+    ack = client.emit("start", {"sample_rate": RATE}, namespace=NAMESPACE, callback=True)
+    assert ack["ok"] and ack["sample_rate"] == RATE
+
+    pcm = noise(1200) + silence(700)
+    for offset in range(0, len(pcm), 3200):
+        client.emit("audio", pcm[offset:offset + 3200], namespace=NAMESPACE)
+    client.emit("stop", namespace=NAMESPACE)
+    events = received(client, "done")
+
+    names = [event["name"] for event in events]
+    assert "final" in names and names.index("final") < names.index("done")
+    # A partial never arrives after its utterance's final
+    assert "partial" not in names[names.index("final"):]
+    done = events[names.index("done")]["args"][0]
+    assert done["text"].startswith("stub transcript")
+
+    with app.app_context():
+        conversion = db.session.get(Conversion, done["conversion_id"])
+        assert conversion.user_id == user_id and conversion.text == done["text"]
+
+
+def test_restart_keeps_the_new_stream(stream):
+    client, user_id = stream
+    with app.app_context():
+        # The old stream's unused credit comes back only once it has drained
+        credit_bank.grant(user_id, 60)
+    client.emit("start", {"sample_rate": RATE}, namespace=NAMESPACE, callback=True)
+    client.emit("audio", noise(600), namespace=NAMESPACE)
+    client.emit("stop", namespace=NAMESPACE)
+    # A new stream, started before the old one has finished draining
+    assert client.emit("start", {"sample_rate": RATE}, namespace=NAMESPACE, callback=True)["ok"]
+    received(client, "done")
+
+    ack = client.emit("audio", silence(100), namespace=NAMESPACE, callback=True)
+    # Still streaming: no "Send start first"
+    assert not ack
+
+
+def test_stream_stops_when_transcription_falls_behind(stream, monkeypatch):
+    client, _ = stream
+    monkeypatch.setitem(app.config, "STREAM_MAX_BACKLOG", 1)
+    client.emit("start", {"sample_rate": RATE}, namespace=NAMESPACE, callback=True)
+    # Utterances end faster than the stub's 0.3 s per call can keep up with
+    pcm = b"".join(noise(300, seed=index) + silence(600) for index in range(4))
+    client.emit("audio", pcm, namespace=NAMESPACE)
+    events = received(client, "error")
+    assert {"error": "Transcription is falling behind, stream stopped"} in [
+        event["args"][0] for event in events if event["name"] == "error"
+    ]
+    # It still drains what was queued and reports done
+    received(client, "done")
+
+
+def test_anonymous_stream_is_refused():
+    client = app.extensions["socketio"].test_client(app, namespace=NAMESPACE)
+    assert not client.is_connected(NAMESPACE)
+
+
+def test_stream_is_charged_for_the_audio_it_used(stream):
+    client, user_id = stream
+    ack = client.emit("start", {"sample_rate": RATE}, namespace=NAMESPACE, callback=True)
+    # A block of credit up front
+    assert ack == {"ok": True, "sample_rate": RATE, "charged_seconds": 60}
+    assert balance(user_id) == 0
+
+    pcm = noise(1200) + silence(700)
+    client.emit("audio", pcm, namespace=NAMESPACE)
+    client.emit("stop", namespace=NAMESPACE)
+    received(client, "done")
+    # What the 1.9 s stream didn't use comes back
+    assert balance(user_id) == 60 - math.ceil(len(pcm) / (RATE * 2))
+
+
+def test_stream_without_credit_is_refused(stream):
+    client, user_id = stream
+    with app.app_context():
+        credit_bank.charge(user_id, 60)
+    ack = client.emit("start", {"sample_rate": RATE}, namespace=NAMESPACE, callback=True)
+    assert ack == {"error": "No transcription credit left", "balance_seconds": 0}
+
+
+def test_stream_is_stopped_when_credit_runs_out(stream):
+    client, user_id = stream
+    client.emit("start", {"sample_rate": RATE}, namespace=NAMESPACE, callback=True)
+    # Past the 60 s block that was charged, with nothing left to charge the next
+    client.emit("audio", silence(61000), namespace=NAMESPACE)
+    events = received(client, "done")
+    assert {"error": "No transcription credit left"} in [
+        event["args"][0] for event in events if event["name"] == "error"
+    ]
+    assert balance(user_id) == 0
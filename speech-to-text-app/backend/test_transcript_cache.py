@@ -0,0 +1,74 @@
+"""
+Transcript cache: repeat uploads, coalesced jobs and failed cache writes
+"""
+
+import threading
+import time
+import uuid
+
+from conftest import upload, wait_finished, wav_bytes
+from app import app
+from transcript_cache import transcript_cache
+
+
+class SlowTranscriber:
+    """Transcriber that blocks until released and counts its calls"""
+    model = "slow-test"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def transcribe(self, path):
+        self.calls += 1
+        self.release.wait(5)
+        return f"transcript of {path}"
+
+
+def test_repeat_upload_is_served_from_the_cache(client, sign_up):
+    _, headers = sign_up()
+    audio = wav_bytes(2)
+    # The second arrives while the first is still transcribing; whichever job a
+    # worker starts first calls the provider and the other waits for its result
+    jobs = [upload(client, headers, audio).get_json() for _ in range(2)]
+    done = [wait_finished(client, headers, job["id"]) for job in jobs]
+    assert sorted(job["cache_hit"] for job in done) == [False, True]
+    assert done[0]["text"] == done[1]["text"]
+
+    # Once stored, the same audio is answered at upload time
+    third = upload(client, headers, audio)
+    assert third.status_code == 200
+    assert third.get_json()["cache_hit"] is True
+
+
+def test_failed_cache_write_keeps_the_transcript(monkeypatch):
+    transcriber = SlowTranscriber()
+    audio_sha256 = uuid.uuid4().hex
+
+    def broken_put(*args):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(transcript_cache, "_put", broken_put)
+    results = []
+
+    def job():
+        with app.app_context():
+            results.append(transcript_cache.transcribe(audio_sha256, "a.wav", transcriber))
+
+    coalesced = transcript_cache.coalesced
+    threads = [threading.Thread(target=job) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    # Let both followers join the leader's call before it returns
+    deadline = time.monotonic() + 5
+    while transcript_cache.coalesced < coalesced + 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    transcriber.release.set()
+    for thread in threads:
+        thread.join()
+
+    # One provider call; the leader and its followers all get its text
+    assert transcriber.calls == 1
+    assert sorted(results, key=lambda result: result[1]) == [
+        ("transcript of a.wav", False), ("transcript of a.wav", True), ("transcript of a.wav", True),
+    ]
@@ -0,0 +1,252 @@
+"""
+Segment and word timing for transcripts
+
+Timing rows are (start_ms, end_ms, char_start, char_end), stored as
+compressed columnar blobs in transcript_timing and exported as SRT, VTT or
+JSON.
+"""
+
+import html
+import json
+import sys
+import zlib
+from array import array
+from datetime import datetime
+from struct import Struct
+from extensions import db
+from models import TranscriptTiming
+
+FORMAT_VERSION = 1
+BLOCK_ROWS = 4096
+COLUMNS = 4
+BLOCK_HEADER = Struct("<HI")
+ZLIB_LEVEL = 9
+# Cues built from words when the provider sent no segments
+CUE_MAX_MS = 6000
+CUE_MAX_CHARS = 84
+
+
+class Transcript(str):
+    """Transcript text that also carries segment and word timing rows"""
+    # A str, so everything that only wants the text is unchanged. Rows point
+    # into the text by char offsets rather than repeating the words they time.
+
+    def __new__(cls, text, segments=(), words=()):
+        transcript = super().__new__(cls, text)
+        transcript.segments = list(segments)
+        transcript.words = list(words)
+        return transcript
+
+    @property
+    def timed(self):
+        return bool(self.segments or self.words)
+
+    @classmethod
+    def from_response(cls, data):
+        """From a Whisper-style response; words may sit at the top level or in each segment"""
+        text = data.get("text") or ""
+        segments = data.get("segments") or []
+        words = data.get("words") or [word for segment in segments for word in segment.get("words") or []]
+        return cls(
+            text,
+            align(text, ((_ms(s.get("start")), _ms(s.get("end")), s.get("text")) for s in segments)),
+            align(text, ((_ms(w.get("start")), _ms(w.get("end")), w.get("word", w.get("text"))) for w in words)),
+        )
+
+    @classmethod
+    def stitched(cls, text, parts):
+        """Timing for text stitched from (transcript, offset_ms, keep_from_ms, keep_until_ms) chunks"""
+        # Rows starting outside a chunk's keep window time the neighbouring chunk's copy of the overlap
+        segments, words = [], []
+        for transcript, offset_ms, keep_from, keep_until in parts:
+            for rows, into in ((transcript.segments, segments), (transcript.words, words)):
+                into.extend(
+                    (start + offset_ms, end + offset_ms, transcript[char_start:char_end])
+                    for start, end, char_start, char_end in rows
+                    if keep_from <= start + offset_ms < keep_until
+                )
+        return cls(text, align(text, segments), align(text, words))
+
+
+def _ms(seconds):
+    return None if seconds is None else round(float(seconds) * 1000)
+
+
+def align(text, timed_pieces):
+    """Rows for (start_ms, end_ms, piece_text) found in text in order; untimed or missing pieces are left out"""
+    rows = []
+    cursor = 0
+    for start_ms, end_ms, piece in timed_pieces:
+        piece = (piece or "").strip()
+        if start_ms is None or end_ms is None or not piece:
+            continue
+        at = text.find(piece, cursor)
+        if at < 0:
+            continue
+        rows.append((start_ms, max(start_ms, end_ms), at, at + len(piece)))
+        cursor = at + len(piece)
+    return rows
+
+
+# Blob encoding: a version byte, then blocks of up to BLOCK_ROWS rows, each
+# zlib-compressed on its own so a long transcript decodes in bounded memory.
+# A block holds four int32 columns of small, repetitive numbers (start delta,
+# duration, char_start delta, length), byte-shuffled so the zero high bytes
+# line up.
+
+def _shuffle(values):
+    column = array("i", values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    raw = column.tobytes()
+    return b"".join(raw[lane::4] for lane in range(4))
+
+
+def _unshuffle(payload, count):
+    raw = bytearray(len(payload))
+    for lane in range(4):
+        raw[lane::4] = payload[lane * count:(lane + 1) * count]
+    column = array("i")
+    column.frombytes(bytes(raw))
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def encode_rows(rows):
+    """Compressed columnar blob for (start_ms, end_ms, char_start, char_end) rows"""
+    out = [bytes([FORMAT_VERSION])]
+    for first in range(0, len(rows), BLOCK_ROWS):
+        block = rows[first:first + BLOCK_ROWS]
+        columns = [[] for _ in range(COLUMNS)]
+        previous_start = previous_end = 0
+        for start, end, char_start, char_end in block:
+            columns[0].append(start - previous_start)
+            columns[1].append(end - start)
+            columns[2].append(char_start - previous_end)
+            columns[3].append(char_end - char_start)
+            previous_start, previous_end = start, char_end
+        payload = zlib.compress(b"".join(_shuffle(column) for column in columns), ZLIB_LEVEL)
+        out.append(BLOCK_HEADER.pack(len(block), len(payload)))
+        out.append(payload)
+    return b"".join(out)
+
+
+def decode_rows(blob):
+    """Rows of a blob, inflated one block at a time"""
+    if not blob:
+        return
+    if blob[0] != FORMAT_VERSION:
+        raise ValueError(f"Unknown timing format {blob[0]}")
+    position = 1
+    while position < len(blob):
+        count, size = BLOCK_HEADER.unpack_from(blob, position)
+        position += BLOCK_HEADER.size
+        raw = zlib.decompress(blob[position:position + size])
+        position += size
+        width = count * 4
+        starts, durations, gaps, lengths = (
+            _unshuffle(raw[index * width:(index + 1) * width], count) for index in range(COLUMNS)
+        )
+        start = char_end = 0
+        for index in range(count):
+            start += starts[index]
+            char_start = char_end + gaps[index]
+            char_end = char_start + lengths[index]
+            yield start, start + durations[index], char_start, char_end
+
+
+# Storage
+
+def save_timing(conversion_id, transcript):
+    """Store a Transcript's timing for a conversion; plain text clears it"""
+    timing = db.session.get(TranscriptTiming, conversion_id)
+    if not getattr(transcript, "timed", False):
+        if timing is not None:
+            db.session.delete(timing)
+        return None
+    if timing is None:
+        timing = TranscriptTiming(conversion_id=conversion_id)
+        db.session.add(timing)
+    timing.segment_count = len(transcript.segments)
+    timing.word_count = len(transcript.words)
+    timing.duration_ms = max((end for _, end, _, _ in transcript.segments + transcript.words), default=0)
+    timing.segments = encode_rows(transcript.segments)
+    timing.words = encode_rows(transcript.words)
+    timing.created_at = datetime.utcnow()
+    return timing
+
+
+# Exporters: generators of text, for streaming responses
+
+def cues(text, timing):
+    """(start_ms, end_ms, text) subtitle cues: the segments, else words grouped into lines"""
+    if timing.segment_count:
+        for start, end, char_start, char_end in decode_rows(timing.segments):
+            yield start, end, text[char_start:char_end]
+        return
+    cue = None
+    for start, end, char_start, char_end in decode_rows(timing.words):
+        if cue and (end - cue[0] > CUE_MAX_MS or char_end - cue[2] > CUE_MAX_CHARS):
+            yield cue[0], cue[1], text[cue[2]:cue[3]]
+            cue = None
+        cue = [cue[0], end, cue[2], char_end] if cue else [start, end, char_start, char_end]
+    if cue:
+        yield cue[0], cue[1], text[cue[2]:cue[3]]
+
+
+def timestamp(ms, separator):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def one_line(cue):
+    # A blank line would end the cue
+    return " ".join(cue.split())
+
+
+def to_srt(text, timing):
+    for index, (start, end, cue) in enumerate(cues(text, timing), 1):
+        yield f"{index}\n{timestamp(start, ',')} --> {timestamp(end, ',')}\n{one_line(cue)}\n\n"
+
+
+def to_vtt(text, timing):
+    yield "WEBVTT\n\n"
+    for start, end, cue in cues(text, timing):
+        # Cue text is markup in WebVTT
+        cue = html.escape(one_line(cue), quote=False)
+        yield f"{timestamp(start, '.')} --> {timestamp(end, '.')}\n{cue}\n\n"
+
+
+def to_json(text, timing):
+    """{"text", "duration", "segments", "words"}; times in seconds"""
+    yield '{"text": ' + json.dumps(text) + ', "duration": ' + json.dumps(timing.duration_ms / 1000)
+    for name, blob in (("segments", timing.segments), ("words", timing.words)):
+        yield f', "{name}": ['
+        for index, (start, end, char_start, char_end) in enumerate(decode_rows(blob)):
+            row = {"start": start / 1000, "end": end / 1000, "text": text[char_start:char_end]}
+            yield ("," if index else "") + json.dumps(row)
+        yield "]"
+    yield "}\n"
+
+
+def buffered(chunks, size=64 * 1024):
+    """Join small generated pieces into writes of about size characters"""
+    pending, length = [], 0
+    for chunk in chunks:
+        pending.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(pending)
+            pending, length = [], 0
+    if pending:
+        yield "".join(pending)
+
+
+EXPORTERS = {
+    "srt": (to_srt, "application/x-subrip"),
+    "vtt": (to_vtt, "text/vtt"),
+    "json": (to_json, "application/json"),
+}
@@ -0,0 +1,184 @@
+"""
+Speech-to-text providers
+
+A transcriber is any object with transcribe(path) -> str. The job workers
+only talk to that method, so tests and benchmarks can swap DeepInfra for
+StubTranscriber (TRANSCRIBER=stub) and never touch the network. The str may
+be a timings.Transcript, which also carries segment and word timing.
+"""
+
+import os
+import time
+import uuid
+from provider_client import ProviderClient, ProviderError
+from timings import Transcript, align
+
+
+# Pretend speaking rate of the stub: one word per this many milliseconds
+STUB_WORD_MS = 400
+
+
+class TranscriptionError(Exception):
+    """The provider could not transcribe the file"""
+
+
+class MultipartFileBody:
+    """
+    multipart/form-data body with one file field, read from disk on demand.
+
+    requests' files= builds the whole body in memory; this object has a
+    length and a read(), so requests sends it with Content-Length while
+    http.client pulls it in small blocks.
+    """
+
+    def __init__(self, path, field="file", filename=None):
+        self.boundary = uuid.uuid4().hex
+        filename = filename or os.path.basename(path)
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self._size = os.path.getsize(path)
+        self._path = path
+        self._file = None
+        self._parts = None
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self._head) + self._size + len(self._tail)
+
+    def read(self, size=-1):
+        if self._parts is None:
+            self._file = open(self._path, "rb")
+            self._parts = [self._head, None, self._tail]
+        out = b""
+        while self._parts and (size < 0 or len(out) < size):
+            want = -1 if size < 0 else size - len(out)
+            if self._parts[0] is None:
+                block = self._file.read(want)
+                if block:
+                    out += block
+                    continue
+                self._file.close()
+                self._parts.pop(0)
+            else:
+                part = self._parts[0]
+                taken = part if want < 0 else part[:want]
+                out += taken
+                if len(taken) == len(part):
+                    self._parts.pop(0)
+                else:
+                    self._parts[0] = part[len(taken):]
+        return out
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class DeepInfraTranscriber:
+    """Whisper large-v3 hosted on DeepInfra"""
+
+    model = "whisper-large-v3"
+
+    def __init__(self, api_key=None, url=None, client=None):
+        self.api_key = api_key or os.getenv("DEEPINFRA_API_KEY")
+        self.url = url or os.getenv("DEEPINFRA_URL", f"https://api.deepinfra.com/v1/inference/openai/{self.model}")
+        self.client = client or ProviderClient()
+
+    @classmethod
+    def from_config(cls, config, logger=None):
+        return cls(client=ProviderClient.from_config(config, logger))
+
+    def transcribe(self, path):
+        try:
+            response = self.client.post(
+                self.url,
+                # A fresh body per attempt; each one streams the file from the start
+                body=lambda: MultipartFileBody(path),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        except ProviderError as e:
+            raise TranscriptionError(f"DeepInfra unavailable: {e}")
+        if response.status_code != 200:
+            raise TranscriptionError(f"DeepInfra failed ({response.status_code}): {response.text[:500]}")
+        # Keeps the segment and word timing Whisper returns alongside the text
+        return Transcript.from_response(response.json())
+
+
+class StubTranscriber:
+    """Local stand-in: sleeps for `latency` seconds and returns fixed text timed at one word per STUB_WORD_MS"""
+
+    model = "stub"
+
+    def __init__(self, latency=0.0, text="stub transcript"):
+        self.latency = latency
+        self.text = text
+
+    @classmethod
+    def from_config(cls, config, logger=None):
+        return cls(latency=float(config.get("STUB_LATENCY", 0.0)))
+
+    def transcribe(self, path):
+        if self.latency:
+            time.sleep(self.latency)
+        text = f"{self.text} ({os.path.basename(path)})"
+        words = [(index * STUB_WORD_MS, (index + 1) * STUB_WORD_MS, word) for index, word in enumerate(text.split())]
+        return Transcript(text, align(text, [(0, len(words) * STUB_WORD_MS, text)]), align(text, words))
+
+    def transcribe_pcm(self, pcm, sample_rate):
+        # Streaming segments: deterministic text from the audio's length
+        if self.latency:
+            time.sleep(self.latency)
+        return f"{self.text} ({len(pcm) * 1000 // (2 * sample_rate)}ms)"
+
+
+TRANSCRIBERS = {
+    "deepinfra": DeepInfraTranscriber,
+    "stub": StubTranscriber,
+}
+
+
+def make_transcriber(name, config=None, logger=None):
+    """Build the named transcriber, wrapped for long audio and normalization as configured"""
+    config = config or {}
+    if name not in TRANSCRIBERS:
+        raise ValueError(f"Unknown TRANSCRIBER {name!r}; choose from {', '.join(TRANSCRIBERS)}")
+    transcriber = TRANSCRIBERS[name].from_config(config, logger)
+
+    if config.get("CHUNKED_TRANSCRIPTION", False):
+        from chunking import ChunkedTranscriber
+        transcriber = ChunkedTranscriber(
+            transcriber,
+            max_chunk_seconds=config.get("CHUNK_MAX_SECONDS", 120),
+            overlap_seconds=config.get("CHUNK_OVERLAP_SECONDS", 2),
+            concurrency=config.get("CHUNK_CONCURRENCY", 4),
+            logger=logger,
+        )
+    if config.get("NORMALIZE_AUDIO", False):
+        # Outermost, so chunking also works on the smaller 16 kHz mono copy
+        from normalize import NormalizingTranscriber
+        transcriber = NormalizingTranscriber(
+            transcriber,
+            sample_rate=config.get("NORMALIZE_SAMPLE_RATE", 16000),
+            codec=config.get("NORMALIZE_CODEC", "flac"),
+            logger=logger,
+        )
+    return transcriber
+
+
+def layers(transcriber):
+    """The transcriber and every transcriber it wraps, outermost first"""
+    while transcriber is not None:
+        yield transcriber
+        transcriber = getattr(transcriber, "inner", None)
+
+
+def provider_client(transcriber):
+    """The ProviderClient under a (possibly wrapped) transcriber, or None"""
+    return next((layer.client for layer in layers(transcriber) if getattr(layer, "client", None)), None)
@@ -0,0 +1,221 @@
+"""
+Content-addressed transcript cache
+
+Transcripts are keyed by the upload's SHA-256 plus the transcriber's model
+and options; concurrent jobs for the same key share one provider call.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from sqlalchemy import bindparam, func
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import TranscriptCache as CacheEntry
+from timings import Transcript, decode_rows, encode_rows
+
+# Longest a hit's hits/last_used_at update waits in memory; lost on exit, which only blurs the LRU order
+TOUCH_SECONDS = 30.0
+# Puts between exact counts of the table, to catch up with other processes
+RECOUNT_PUTS = 100
+
+
+def cache_identity(transcriber):
+    """(model, options) of a transcriber; wrappers contribute their own options"""
+    model = getattr(transcriber, "model", type(transcriber).__name__)
+    options = dict(getattr(transcriber, "cache_options", {}))
+    inner = getattr(transcriber, "inner", None)
+    if inner is not None:
+        model, inner_options = cache_identity(inner)
+        options = {**inner_options, **options}
+    return model, options
+
+
+class TranscriptCache:
+    """Flask extension fronting the transcript_cache table"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = True
+        self.max_entries = 10000
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.touch_seconds = TOUCH_SECONDS
+        self.recount_puts = RECOUNT_PUTS
+        self._entries = None
+        self._puts = 0
+        self._touched = {}
+        self._touched_at = time.monotonic()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = bool(app.config.get("TRANSCRIPT_CACHE_ENABLED", True))
+        self.max_entries = int(app.config.get("TRANSCRIPT_CACHE_MAX_ENTRIES", 10000))
+        app.extensions["transcript_cache"] = self
+
+    @staticmethod
+    def key_for(audio_sha256, model, options):
+        raw = f"{audio_sha256}:{model}:{json.dumps(options, sort_keys=True)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def lookup(self, audio_sha256, transcriber):
+        """Cached text for this audio and transcriber, or None"""
+        if not self.enabled or not audio_sha256:
+            return None
+        text = self._get(self.key_for(audio_sha256, *cache_identity(transcriber)))
+        # Misses are counted once, by the job that then calls transcribe()
+        if text is not None:
+            self._count(hit=True)
+        return text
+
+    def transcribe(self, audio_sha256, path, transcriber):
+        """
+        Transcript for the file, from the cache or the transcriber.
+        Returns (text, cached); cached is True when no provider call was made
+        for this job.
+        """
+        if not self.enabled or not audio_sha256:
+            return transcriber.transcribe(path), False
+
+        model, options = cache_identity(transcriber)
+        key = self.key_for(audio_sha256, model, options)
+        text = self._get(key)
+        if text is not None:
+            self._count(hit=True)
+            return text, True
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            with self._lock:
+                self.coalesced += 1
+            return future.result(), True
+
+        self._count(hit=False)
+        try:
+            text = transcriber.transcribe(path)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            # The provider has been paid: waiting jobs get the text whatever happens to the write
+            future.set_result(text)
+            self._store(key, audio_sha256, model, text)
+            return text, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        # A coalesced job also avoided a provider call
+        saved = self.hits + self.coalesced
+        lookups = saved + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round(saved / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": CacheEntry.query.count(),
+            "max_entries": self.max_entries,
+        }
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _get(self, key):
+        entry = CacheEntry.query.filter_by(cache_key=key).first()
+        if entry is None:
+            return None
+        text = entry.text
+        if entry.segments or entry.words:
+            text = Transcript(text, decode_rows(entry.segments), decode_rows(entry.words))
+        with self._lock:
+            hits, _ = self._touched.get(key, (0, None))
+            self._touched[key] = (hits + 1, datetime.utcnow())
+        self.flush_hits()
+        return text
+
+    def flush_hits(self, force=False):
+        """Write the hits recorded in memory; only once TOUCH_SECONDS have passed unless forced"""
+        with self._lock:
+            due = force or time.monotonic() - self._touched_at >= self.touch_seconds
+            if not self._touched or not due:
+                return
+            touched, self._touched = self._touched, {}
+            self._touched_at = time.monotonic()
+        table = CacheEntry.__table__
+        db.session.execute(
+            table.update().where(table.c.cache_key == bindparam("key")).values(
+                hits=func.coalesce(table.c.hits, 0) + bindparam("count"),
+                last_used_at=bindparam("used"),
+            ),
+            [{"key": key, "count": count, "used": used} for key, (count, used) in touched.items()],
+        )
+        db.session.commit()
+
+    def _store(self, key, audio_sha256, model, text):
+        try:
+            self._put(key, audio_sha256, model, text)
+        except Exception as e:
+            db.session.rollback()
+            self.app.logger.warning(f"Could not cache transcript {key[:12]}: {e}")
+
+    def _put(self, key, audio_sha256, model, text):
+        added = False
+        if CacheEntry.query.filter_by(cache_key=key).first() is None:
+            entry = CacheEntry(cache_key=key, audio_sha256=audio_sha256, model=model, text=str(text))
+            if getattr(text, "timed", False):
+                entry.segments, entry.words = encode_rows(text.segments), encode_rows(text.words)
+            db.session.add(entry)
+            try:
+                db.session.commit()
+                added = True
+            except IntegrityError:
+                # Another process stored the same transcript first
+                db.session.rollback()
+        with self._lock:
+            self._puts += 1
+            recount = self._entries is None or self._puts % self.recount_puts == 0
+            if added and self._entries is not None:
+                self._entries += 1
+        if recount:
+            count = CacheEntry.query.count()
+            with self._lock:
+                self._entries = count
+        if self._entries > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        # Recency first, so the rows deleted really are the least recently used
+        self.flush_hits(force=True)
+        count = CacheEntry.query.count()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            oldest = db.session.query(CacheEntry.id).order_by(CacheEntry.last_used_at, CacheEntry.id).limit(overflow)
+            removed = CacheEntry.query.filter(CacheEntry.id.in_(oldest.scalar_subquery())).delete(synchronize_session=False)
+            db.session.commit()
+            with self._lock:
+                self.evictions += removed
+        with self._lock:
+            self._entries = min(count, self.max_entries)
+
+
+transcript_cache = TranscriptCache()
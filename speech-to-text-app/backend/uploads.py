@@ -0,0 +1,158 @@
+"""
+Upload storage for the speech backend
+
+UploadRequest makes Werkzeug write each uploaded file straight into
+UPLOAD_FOLDER, hashing it on the way, instead of spooling it to a temporary
+file that the route then copies again. Accepting an upload is a rename.
+Parts that are never accepted (bad extension, failed request) are deleted
+when the request closes them.
+
+UploadJanitor removes uploads once they are no longer needed: files of
+finished jobs after UPLOAD_RETENTION_HOURS, and stray partial uploads after
+an hour. Files of queued or processing jobs are never touched. It runs in a
+background thread every JANITOR_INTERVAL seconds, or once with
+`python uploads.py`.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from flask import Request, current_app
+from extensions import db
+from models import Conversion
+
+PART_SUFFIX = ".part"
+# Partial uploads older than this belong to requests that died
+STALE_PART_SECONDS = 3600
+
+
+class HashingFile:
+    """Writable upload target in UPLOAD_FOLDER that SHA-256s what is written"""
+
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        fd, self.name = tempfile.mkstemp(dir=folder, prefix="upload-", suffix=PART_SUFFIX)
+        self._file = os.fdopen(fd, "w+b")
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.kept = False
+
+    def write(self, data):
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def keep(self, path):
+        """Close the file and move it to its final path"""
+        self._file.close()
+        os.replace(self.name, path)
+        self.name = path
+        self.kept = True
+
+    def close(self):
+        self._file.close()
+        if not self.kept:
+            try:
+                os.remove(self.name)
+            except OSError:
+                pass
+
+    def __getattr__(self, attr):
+        # read/seek/tell/flush/readline etc. go to the underlying file
+        return getattr(self._file, attr)
+
+
+class UploadRequest(Request):
+    """Request whose file parts are streamed to disk and hashed while parsed"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingFile(current_app.config.get("UPLOAD_FOLDER", "uploads"))
+
+
+class UploadJanitor:
+    """Flask extension deleting uploads past their retention"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._thread = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.folder = app.config.get("UPLOAD_FOLDER", "uploads")
+        self.retention = float(app.config.get("UPLOAD_RETENTION_HOURS", 24)) * 3600
+        self.interval = float(app.config.get("JANITOR_INTERVAL", 600))
+        app.extensions["upload_janitor"] = self
+
+    def ensure_started(self):
+        # Started by the first upload so importing the app never spawns it
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="upload-janitor", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    self.sweep()
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.warning(f"Upload janitor failed: {e}")
+                finally:
+                    db.session.remove()
+
+    def sweep(self):
+        """Delete expired uploads; returns the number of files removed"""
+        if not os.path.isdir(self.folder):
+            return 0
+        now = time.time()
+        busy = {
+            os.path.abspath(path) for (path,) in db.session.query(Conversion.filepath).filter(
+                Conversion.status.in_([Conversion.QUEUED, Conversion.PROCESSING]),
+                Conversion.filepath.isnot(None)
+            )
+        }
+
+        removed = []
+        for entry in os.scandir(self.folder):
+            if not entry.is_file():
+                continue
+            path = os.path.abspath(entry.path)
+            age = now - entry.stat().st_mtime
+            limit = STALE_PART_SECONDS if entry.name.endswith(PART_SUFFIX) else self.retention
+            if path in busy or age < limit:
+                continue
+            try:
+                os.remove(path)
+                removed.append(entry.path)
+            except OSError:
+                continue
+
+        if removed:
+            # Finished jobs keep their transcript; only the audio is gone
+            Conversion.query.filter(Conversion.filepath.in_(removed)).update(
+                {Conversion.filepath: None}, synchronize_session=False
+            )
+            db.session.commit()
+        return len(removed)
+
+
+upload_janitor = UploadJanitor()
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        print(f"🧹 Removed {upload_janitor.sweep()} expired upload(s)")
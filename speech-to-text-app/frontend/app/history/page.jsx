@@ -3,19 +3,56 @@ import { useState, useEffect } from "react";
 import Navbar from "../../components/Navbar";
 import axios from "axios";
 
+const API_BASE = process.env.NEXT_PUBLIC_API_BASE;
+
+function authHeaders() {
+    return { Authorization: `Bearer ${localStorage.getItem("stt_token")}` };
+}
+
 export default function History() {
     const [history, setHistory] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loading, setLoading] = useState(false);
 
-    useEffect(() => {
-        const token = localStorage.getItem("stt_token");
-        if (!token) return;
-        axios.get(`${process.env.NEXT_PUBLIC_API_BASE}/api/convert/history`, {
-            headers: { Authorization: `Bearer ${token}` }
+    // The API returns one page at a time; next_cursor fetches the one after it
+    const loadPage = (cursor) => {
+        setLoading(true);
+        axios.get(`${API_BASE}/api/convert/history`, {
+            headers: authHeaders(),
+            params: cursor ? { cursor } : {}
         })
-            .then(res => setHistory(res.data))
-            .catch(err => console.error(err));
+            .then(res => {
+                setHistory(prev => cursor ? [...prev, ...res.data.items] : res.data.items);
+                setNextCursor(res.data.next_cursor);
+            })
+            .catch(err => console.error(err))
+            .finally(() => setLoading(false));
+    };
+
+    useEffect(() => {
+        if (!localStorage.getItem("stt_token")) return;
+        loadPage(null);
     }, []);
 
+    // The list only carries previews; the full transcript is fetched on demand
+    const download = async (item, format = "txt") => {
+        try {
+            const res = await axios.get(`${API_BASE}/api/convert/download/${item.id}`, {
+                headers: authHeaders(),
+                params: { format },
+                responseType: "blob"
+            });
+            const url = URL.createObjectURL(res.data);
+            const link = document.createElement("a");
+            link.href = url;
+            link.download = `${item.filename.replace(/\.[^.]+$/, "")}.${format}`;
+            link.click();
+            URL.revokeObjectURL(url);
+        } catch (err) {
+            console.error(err);
+        }
+    };
+
     return (
         <div className="min-h-screen bg-gradient-to-b from-gray-50 to-gray-100">
             <Navbar />
@@ -37,14 +74,27 @@ export default function History() {
                                 {history.map((item) => (
                                     <tr key={item.id} className="hover:bg-gray-50 transition">
                                         <td className="px-6 py-4 whitespace-nowrap">{item.filename}</td>
-                                        <td className="px-6 py-4 whitespace-pre-wrap max-w-xs">{item.transcript}</td>
+                                        <td className="px-6 py-4 whitespace-pre-wrap max-w-xs">{item.preview}{item.truncated ? "…" : ""}</td>
                                         <td className="px-6 py-4 text-center">
-                                            <a href={`/api/convert/download/${item.id}`} className="text-blue-600 hover:text-blue-800 font-medium">Download</a>
+                                            {["txt", "srt", "vtt"].map((format) => (
+                                                <button key={format} onClick={() => download(item, format)} className="mx-1 text-blue-600 hover:text-blue-800 font-medium uppercase">{format}</button>
+                                            ))}
                                         </td>
                                     </tr>
                                 ))}
                             </tbody>
                         </table>
+                        {nextCursor && (
+                            <div className="text-center mt-6">
+                                <button
+                                    onClick={() => loadPage(nextCursor)}
+                                    disabled={loading}
+                                    className="px-4 py-2 bg-indigo-600 text-white rounded-lg hover:bg-indigo-700 disabled:opacity-50 transition"
+                                >
+                                    {loading ? "Loading..." : "Load more"}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 )}
             </div>